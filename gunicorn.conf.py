@@ -0,0 +1,77 @@
+"""
+Gunicorn settings for land_price_project.
+
+With preload_app the Django app and the ML model are loaded once in the master
+process before the workers are forked, so the workers share those memory
+pages copy-on-write instead of each unpickling its own copy. With
+ML_MODEL_FORMAT=arrays the tree arrays are memory-mapped files and stay shared
+for the worker's whole life.
+
+Each worker logs its memory right after the fork and again after its model is
+ready, so the cost per worker can be compared between settings.
+
+With PREDICTION_BATCHING=True the workers are threaded (gthread): a sync
+worker handles one request at a time, so the micro-batcher would never see
+two predictions together and every request would just wait out the window.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Micro-batching needs concurrent requests inside one worker
+if os.environ.get('PREDICTION_BATCHING', 'False') == 'True':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+
+def _memory():
+    """Return (rss, pss, shared) of this process in MB (Linux only, else None)."""
+    values = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        return None
+    shared = values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0)
+    return values.get('Rss', 0), values.get('Pss', 0), shared
+
+
+def _log_memory(log, label):
+    memory = _memory()
+    if memory is not None:
+        log.info('[%s] %s: RSS %.1f MB, PSS %.1f MB, shared %.1f MB', os.getpid(), label, *memory)
+
+
+def _warm_model():
+    """Load the model and village list and run one prediction in this process."""
+    from land_price_app.ml_helpers import warmup
+    warmup()
+
+
+def when_ready(server):
+    # Runs in the master. With preload_app the Django app is already imported,
+    # so load the model here and let every worker inherit it.
+    if preload_app:
+        _warm_model()
+        _log_memory(server.log, 'master after model load')
+
+
+def post_fork(server, worker):
+    _log_memory(server.log, f'worker {worker.age} before model load')
+
+
+def post_worker_init(worker):
+    # Without preload this is where each worker loads its own copy
+    _warm_model()
+    _log_memory(worker.log, f'worker {worker.age} after model load')
+
+
+def worker_exit(server, worker):
+    # Write the blog views this worker still holds in memory
+    from land_price_app.view_counter import flush_views
+    flush_views()
@@ -1,7 +1,25 @@
 # Import Django admin module
-from django.contrib import admin
+import os
+
+from django.contrib import admin, messages
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.db.models import Q
+from django.shortcuts import redirect, render
+from django.urls import path
 # Import our database models
-from .models import LandPrediction, ContactMessage, BlogPost
+from .models import LandPrediction, ContactMessage, BlogPost, VillagePredictionRollup
+from .forms import LandPredictionForm, PredictionImportForm
+from .admin_changelist import EstimatedCountPaginator, KeysetChangeList, vocabulary_filter
+
+
+# Village filter choices: one row per village in the rollup table
+# (instead of SELECT DISTINCT village over every prediction)
+def _rollup_villages():
+    return VillagePredictionRollup.objects.filter(count__gt=0).values_list('village', flat=True)
+
 
 # Register LandPrediction model with admin panel
 # This decorator tells Django to show this model in admin
@@ -11,13 +29,26 @@ class LandPredictionAdmin(admin.ModelAdmin):
     list_display = ('village', 'area_sqft', 'predicted_price', 'user', 'created_at')
     
     # Add filter sidebar on right side (filter by these fields)
-    list_filter = ('village', 'land_use', 'soil_type', 'created_at')
+    # The choices come from known vocabularies, not from scanning the table
+    list_filter = (
+        vocabulary_filter('village', 'village', _rollup_villages),
+        vocabulary_filter('land_use', 'land use', lambda: [value for value, _ in LandPredictionForm.LAND_USE_CHOICES]),
+        vocabulary_filter('soil_type', 'soil type', lambda: [value for value, _ in LandPredictionForm.SOIL_TYPE_CHOICES]),
+        'created_at',
+    )
     
-    # Add search box (search in these fields)
+    # Add search box (search in these fields, see get_search_results)
     search_fields = ('village', 'user__username')  # user__username means search in user's username
     
-    # Default sorting (newest first)
-    ordering = ('-created_at',)
+    # Default sorting (newest first); id breaks ties so the keyset pages are stable
+    ordering = ('-created_at', '-id')
+
+    # Load each row's user in the same query (one JOIN instead of a query per row)
+    list_select_related = ('user',)
+
+    # Estimated counts instead of COUNT(*) on every page load
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     # Fields that cannot be edited (read-only)
     readonly_fields = ('predicted_price', 'created_at')
@@ -50,6 +81,80 @@ class LandPredictionAdmin(admin.ModelAdmin):
         }),
     )
 
+    # Adds an "Import file" button above the list (see templates/admin/...)
+    change_list_template = 'admin/land_price_app/landprediction/change_list.html'
+
+    # Pages are addressed by a (created_at, id) cursor instead of OFFSET
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    # Search matches the term against the village vocabulary and the (small)
+    # users table, then filters predictions by exact values, which the
+    # village and user indexes can answer. The default search would run
+    # LIKE '%term%' over every prediction.
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip().lower()
+        if not term:
+            return queryset, False
+        villages = [village for village in _rollup_villages() if term in village.lower()]
+        users = User.objects.filter(username__icontains=term).values('pk')
+        return queryset.filter(Q(village__in=villages) | Q(user__in=users)), False
+
+    # Add the import pages to this model's admin URLs (/admin/land_price_app/landprediction/import/)
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='land_price_app_landprediction_import'),
+            path('import/<str:name>/', self.admin_site.admin_view(self.import_status_view),
+                 name='land_price_app_landprediction_import_status'),
+        ]
+        return urls + super().get_urls()
+
+    # Upload a CSV/XLSX of parcels. The rows are scored and saved by a
+    # background process; the request only stores the file and starts it.
+    def import_view(self, request):
+        # Imports create predictions, so they need the "add" permission
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        from .bulk_import import already_imported, save_upload, start_import
+
+        form = PredictionImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            # Stored under its content hash: uploading the same file again
+            # after a failure resumes from the last saved chunk
+            source = save_upload(form.cleaned_data['file'], settings.PREDICTION_IMPORT_DIR)
+            restart = form.cleaned_data['import_again']
+            if already_imported(source) and not restart:
+                messages.warning(request, 'This file was already imported. Tick "Import again" to import it again.')
+                return redirect('admin:land_price_app_landprediction_import')
+
+            if not start_import(source, user=request.user, restart=restart,
+                                check_villages=not form.cleaned_data['allow_unknown_villages']):
+                messages.warning(request, 'This file is already being imported.')
+            return redirect('admin:land_price_app_landprediction_import_status', name=os.path.basename(source))
+
+        return render(request, 'admin/land_price_app/landprediction/import.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Import predictions',
+            'opts': self.model._meta,
+            'form': form,
+        })
+
+    # Progress of a background import (the page reloads itself while it runs)
+    def import_status_view(self, request, name):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        from .bulk_import import UPLOAD_NAME, import_status
+        source = os.path.join(settings.PREDICTION_IMPORT_DIR, name)
+        if not UPLOAD_NAME.match(name) or not os.path.exists(source):
+            raise Http404('No such import.')
+
+        return render(request, 'admin/land_price_app/landprediction/import_status.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Import predictions',
+            'opts': self.model._meta,
+            'status': import_status(source),
+        })
+
 # Register ContactMessage model with admin panel
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
@@ -85,7 +190,7 @@ class BlogPostAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     
     # These fields cannot be edited manually
-    readonly_fields = ('views', 'created_at', 'updated_at')
+    readonly_fields = ('views', 'reading_time', 'created_at', 'updated_at')
     
     # Sort by newest first
     ordering = ('-created_at',)
@@ -102,6 +207,6 @@ class BlogPostAdmin(admin.ModelAdmin):
         }),
         # Section 3: Statistics (read-only)
         ('Statistics', {
-            'fields': ('views', 'created_at', 'updated_at')
+            'fields': ('views', 'reading_time', 'created_at', 'updated_at')
         }),
     )
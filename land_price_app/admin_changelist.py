@@ -0,0 +1,155 @@
+# Admin changelist pieces that stay fast on a very large LandPrediction table.
+#
+# The stock changelist runs, on every load:
+#   - SELECT DISTINCT for each list_filter field (to list the choices)
+#   - COUNT(*) for the paginator, and again for "N total"
+#   - OFFSET n LIMIT m for page n (the database walks all n skipped rows)
+# Here the filter choices come from vocabularies we already have, the count
+# is an estimate (or a count that stops at a cap), and pages are addressed
+# by a (created_at, id) cursor, so page 1000 costs the same as page 1.
+import json
+from datetime import datetime
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+# Query-string parameter holding the keyset cursor ("<created_at>|<id>")
+CURSOR_VAR = 'after'
+
+# Non-PostgreSQL databases count rows up to this many, then show "N+"
+COUNT_CAP = 10000
+
+
+def estimated_count(queryset, cap=COUNT_CAP):
+    """Return (count, is_estimate) without counting a huge table exactly.
+
+    PostgreSQL: the planner's row estimate (table statistics for the whole
+    table, EXPLAIN for a filtered one). Other databases: an exact count
+    that stops after `cap` rows (COUNT over a LIMITed subquery).
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+                # reltuples is -1 (or 0) until the table was first analyzed
+                if row and row[0] > 0:
+                    return int(row[0]), True
+            else:
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]['Plan']['Plan Rows']), True
+        return queryset.count(), False
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count > cap
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count comes from estimated_count() instead of COUNT(*).
+
+    `count_label` is the count as shown: "1234", "about 1234" or "10000+".
+    """
+
+    @cached_property
+    def count(self):
+        count, is_estimate = estimated_count(self.object_list)
+        if not is_estimate:
+            self.count_label = str(count)
+        elif connection.vendor == 'postgresql':
+            self.count_label = f'about {count}'
+        else:
+            self.count_label = f'{count}+'
+        return count
+
+
+def vocabulary_filter(field_name, title, get_values):
+    """Build a list filter whose choices come from get_values() instead of SELECT DISTINCT."""
+
+    class VocabularyListFilter(admin.SimpleListFilter):
+        parameter_name = field_name
+
+        def lookups(self, request, model_admin):
+            return [(value, value) for value in get_values()]
+
+        def queryset(self, request, queryset):
+            if self.value():
+                return queryset.filter(**{field_name: self.value()})
+            return queryset
+
+    VocabularyListFilter.title = title
+    VocabularyListFilter.__name__ = f'{field_name.title().replace("_", "")}VocabularyFilter'
+    return VocabularyListFilter
+
+
+def _parse_cursor(value):
+    """'<created_at ISO>|<id>' -> (datetime, id); raises IncorrectLookupParameters."""
+    try:
+        created_at, pk = value.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError:
+        raise IncorrectLookupParameters(f'Invalid cursor {value!r}')
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList that pages by (created_at, id) cursor while the list is newest first.
+
+    Sorting by another column (clicking a header) falls back to numbered
+    pages, still with an estimated count.
+    """
+
+    def get_filters_params(self, params=None):
+        # The cursor is not a field lookup
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Links that change filters, search or sorting start again at the first page
+        new_params = new_params or {}
+        if CURSOR_VAR not in new_params:
+            remove = list(remove or []) + [CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_results(self, request):
+        self.keyset = ORDER_VAR not in self.params
+        self.cursor = self.params.get(CURSOR_VAR)
+        if not self.keyset:
+            super().get_results(request)
+            self.result_count_label = getattr(self.paginator, 'count_label', str(self.result_count))
+            self.next_page_url = None
+            return
+
+        queryset = self.queryset
+        if self.cursor:
+            created_at, pk = _parse_cursor(self.cursor)
+            # Rows after the cursor in (-created_at, -id) order. Written as a
+            # range plus an exclusion (not "a < x OR (a = x AND id < y)") so the
+            # database walks the created_at index from the cursor onwards
+            queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, pk__gte=pk)
+        # One extra row tells us whether there is a next page
+        rows = list(queryset[:self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.result_count_label = getattr(self.paginator, 'count_label', str(self.result_count))
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_next or bool(self.cursor)
+        self.next_page_url = None
+        if has_next:
+            last = rows[-1]
+            self.next_page_url = self.get_query_string({CURSOR_VAR: f'{last.created_at.isoformat()}|{last.pk}'})
+        self.first_page_url = self.get_query_string(remove=[CURSOR_VAR])
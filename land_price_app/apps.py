@@ -2,4 +2,17 @@ from django.apps import AppConfig
 
 class LandPriceAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'land_price_app'
\ No newline at end of file
+    name = 'land_price_app'
+
+    def ready(self):
+        # Connect the signal handlers (rollup tables are updated on save/delete)
+        from . import signals  # noqa: F401
+        # Register the system checks (checks.py)
+        from . import checks  # noqa: F401
+
+        # Optionally load the model, village list and one prediction now, so
+        # the first request to this process is as fast as the rest
+        from django.conf import settings
+        if getattr(settings, 'ML_WARMUP_ON_STARTUP', False):
+            from .ml_helpers import warmup
+            warmup()
@@ -0,0 +1,142 @@
+# Micro-batching of concurrent prediction requests.
+#
+# When many users submit the form at the same time, every request would run
+# its own one-row model.predict(). Scoring rows together is much cheaper per
+# row, so the MicroBatcher collects the rows that arrive within a small time
+# window (or until the batch is full), runs ONE predict for all of them on a
+# background thread, and hands every caller its own result.
+#
+# predict() blocks (for the normal WSGI views); apredict() can be awaited in
+# async views. A caller that gets no result within `timeout` seconds (stuck
+# or overloaded background thread) scores its input itself - unless its batch
+# has already started, then it keeps waiting for that result.
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+
+class MicroBatcher:
+    """Collect single predictions into small batches scored by one call."""
+
+    def __init__(self, predict_many, max_batch_size=64, max_wait=0.003, timeout=1.0):
+        # Function that takes a list of inputs and returns a list of results
+        self.predict_many = predict_many
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait  # Seconds to wait for more rows after the first one
+        self.timeout = timeout    # Seconds a caller waits before scoring its input itself
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        # Metrics
+        self._batches = 0
+        self._requests = 0
+        self._batch_sizes = {}      # {batch size: how many batches had it}
+        self._total_wait = 0.0      # Sum of queueing delays (seconds)
+        self._max_wait_seen = 0.0   # Longest queueing delay
+        self._timeouts = 0          # Callers that gave up waiting and scored directly
+
+    def _ensure_worker(self):
+        """Start the background thread (again after a fork - threads don't survive it)."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, item):
+        """Queue one input; returns a Future that will hold its result."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def predict(self, item, timeout=None):
+        """Blocking facade: wait for the result of one input (at most `timeout` seconds)."""
+        future = self.submit(item)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            # cancel() fails once the batch thread took the input into a batch:
+            # its result is on the way, so scoring it here would do it twice
+            if not future.cancel():
+                return future.result()
+            with self._lock:
+                self._timeouts += 1
+            return self.predict_many([item])[0]
+
+    async def apredict(self, item):
+        """Async facade: await the result of one input."""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect(self):
+        """Wait for the first item, then gather more until the window ends or the batch is full."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Background loop: collect a batch, score it, deliver the results."""
+        while True:
+            # Mark the inputs as running before scoring them, and drop the ones
+            # whose callers gave up (cancelled) and scored them themselves
+            batch = [entry for entry in self._collect() if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.predict_many(items)
+            except Exception:
+                # One bad input must not fail the whole batch: score each
+                # input alone so every caller gets its own result or error
+                results = None
+            for index, (item, future, queued_at) in enumerate(batch):
+                if results is not None:
+                    future.set_result(results[index])
+                    continue
+                try:
+                    future.set_result(self.predict_many([item])[0])
+                except Exception as exc:
+                    future.set_exception(exc)
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        """Update the batch size and queueing delay metrics."""
+        waits = [started - queued_at for _, _, queued_at in batch]
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._total_wait += sum(waits)
+            self._max_wait_seen = max(self._max_wait_seen, max(waits))
+
+    def stats(self):
+        """Return batch size and queueing delay metrics."""
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'requests': self._requests,
+                'avg_batch_size': self._requests / self._batches if self._batches else 0.0,
+                'batch_sizes': dict(sorted(self._batch_sizes.items())),
+                'avg_queue_ms': self._total_wait / self._requests * 1000 if self._requests else 0.0,
+                'max_queue_ms': self._max_wait_seen * 1000,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'timeouts': self._timeouts,
+            }
@@ -0,0 +1,178 @@
+# Cache for the blog pages.
+#
+# Blog posts change rarely but are read on every blog hit: the list page ran
+# two queries and a COUNT, the detail page a lookup and a related-posts query.
+# Here those results are kept in Django's cache:
+#   list page N    blog:list:<list generation>:<N>       (posts, featured)
+#   post count     blog:list:<list generation>:count     (pages are clamped to it)
+#   detail page    blog:post:<slug>                      (the post)
+#   related posts  blog:related:<category generation>:<slug>
+# The pages themselves are still rendered per request, because they show the
+# logged-in user and a CSRF token.
+#
+# Saving or deleting a BlogPost (signals.py) deletes its detail entry and
+# bumps the list generation and the generation of its category, so the old
+# list and related entries are never read again and simply expire.
+#
+# The cached post carries its view count. When buffered views are written
+# (view_counter.write_views) the detail entries of those posts are deleted,
+# so blog_detail shows the cached count plus the views still in the buffer
+# without reading the database.
+#
+# Settings (see settings.BLOG_CACHE):
+#   ENABLED      False turns the cache off (every request queries the database)
+#   TIMEOUT      seconds an entry stays valid
+#   CACHE_ALIAS  which Django cache to use. It must be shared by all workers
+#                (Redis, Memcached, database, file): with a per-process cache
+#                (LocMemCache, the default without CACHES) invalidation would
+#                only reach the process that saved the post, so the blog
+#                cache stays off (see checks.py).
+from django.core.paginator import Page, Paginator
+
+# Default settings (used for any key missing from settings.BLOG_CACHE)
+DEFAULTS = {
+    'ENABLED': True,
+    'TIMEOUT': 3600,
+    'CACHE_ALIAS': 'default',
+}
+
+# Posts per list page
+POSTS_PER_PAGE = 9
+
+# Related posts shown under a post
+RELATED_POSTS = 2
+
+KEY_PREFIX = 'land_price:blog:'
+
+# Stored for a slug without a post, so unknown slugs don't query every time
+MISSING = 'missing'
+
+# Cache backends that live inside one process
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _config():
+    from django.conf import settings
+    return dict(DEFAULTS, **getattr(settings, 'BLOG_CACHE', {}))
+
+
+def _cache():
+    from django.core.cache import caches
+    return caches[_config()['CACHE_ALIAS']]
+
+
+def shared_cache():
+    """True if the configured cache is shared between processes."""
+    from django.conf import settings
+    alias = _config()['CACHE_ALIAS']
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    return backend not in LOCAL_BACKENDS
+
+
+def enabled():
+    """True if the blog cache is switched on and can be used."""
+    return _config()['ENABLED'] and shared_cache()
+
+
+def _generation(name):
+    """Current generation number of a group of entries ('list' or a category)."""
+    return _cache().get_or_set(f'{KEY_PREFIX}gen:{name}', 1, timeout=None)
+
+
+def _bump(name):
+    """Start a new generation: entries under the old number are no longer read."""
+    key = f'{KEY_PREFIX}gen:{name}'
+    try:
+        _cache().incr(key)
+    except ValueError:
+        # incr() raises ValueError when the key is missing (e.g. evicted)
+        _cache().add(key, 2, timeout=None)
+
+
+def _cached(key, compute):
+    """Return the cached value for key, computing and storing it on a miss."""
+    if not enabled():
+        return compute()
+    cache = _cache()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout=_config()['TIMEOUT'])
+    return value
+
+
+def _page_number(value):
+    """?page= value as a page number (1 for missing or invalid values)."""
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def get_list_page(page_number):
+    """Return (page of non-featured posts, newest featured post or None) for the blog list."""
+    from .models import BlogPost
+    posts = BlogPost.objects.filter(featured=False).order_by('-created_at')
+    generation = _generation('list') if enabled() else 0
+
+    # The page number is clamped to the real pages before it goes into a
+    # key, so ?page=<anything> can't fill the cache with copies of the last page
+    paginator = Paginator([], POSTS_PER_PAGE)
+    paginator.count = _cached(f'{KEY_PREFIX}list:{generation}:count', posts.count)
+    number = min(_page_number(page_number), paginator.num_pages)
+
+    def compute():
+        start = (number - 1) * POSTS_PER_PAGE
+        return {
+            'posts': list(posts[start:start + POSTS_PER_PAGE]),
+            'featured': BlogPost.objects.filter(featured=True).order_by('-created_at').first(),
+        }
+
+    entry = _cached(f'{KEY_PREFIX}list:{generation}:{number}', compute)
+    # Rebuild the Page from the stored count, without a COUNT query
+    return Page(entry['posts'], number, paginator), entry['featured']
+
+
+def get_post(slug):
+    """Return the BlogPost with this slug, or None."""
+    from .models import BlogPost
+
+    def compute():
+        return BlogPost.objects.filter(slug=slug).first() or MISSING
+
+    post = _cached(f'{KEY_PREFIX}post:{slug}', compute)
+    return None if post == MISSING else post
+
+
+def get_related_posts(post):
+    """Return the newest other posts of the same category."""
+    from .models import BlogPost
+
+    def compute():
+        return list(BlogPost.objects.filter(category=post.category)
+                    .exclude(id=post.id).order_by('-created_at')[:RELATED_POSTS])
+
+    generation = _generation(f'category:{post.category}') if enabled() else 0
+    return _cached(f'{KEY_PREFIX}related:{generation}:{post.slug}', compute)
+
+
+def invalidate_post(post, old_slug=None, old_category=None):
+    """Forget everything a saved or deleted post can appear in."""
+    if not enabled():
+        return
+    _cache().delete_many([f'{KEY_PREFIX}post:{slug}' for slug in {post.slug, old_slug} - {None}])
+    _bump('list')
+    for category in {post.category, old_category} - {None}:
+        _bump(f'category:{category}')
+
+
+def forget_posts(post_ids):
+    """Delete the detail entries of these posts (their view counts changed)."""
+    from .models import BlogPost
+    if not enabled() or not post_ids:
+        return
+    slugs = BlogPost.objects.filter(pk__in=post_ids).values_list('slug', flat=True)
+    _cache().delete_many([f'{KEY_PREFIX}post:{slug}' for slug in slugs])
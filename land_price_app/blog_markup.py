@@ -0,0 +1,165 @@
+# Small Markdown renderer for blog posts.
+#
+# Blog content is written in the Markdown subset used by create_sample_blogs:
+#   ## / ### headings (# to ######), paragraphs, "- " / "* " bullet lists,
+#   "1. " numbered lists, "> " quotes, "---" rules, ``` code blocks,
+#   **bold**, *italic*, `code` and [links](https://...).
+# The HTML is made once when a post is saved (BlogPost.save) and stored in
+# BlogPost.content_html, so pages don't process the text on every view.
+# All text is HTML-escaped first; links are only kept for http(s), mailto
+# and site-relative URLs.
+import math
+import re
+from html import unescape
+
+from django.utils.html import escape, strip_tags
+from django.utils.text import Truncator
+
+# Average reading speed used for BlogPost.reading_time
+WORDS_PER_MINUTE = 200
+
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+BULLET_ITEM = re.compile(r'^\s*[-*+]\s+(.*)$')
+NUMBERED_ITEM = re.compile(r'^\s*\d+[.)]\s+(.*)$')
+QUOTE = re.compile(r'^\s*>\s?(.*)$')
+RULE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+FENCE = re.compile(r'^\s*```')
+
+# Inline markup, applied to already escaped text
+CODE_SPAN = re.compile(r'`([^`]+)`')
+BOLD = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+ITALIC = re.compile(r'(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])|(?<![\w_])_(?!\s)(.+?)(?<!\s)_(?![\w_])')
+LINK = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+SAFE_URL = re.compile(r'^(https?://|mailto:|/|#)', re.IGNORECASE)
+
+
+def _link(match):
+    text, url = match.groups()
+    if not SAFE_URL.match(url):
+        return text
+    return f'<a href="{url}">{text}</a>'
+
+
+def render_inline(text):
+    """Escape a line of text and turn its inline markup into HTML."""
+    text = escape(text)
+    # Code spans first, so markup inside them is left alone
+    codes = []
+
+    def keep_code(match):
+        codes.append(f'<code>{match.group(1)}</code>')
+        return f'\x00{len(codes) - 1}\x00'
+
+    text = CODE_SPAN.sub(keep_code, text)
+    text = LINK.sub(_link, text)
+    text = BOLD.sub(lambda m: f'<strong>{m.group(1) or m.group(2)}</strong>', text)
+    text = ITALIC.sub(lambda m: f'<em>{m.group(1) or m.group(2)}</em>', text)
+    return re.sub('\x00(\\d+)\x00', lambda m: codes[int(m.group(1))], text)
+
+
+def render_markdown(text):
+    """Return the HTML for a blog post's Markdown content."""
+    html = []
+    paragraph = []
+    list_tag = None
+    list_items = []
+    quote = []
+
+    def close_paragraph():
+        if paragraph:
+            html.append('<p>' + '<br>\n'.join(render_inline(line) for line in paragraph) + '</p>')
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            items = ''.join(f'<li>{render_inline(item)}</li>' for item in list_items)
+            html.append(f'<{list_tag}>{items}</{list_tag}>')
+            list_tag = None
+            list_items.clear()
+
+    def close_quote():
+        if quote:
+            html.append('<blockquote><p>' + '<br>\n'.join(render_inline(line) for line in quote) + '</p></blockquote>')
+            quote.clear()
+
+    def close_all():
+        close_paragraph()
+        close_list()
+        close_quote()
+
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+
+        if FENCE.match(line):
+            close_all()
+            code = []
+            while index < len(lines) and not FENCE.match(lines[index]):
+                code.append(lines[index])
+                index += 1
+            index += 1  # Skip the closing fence
+            html.append('<pre><code>' + escape('\n'.join(code)) + '</code></pre>')
+            continue
+
+        if not line.strip():
+            close_all()
+            continue
+
+        heading = HEADING.match(line)
+        if heading:
+            close_all()
+            level = len(heading.group(1))
+            html.append(f'<h{level}>{render_inline(heading.group(2))}</h{level}>')
+            continue
+
+        if RULE.match(line):
+            close_all()
+            html.append('<hr>')
+            continue
+
+        bullet = BULLET_ITEM.match(line)
+        numbered = NUMBERED_ITEM.match(line)
+        if bullet or numbered:
+            tag = 'ul' if bullet else 'ol'
+            close_paragraph()
+            close_quote()
+            if list_tag != tag:
+                close_list()
+                list_tag = tag
+            list_items.append((bullet or numbered).group(1))
+            continue
+
+        quoted = QUOTE.match(line)
+        if quoted:
+            close_paragraph()
+            close_list()
+            quote.append(quoted.group(1))
+            continue
+
+        if list_tag and line[:1].isspace():
+            # Indented line right after a list item continues that item
+            list_items[-1] += ' ' + line.strip()
+            continue
+
+        close_list()
+        close_quote()
+        paragraph.append(line.strip())
+
+    close_all()
+    return '\n'.join(html)
+
+
+def reading_time(text):
+    """Minutes needed to read the text (at least 1)."""
+    return max(1, math.ceil(len(text.split()) / WORDS_PER_MINUTE))
+
+
+def make_summary(html, length=300):
+    """Summary from the rendered HTML: the first paragraph as plain text, at most `length` characters."""
+    match = re.search(r'<p>(.*?)</p>', html, re.S)
+    text = strip_tags(match.group(1) if match else html)
+    text = ' '.join(unescape(text).split())
+    return Truncator(text).chars(length)
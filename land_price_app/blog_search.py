@@ -0,0 +1,236 @@
+# Full-text search over blog posts.
+#
+# The index depends on the database:
+#   SQLite      an FTS5 table (land_price_app_blogpost_fts) over title,
+#               summary, content and author, ranked with bm25(). Triggers on
+#               the blog post table keep it in sync on every save and delete.
+#   PostgreSQL  a stored tsvector column (search_vector) computed from the
+#               same fields, with a GIN index, ranked with ts_rank_cd().
+#               PostgreSQL recomputes it on every save.
+#   others      no index: icontains over title, summary and content, with
+#               title matches first.
+# With an index, a search reads only the index entries of the query words, so
+# its cost stays flat as the number of posts grows.
+#
+# The index is created by migration 0007 (with its own copy of the SQL below).
+# On SQLite, a later migration that rebuilds the blog post table drops the
+# triggers and the index stops following edits: missing_triggers() finds
+# that (system check land_price_app.W002), and `manage.py
+# rebuild_blog_search` creates everything again.
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = 'land_price_app_blogpost_fts'
+
+# Column weights: a word in the title counts most, in the content least
+# (SQLite bm25 weights; PostgreSQL uses setweight A-D in the same order)
+SQLITE_WEIGHTS = {'title': 10.0, 'summary': 4.0, 'content': 1.0, 'author': 2.0}
+
+# Results per search and words kept from the query
+MAX_RESULTS = 20
+MAX_TERMS = 8
+
+# Markers around matched words in snippets (replaced by <mark> after escaping)
+MARK_START, MARK_END = '\x02', '\x03'
+
+SQLITE_CREATE = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, summary, content, author,
+        content='land_price_app_blogpost', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER land_price_app_blogpost_fts_insert AFTER INSERT ON land_price_app_blogpost BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, content, author)
+        VALUES (new.id, new.title, new.summary, new.content, new.author);
+    END""",
+    f"""CREATE TRIGGER land_price_app_blogpost_fts_delete AFTER DELETE ON land_price_app_blogpost BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, content, author)
+        VALUES ('delete', old.id, old.title, old.summary, old.content, old.author);
+    END""",
+    # Only when indexed text changes (view count updates don't touch the index)
+    f"""CREATE TRIGGER land_price_app_blogpost_fts_update
+        AFTER UPDATE OF title, summary, content, author ON land_price_app_blogpost BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, content, author)
+        VALUES ('delete', old.id, old.title, old.summary, old.content, old.author);
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, content, author)
+        VALUES (new.id, new.title, new.summary, new.content, new.author);
+    END""",
+    # Index the posts that already exist
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+# Triggers that keep the SQLite index in sync with the posts
+SQLITE_TRIGGERS = (
+    'land_price_app_blogpost_fts_insert',
+    'land_price_app_blogpost_fts_delete',
+    'land_price_app_blogpost_fts_update',
+)
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS land_price_app_blogpost_fts_insert',
+    'DROP TRIGGER IF EXISTS land_price_app_blogpost_fts_delete',
+    'DROP TRIGGER IF EXISTS land_price_app_blogpost_fts_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRES_CREATE = [
+    """ALTER TABLE land_price_app_blogpost ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(author, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'D')
+    ) STORED""",
+    'CREATE INDEX land_price_app_blogpost_search_idx ON land_price_app_blogpost USING GIN (search_vector)',
+]
+
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS land_price_app_blogpost_search_idx',
+    'ALTER TABLE land_price_app_blogpost DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def drop_index(schema_editor):
+    """Remove the search index (table/triggers or column) if it exists."""
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_index(schema_editor):
+    """Create the search index for this database and fill it. Returns False if there is none."""
+    vendor = schema_editor.connection.vendor
+    drop_index(schema_editor)
+    if vendor == 'sqlite':
+        try:
+            for sql in SQLITE_CREATE:
+                schema_editor.execute(sql)
+        except OperationalError:
+            # SQLite built without FTS5: search uses icontains
+            drop_index(schema_editor)
+            return False
+        return True
+    if vendor == 'postgresql':
+        for sql in POSTGRES_CREATE:
+            schema_editor.execute(sql)
+        return True
+    return False
+
+
+def missing_triggers(using=None):
+    """Names of the SQLite sync triggers that are missing while the FTS table exists."""
+    from django.db import connections
+    db = connections[using or 'default']
+    if db.vendor != 'sqlite' or FTS_TABLE not in db.introspection.table_names():
+        return []
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'land_price_app_blogpost'")
+        existing = {name for name, in cursor.fetchall()}
+    return [name for name in SQLITE_TRIGGERS if name not in existing]
+
+
+# search_backend() results per database alias (the schema doesn't change while running)
+_backends = {}
+
+
+def search_backend(refresh=False):
+    """'sqlite', 'postgresql' or 'basic' (no full-text index)."""
+    if refresh or connection.alias not in _backends:
+        backend = 'basic'
+        if connection.vendor == 'sqlite':
+            if FTS_TABLE in connection.introspection.table_names():
+                backend = 'sqlite'
+        elif connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                columns = connection.introspection.get_table_description(cursor, 'land_price_app_blogpost')
+            if any(column.name == 'search_vector' for column in columns):
+                backend = 'postgresql'
+        _backends[connection.alias] = backend
+    return _backends[connection.alias]
+
+
+def query_terms(query):
+    """The words of a search query (letters and digits only, so no query syntax gets through)."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _snippet_html(text):
+    """Escape a snippet and turn the match markers into <mark> tags."""
+    html = escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+def _search_sqlite(terms, limit):
+    # Every word must match; "word"* also matches longer words (price -> prices)
+    match = ' '.join(f'"{term}"*' for term in terms)
+    weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS.values())
+    sql = (
+        f'SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank, '
+        f"snippet({FTS_TABLE}, 2, '{MARK_START}', '{MARK_END}', '…', 24) "
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, limit])
+        # bm25() is negative, lower is better: flip it so higher is better
+        return [(post_id, -rank, snippet) for post_id, rank, snippet in cursor.fetchall()]
+
+
+def _search_postgresql(terms, limit):
+    # Prefix match for every word, all words required
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    # The snippet is made only for the rows that are returned
+    sql = (
+        "SELECT id, rank, ts_headline('english', content, query, %s) FROM ("
+        '  SELECT id, content, query, ts_rank_cd(search_vector, query) AS rank'
+        "  FROM land_price_app_blogpost, to_tsquery('english', %s) AS query"
+        '  WHERE search_vector @@ query ORDER BY rank DESC LIMIT %s'
+        ') AS ranked ORDER BY rank DESC'
+    )
+    options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=12'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [options, tsquery, limit])
+        return cursor.fetchall()
+
+
+def _search_basic(terms, limit):
+    from .models import BlogPost
+    queryset = BlogPost.objects.all()
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(summary__icontains=term) | Q(content__icontains=term))
+    # Posts with the first word in the title first, then the newest
+    queryset = queryset.annotate(rank=Case(When(title__icontains=terms[0], then=Value(1)),
+                                           default=Value(0), output_field=IntegerField()))
+    return [(post.pk, post.rank, post.summary) for post in queryset.order_by('-rank', '-created_at')[:limit]]
+
+
+def search_posts(query, limit=MAX_RESULTS):
+    """Return the blog posts matching a query, best match first.
+
+    Every post gets `search_rank` (higher is better) and `search_snippet`
+    (HTML with the matched words in <mark> tags).
+    """
+    from .models import BlogPost
+    terms = query_terms(query)
+    if not terms:
+        return []
+    backend = search_backend()
+    if backend == 'sqlite':
+        rows = _search_sqlite(terms, limit)
+    elif backend == 'postgresql':
+        rows = _search_postgresql(terms, limit)
+    else:
+        rows = _search_basic(terms, limit)
+
+    posts = BlogPost.objects.in_bulk([post_id for post_id, _, _ in rows])
+    results = []
+    for post_id, rank, snippet in rows:
+        post = posts.get(post_id)
+        if post is None:
+            continue
+        post.search_rank = rank
+        post.search_snippet = _snippet_html(snippet or post.summary)
+        results.append(post)
+    return results
@@ -0,0 +1,368 @@
+# Streaming import of parcel lists (CSV or XLSX) into LandPrediction.
+#
+# The file is read a chunk of rows at a time, so memory stays the same however
+# large it is. For every chunk:
+#   1. the columns are checked against the form vocabularies (one pandas
+#      operation per column, not one form per row)
+#   2. the valid rows are scored with ONE predict_prices() call
+#   3. they are saved with bulk_create() and added to the rollup tables
+#   4. the file's PredictionImport row records how many rows are done
+# Steps 3 and 4 are one transaction. If the import stops (crash, timeout,
+# Ctrl+C) it can be started again with the same file and continues after
+# the last saved chunk, without saving any row twice.
+#
+# The admin upload page doesn't import in the request: start_import() runs
+# `manage.py import_predictions` in a separate process and import_status()
+# reads its progress from the PredictionImport row.
+import csv
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .forms import LandPredictionForm
+from .ml_helpers import get_villages, predict_prices
+from .models import LandPrediction, PredictionImport
+from .rollups import add_predictions
+from .training.dataset import file_hash
+
+# Model fields filled from the file. Headers match them case-insensitively,
+# so both 'area_sqft' and the training workbook's 'Area_sqft' work.
+FIELDS = ('village', 'area_sqft', 'distance_to_city_km', 'road_access', 'water_source',
+          'electricity_available', 'land_use', 'soil_type', 'nearby_development')
+NUMERIC_FIELDS = ('area_sqft', 'distance_to_city_km')
+CHOICE_FIELDS = {
+    'road_access': LandPredictionForm.ROAD_ACCESS_CHOICES,
+    'water_source': LandPredictionForm.WATER_SOURCE_CHOICES,
+    'land_use': LandPredictionForm.LAND_USE_CHOICES,
+    'soil_type': LandPredictionForm.SOIL_TYPE_CHOICES,
+    'nearby_development': LandPredictionForm.DEVELOPMENT_CHOICES,
+}
+
+# Spellings accepted for electricity_available (empty cells count as False)
+TRUE_VALUES = {'true', '1', '1.0', 'yes', 'y'}
+FALSE_VALUES = {'false', '0', '0.0', 'no', 'n', '', 'nan', 'none'}
+
+# File types that can be imported (upload form, upload names and read_chunks)
+CSV_EXTENSIONS = ('.csv',)
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+UPLOAD_EXTENSIONS = CSV_EXTENSIONS + EXCEL_EXTENSIONS
+
+# Validation errors kept in memory for the summary (all of them go to the errors file)
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFileError(ValueError):
+    """Raised when a file can't be imported at all (format, headers)."""
+
+
+# Names given to uploads by save_upload() (used to find a job from its URL)
+UPLOAD_NAME = re.compile(r'^[0-9a-f]{16}(%s)$' % '|'.join(re.escape(extension) for extension in UPLOAD_EXTENSIONS))
+
+
+def save_upload(upload, directory):
+    """Store an uploaded file under its content hash and return the path.
+
+    Uploading the same file again gives the same path (and the same
+    PredictionImport row), so an interrupted import continues where it stopped.
+    """
+    os.makedirs(directory, exist_ok=True)
+    extension = os.path.splitext(upload.name)[1].lower()
+    digest = hashlib.sha256()
+    # A unique temporary name: several requests may upload at the same time
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as f:
+        tmp_path = f.name
+        for piece in upload.chunks():
+            digest.update(piece)
+            f.write(piece)
+    path = os.path.join(directory, f'{digest.hexdigest()[:16]}{extension}')
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, state):
+    """Write a JSON file atomically (temp file + rename)."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _column_map(headers):
+    """Map model field -> file header; raises if a required column is missing."""
+    by_name = {str(header).strip().lower(): header for header in headers if header is not None}
+    missing = [field for field in FIELDS if field not in by_name]
+    if missing:
+        raise ImportFileError(f'Missing columns: {", ".join(missing)}')
+    return {field: by_name[field] for field in FIELDS}
+
+
+def read_chunks(path, chunk_size=2000, skip_rows=0):
+    """Yield (first row number, DataFrame) chunks of a CSV or XLSX file.
+
+    Row numbers are spreadsheet rows (the header is row 1). The first
+    `skip_rows` data rows are skipped without being scored.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in CSV_EXTENSIONS:
+        # Read everything as text; validate_chunk converts the columns
+        reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size,
+                             skiprows=range(1, skip_rows + 1))
+        first_row = skip_rows + 2
+        for chunk in reader:
+            yield first_row, chunk
+            first_row += len(chunk)
+    elif extension in EXCEL_EXTENSIONS:
+        from openpyxl import load_workbook
+        # read_only streams the sheet instead of loading it all
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = next(rows, None)
+            if headers is None:
+                return
+            for _ in range(skip_rows):
+                if next(rows, None) is None:
+                    return
+            first_row = skip_rows + 2
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) == chunk_size:
+                    yield first_row, pd.DataFrame(buffer, columns=headers)
+                    first_row += len(buffer)
+                    buffer = []
+            if buffer:
+                yield first_row, pd.DataFrame(buffer, columns=headers)
+        finally:
+            workbook.close()
+    else:
+        raise ImportFileError(f'Only {", ".join(UPLOAD_EXTENSIONS)} files can be imported.')
+
+
+def _text(column):
+    """A column as stripped strings ('' for empty cells)."""
+    return column.where(column.notna(), '').astype(str).str.strip()
+
+
+def validate_chunk(chunk, columns, villages=None):
+    """Check a chunk column by column.
+
+    Returns (records, row offsets of the valid rows, {row offset: [messages]}).
+    `villages` is the allowed village set (None = any village).
+    """
+    errors = {}
+
+    def reject(mask, message):
+        for offset in mask[mask].index:
+            errors.setdefault(offset, []).append(message)
+
+    chunk = chunk.reset_index(drop=True)
+    data = {}
+    for field in NUMERIC_FIELDS:
+        values = pd.to_numeric(chunk[columns[field]], errors='coerce')
+        # 'inf' parses as a number but can't be scored or stored
+        reject(~np.isfinite(values) | (values < 0), f'{field} must be a finite number >= 0')
+        data[field] = values
+
+    for field, choices in CHOICE_FIELDS.items():
+        values = _text(chunk[columns[field]])
+        if field == 'water_source':
+            # The training workbook leaves the cell empty for "no water source"
+            values = values.replace('', 'None')
+        reject(~values.isin([value for value, _ in choices]), f'{field} must be one of the form choices')
+        data[field] = values
+
+    villages_column = _text(chunk[columns['village']])
+    reject(villages_column == '', 'village is required')
+    reject(villages_column.str.len() > 150, 'village is longer than 150 characters')
+    if villages is not None:
+        reject((villages_column != '') & ~villages_column.isin(villages), 'village is not in the model vocabulary')
+    data['village'] = villages_column
+
+    electricity = _text(chunk[columns['electricity_available']]).str.lower()
+    reject(~electricity.isin(TRUE_VALUES | FALSE_VALUES), 'electricity_available must be yes/no')
+    data['electricity_available'] = electricity.isin(TRUE_VALUES)
+
+    valid = pd.DataFrame(data).drop(index=list(errors))
+    return valid.to_dict('records'), list(valid.index), errors
+
+
+def import_file(path, chunk_size=2000, user=None, restart=False,
+                check_villages=True, errors_path=None, progress=None):
+    """Import a CSV/XLSX file of parcels, scoring and saving it chunk by chunk.
+
+    Resumes after the rows recorded in the file's PredictionImport row unless
+    restart=True. `progress(stats)` is called after every chunk. Returns the
+    stats dict.
+    """
+    state, _ = PredictionImport.objects.get_or_create(source_hash=file_hash(path),
+                                                      defaults={'source': os.path.abspath(path)})
+    if restart:
+        state.rows_done = state.created = state.invalid = 0
+        state.finished = False
+    state.source = os.path.abspath(path)
+    state.save()
+
+    stats = {'rows_done': state.rows_done, 'created': state.created, 'invalid': state.invalid,
+             'resumed_from': state.rows_done, 'rows_per_sec': 0.0, 'seconds': 0.0,
+             'finished': state.finished, 'already_imported': state.finished, 'errors': []}
+    if state.finished:
+        return stats
+
+    # An empty vocabulary means the model has no village list: accept any
+    # village (like the batch API) rather than rejecting every row
+    villages = (set(get_villages()) or None) if check_villages else None
+    columns = None
+    started = time.perf_counter()
+    errors_file = open(errors_path, 'a', newline='') if errors_path else None
+    try:
+        errors_writer = csv.writer(errors_file) if errors_file else None
+        if errors_writer and errors_file.tell() == 0:
+            errors_writer.writerow(['row', 'errors'])
+        for first_row, chunk in read_chunks(path, chunk_size, state.rows_done):
+            if columns is None:
+                columns = _column_map(chunk.columns)
+            records, _, errors = validate_chunk(chunk, columns, villages)
+
+            # One model call for the whole chunk
+            prices = predict_prices(records) if records else []
+            predictions = [
+                LandPrediction(user=user, predicted_price=price, **record)
+                for record, price in zip(records, prices)
+            ]
+            with transaction.atomic():
+                created = LandPrediction.objects.bulk_create(predictions)
+                # bulk_create() sends no signals, so update the rollup tables here
+                add_predictions(created)
+                # Progress is committed together with the chunk's predictions
+                state.rows_done += len(chunk)
+                state.created += len(created)
+                state.invalid += len(errors)
+                state.save(update_fields=['rows_done', 'created', 'invalid', 'updated_at'])
+
+            for offset, messages in sorted(errors.items()):
+                row = first_row + offset
+                if errors_writer:
+                    errors_writer.writerow([row, '; '.join(messages)])
+                if len(stats['errors']) < MAX_REPORTED_ERRORS:
+                    stats['errors'].append((row, messages))
+
+            elapsed = time.perf_counter() - started
+            stats.update(rows_done=state.rows_done, created=state.created, invalid=state.invalid,
+                         seconds=elapsed,
+                         rows_per_sec=(state.rows_done - stats['resumed_from']) / elapsed if elapsed else 0.0)
+            if progress:
+                progress(stats)
+    finally:
+        if errors_file:
+            errors_file.close()
+
+    state.finished = True
+    state.save(update_fields=['finished', 'updated_at'])
+    stats['finished'] = True
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def _job_path(path):
+    return f'{path}.job.json'
+
+
+def _process_running(pid):
+    """True while the process exists (a finished child of this process is reaped)."""
+    try:
+        finished_pid, _ = os.waitpid(pid, os.WNOHANG)
+        return finished_pid == 0
+    except ChildProcessError:
+        pass  # Not started by this process
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def already_imported(path):
+    """True if a file with the same contents was imported completely."""
+    return PredictionImport.objects.filter(source_hash=file_hash(path), finished=True).exists()
+
+
+def start_import(path, user=None, restart=False, check_villages=True):
+    """Import an uploaded file in a background `manage.py import_predictions` process.
+
+    Returns False if an import of this file is already running.
+    """
+    from django.conf import settings
+    job = _read_json(_job_path(path))
+    if job and _process_running(job['pid']):
+        return False
+
+    errors_path = f'{path}.errors.csv'
+    if restart and os.path.exists(errors_path):
+        os.remove(errors_path)
+    command = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'import_predictions', path,
+               '--errors', errors_path]
+    if user is not None:
+        command += ['--user', user.get_username()]
+    if restart:
+        command.append('--restart')
+    if not check_villages:
+        command.append('--allow-unknown-villages')
+
+    with open(f'{path}.log', 'w') as log:
+        # Own session: the import keeps going if the web worker is restarted
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL, start_new_session=True)
+    _write_json(_job_path(path), {'pid': process.pid, 'started': time.time(), 'errors': errors_path})
+    return True
+
+
+def import_status(path):
+    """Progress of the background import of a file, from its PredictionImport row and log.
+
+    'state' is 'running', 'finished' or 'stopped' (the process ended early).
+    """
+    job = _read_json(_job_path(path)) or {}
+    # Uploads are named after their contents, so the path finds the row
+    state = PredictionImport.objects.filter(source=os.path.abspath(path)).first() or PredictionImport()
+    running = bool(job) and _process_running(job['pid'])
+    status = {
+        'state': 'running' if running else 'finished' if state.finished else 'stopped',
+        'rows_done': state.rows_done,
+        'created': state.created,
+        'invalid': state.invalid,
+        'seconds': time.time() - job['started'] if job else 0.0,
+        'errors': [],
+        'log': '',
+    }
+    try:
+        with open(job.get('errors', ''), newline='') as f:
+            status['errors'] = [row for _, row in zip(range(10), csv.DictReader(f))]
+    except OSError:
+        pass
+    if status['state'] == 'stopped':
+        try:
+            with open(f'{path}.log') as f:
+                status['log'] = ''.join(f.readlines()[-20:])
+        except OSError:
+            pass
+    return status
@@ -0,0 +1,35 @@
+# System checks for settings that silently do less than they say
+# (run by `manage.py check`, runserver and migrate).
+from django.core import checks
+
+
+@checks.register(checks.Tags.caches)
+def check_blog_cache(app_configs, **kwargs):
+    """BLOG_CACHE is only used with a cache shared by all workers."""
+    from . import blog_cache
+    if not blog_cache._config()['ENABLED'] or blog_cache.shared_cache():
+        return []
+    return [checks.Warning(
+        'BLOG_CACHE is enabled but its cache is per process (LocMemCache), so '
+        'it is not used: invalidation would only reach one worker.',
+        hint='Configure a shared CACHES backend (Redis, Memcached, database or file) '
+             'or set BLOG_CACHE=False.',
+        id='land_price_app.W001',
+    )]
+
+
+@checks.register(checks.Tags.database)
+def check_blog_search_triggers(app_configs, databases=None, **kwargs):
+    """The SQLite full-text index has the triggers that keep it up to date."""
+    from .blog_search import missing_triggers
+    errors = []
+    for alias in databases or []:
+        missing = missing_triggers(alias)
+        if missing:
+            errors.append(checks.Warning(
+                f"Blog search triggers missing on database {alias!r}: {', '.join(missing)}. "
+                'The search index no longer follows new, edited or deleted posts.',
+                hint='Run `python manage.py rebuild_blog_search`.',
+                id='land_price_app.W002',
+            ))
+    return errors
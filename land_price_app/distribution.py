@@ -0,0 +1,97 @@
+# Histograms (bucket counts) for numeric columns such as predicted_price.
+#
+# Counting is done either by the database - one aggregate query with a
+# COUNT(CASE WHEN ...) per bucket, so no rows are sent to Python - or by NumPy
+# in one vectorized pass over a flat list of values.
+import numpy as np
+from django.db.models import Count, Max, Min, Q
+
+# Names used by the dashboard when it shows the classic 4 price ranges
+DEFAULT_LABELS = ['Low', 'Medium', 'High', 'Premium']
+
+# Limits for the number of buckets a page may ask for
+MIN_BUCKETS = 2
+MAX_BUCKETS = 50
+
+
+def equal_width_edges(low, high, buckets):
+    """Return buckets + 1 evenly spaced edges from low to high."""
+    return [float(edge) for edge in np.linspace(low, high, buckets + 1)]
+
+
+def quantile_edges(values, buckets):
+    """Return buckets + 1 edges so each bucket holds about the same number of values."""
+    values = np.asarray(values, dtype=float)
+    return [float(edge) for edge in np.quantile(values, np.linspace(0, 1, buckets + 1))]
+
+
+def _bucket_filter(field, edges, index):
+    """Return the Q filter for bucket `index`.
+
+    The first bucket also takes values below the lowest edge and the last
+    bucket takes values at or above its lower edge, so every value is counted.
+    """
+    last = len(edges) - 2
+    if index == 0 and index == last:
+        return Q(**{f'{field}__isnull': False})
+    if index == 0:
+        return Q(**{f'{field}__lt': edges[1]})
+    if index == last:
+        return Q(**{f'{field}__gte': edges[index]})
+    return Q(**{f'{field}__gte': edges[index], f'{field}__lt': edges[index + 1]})
+
+
+def bucket_counts(queryset, field, edges):
+    """Count the rows of a queryset per bucket with ONE database query."""
+    aggregates = {
+        f'bucket_{index}': Count('pk', filter=_bucket_filter(field, edges, index))
+        for index in range(len(edges) - 1)
+    }
+    result = queryset.order_by().aggregate(**aggregates)
+    return [result[f'bucket_{index}'] for index in range(len(edges) - 1)]
+
+
+def histogram_from_values(values, edges):
+    """Count values per bucket in one NumPy pass (same bucket rules as bucket_counts)."""
+    values = np.asarray(values, dtype=float)
+    buckets = len(edges) - 1
+    # searchsorted finds each value's bucket using only the inner edges
+    indexes = np.searchsorted(np.asarray(edges[1:-1], dtype=float), values, side='right')
+    return [int(count) for count in np.bincount(indexes, minlength=buckets)[:buckets]]
+
+
+def _labels(edges, labels):
+    """Use the given labels, or build "₹low - ₹high" labels from the edges."""
+    if labels is not None and len(labels) == len(edges) - 1:
+        return list(labels)
+    return [f'₹{low:,.0f} - ₹{high:,.0f}' for low, high in zip(edges[:-1], edges[1:])]
+
+
+def distribution(queryset, field, buckets=4, method='equal', labels=None, low=None, high=None):
+    """Return {'labels', 'data', 'edges'} for a histogram of `field`.
+
+    method='equal' makes equal-width buckets between the lowest and highest
+    value and counts them in the database. The lowest/highest values can be
+    passed in (for example from the rollup tables) to skip one query.
+    method='quantile' makes buckets that hold about the same number of rows;
+    it reads the values as one flat list and counts them with NumPy.
+    """
+    buckets = max(MIN_BUCKETS, min(MAX_BUCKETS, int(buckets)))
+
+    if method == 'quantile':
+        # Only the one column, as a flat float array (no model objects)
+        values = np.fromiter(queryset.order_by().values_list(field, flat=True), dtype=float)
+        if not len(values):
+            return {'labels': _labels([0] * (buckets + 1), labels), 'data': [0] * buckets, 'edges': []}
+        edges = quantile_edges(values, buckets)
+        return {'labels': _labels(edges, labels), 'data': histogram_from_values(values, edges), 'edges': edges}
+
+    if low is None or high is None:
+        limits = queryset.order_by().aggregate(low=Min(field), high=Max(field))
+        low, high = limits['low'], limits['high']
+    if low is None or high is None:
+        # No rows: empty histogram
+        return {'labels': _labels([0] * (buckets + 1), labels), 'data': [0] * buckets, 'edges': []}
+
+    edges = equal_width_edges(low, high, buckets)
+    return {'labels': _labels(edges, labels), 'data': bucket_counts(queryset, field, edges), 'edges': edges}
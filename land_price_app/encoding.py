@@ -0,0 +1,154 @@
+# Turns prediction inputs (dicts from forms/JSON) into model input, without pandas.
+#
+# Everything that doesn't depend on the input is worked out once, when the
+# model is loaded:
+#   - which dict key holds each feature ('Area_sqft', 'area_sqft', ...)
+#   - where each feature sits in the feature order
+#   - the StandardScaler mean/scale of each numeric feature
+#   - a {category: column} dict for each one-hot encoded feature
+# Encoding a row is then a few dict lookups that write straight into a
+# preallocated NumPy matrix - the same matrix the ColumnTransformer would build.
+import numpy as np
+
+
+class FeatureEncoder:
+    """Precompiled feature encoder built from feature_info and the fitted preprocessor."""
+
+    def __init__(self, feature_info, preprocessor=None):
+        self.feature_order = list(feature_info['feature_order'])
+
+        # Key spellings to try for each feature, most likely first:
+        # exact name, first letter lowercase, all lowercase
+        self.key_candidates = []
+        for feature in self.feature_order:
+            candidates = [feature, feature[0].lower() + feature[1:], feature.lower()]
+            self.key_candidates.append(tuple(dict.fromkeys(candidates)))
+        # The spelling that matched last time for each feature (tried first)
+        self._keys = [candidates[0] for candidates in self.key_candidates]
+
+        # Matrix layout, filled in by _compile() if the preprocessor is supported
+        self.n_features = 0
+        self.numeric = []       # [(position in row, output column, mean, scale)]
+        self.categorical = []   # [(position in row, {category: output column})]
+        self.passthrough = []   # [(position in row, output column)]
+        self.can_transform = False
+        if preprocessor is not None:
+            self._compile(preprocessor)
+
+    @classmethod
+    def from_model(cls, model, feature_info):
+        """Build an encoder for a loaded model (matrix output only for supported pipelines)."""
+        steps = getattr(model, 'steps', None)
+        preprocessor = steps[0][1] if steps and len(steps) == 2 else None
+        try:
+            return cls(feature_info, preprocessor)
+        except ValueError:
+            # Unsupported preprocessing: key resolution still works
+            return cls(feature_info)
+
+    def _compile(self, preprocessor):
+        """Read scaler parameters and one-hot vocabularies from a fitted ColumnTransformer."""
+        if not hasattr(preprocessor, 'transformers_'):
+            raise ValueError('Preprocessor is not a fitted ColumnTransformer.')
+        positions = {name: i for i, name in enumerate(self.feature_order)}
+        out = 0  # Next output column
+        for _, transformer, columns in preprocessor.transformers_:
+            if isinstance(transformer, str) and transformer == 'drop':
+                continue
+            columns = list(columns)
+            if any(column not in positions for column in columns):
+                raise ValueError('Preprocessor uses columns that are not in feature_order.')
+            kind = type(transformer).__name__
+            if kind == 'StandardScaler':
+                mean = transformer.mean_ if transformer.with_mean else np.zeros(len(columns))
+                scale = transformer.scale_ if transformer.with_std else np.ones(len(columns))
+                for i, column in enumerate(columns):
+                    self.numeric.append((positions[column], out, float(mean[i]), float(scale[i])))
+                    out += 1
+            elif kind == 'OneHotEncoder':
+                if getattr(transformer, 'drop_idx_', None) is not None:
+                    raise ValueError('OneHotEncoder(drop=...) is not supported.')
+                if any(c is not None for c in getattr(transformer, 'infrequent_categories_', [None])):
+                    raise ValueError('Infrequent category grouping is not supported.')
+                for i, column in enumerate(columns):
+                    vocabulary = {}
+                    for category in transformer.categories_[i]:
+                        vocabulary[category] = out
+                        out += 1
+                    self.categorical.append((positions[column], vocabulary))
+            elif (isinstance(transformer, str) and transformer == 'passthrough') or (
+                    kind == 'FunctionTransformer' and transformer.func is None):
+                for column in columns:
+                    self.passthrough.append((positions[column], out))
+                    out += 1
+            else:
+                raise ValueError(f'Transformer {kind} is not supported.')
+        self.n_features = out
+        self.can_transform = True
+
+    # ----- dict -> ordered values -----
+
+    def resolve(self, data):
+        """Return the feature values of one input dict in feature order."""
+        values = []
+        for i, key in enumerate(self._keys):
+            if key in data:
+                values.append(data[key])
+                continue
+            # This input uses another spelling: find it and remember it
+            for candidate in self.key_candidates[i]:
+                if candidate in data:
+                    self._keys[i] = candidate
+                    values.append(data[candidate])
+                    break
+            else:
+                feature = self.feature_order[i]
+                raise KeyError(f"Feature '{feature}' not found in input data keys: {list(data.keys())}")
+        return values
+
+    # ----- ordered values -> model matrix -----
+
+    def transform(self, rows, out=None):
+        """Encode rows (lists in feature order) into the model's input matrix.
+
+        `out` can be a preallocated float64 array of shape (len(rows), n_features);
+        it is overwritten and returned.
+        """
+        if not self.can_transform:
+            raise ValueError('This model has no supported preprocessor to encode for.')
+        n_rows = len(rows)
+        if out is None:
+            out = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        else:
+            out[:n_rows] = 0.0
+
+        if n_rows == 1:
+            # One row (the web form): plain indexing, no temporary arrays
+            row, target = rows[0], out[0]
+            for position, column, mean, scale in self.numeric:
+                target[column] = (float(row[position]) - mean) / scale
+            for position, vocabulary in self.categorical:
+                # Unknown categories stay all-zero (like handle_unknown='ignore')
+                column = vocabulary.get(row[position])
+                if column is not None:
+                    target[column] = 1.0
+            for position, column in self.passthrough:
+                target[column] = float(row[position])
+            return out
+
+        # Many rows: fill one output column (or one one-hot block) at a time
+        row_indexes = np.arange(n_rows)
+        for position, column, mean, scale in self.numeric:
+            values = np.fromiter((row[position] for row in rows), dtype=np.float64, count=n_rows)
+            out[:n_rows, column] = (values - mean) / scale
+        for position, vocabulary in self.categorical:
+            columns = np.fromiter((vocabulary.get(row[position], -1) for row in rows), dtype=np.intp, count=n_rows)
+            known = columns >= 0
+            out[row_indexes[known], columns[known]] = 1.0
+        for position, column in self.passthrough:
+            out[:n_rows, column] = np.fromiter((row[position] for row in rows), dtype=np.float64, count=n_rows)
+        return out
+
+    def encode(self, records, out=None):
+        """Encode input dicts straight into the model's input matrix."""
+        return self.transform([self.resolve(record) for record in records], out)
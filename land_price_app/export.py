@@ -0,0 +1,139 @@
+# Streaming export of LandPrediction rows as CSV or JSON Lines.
+#
+# Rows are read with QuerySet.iterator(chunk_size=...) (a server-side cursor
+# on PostgreSQL), turned into text a chunk at a time and handed to the caller
+# as a generator. Nothing holds the whole table: memory stays flat and the
+# header is sent before the query even runs, so downloads start at once.
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import LandPrediction
+
+# Exported columns: (output name, queryset field)
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('user', 'user__username'),
+    ('village', 'village'),
+    ('area_sqft', 'area_sqft'),
+    ('distance_to_city_km', 'distance_to_city_km'),
+    ('road_access', 'road_access'),
+    ('water_source', 'water_source'),
+    ('electricity_available', 'electricity_available'),
+    ('land_use', 'land_use'),
+    ('soil_type', 'soil_type'),
+    ('nearby_development', 'nearby_development'),
+    ('predicted_price', 'predicted_price'),
+)
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+# Rows fetched from the database per round trip (and written per output chunk)
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _day_start(day):
+    """Midnight at the start of a date, in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(start=None, end=None, village=None, user=None):
+    """Predictions to export, oldest first, as value tuples in EXPORT_COLUMNS order.
+
+    `start`/`end` are dates (both inclusive). The date filter compares
+    created_at with two datetimes, so an index on created_at can be used.
+    """
+    queryset = LandPrediction.objects.all()
+    if start:
+        queryset = queryset.filter(created_at__gte=_day_start(start))
+    if end:
+        queryset = queryset.filter(created_at__lt=_day_start(end + timedelta(days=1)))
+    if village:
+        queryset = queryset.filter(village=village)
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    # created_at order walks the created_at index: a date range reads only
+    # its own rows, and there is no sort step before the first row
+    return queryset.order_by('created_at').values_list(*(field for _, field in EXPORT_COLUMNS))
+
+
+# Text starting with one of these is run as a formula by spreadsheet programs
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    """Quote text that a spreadsheet would treat as a formula (numbers stay numbers)."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the CSV text (header first) in chunks of about `chunk_size` rows.
+
+    Text values that start like a formula (=, +, -, @) get a leading '.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_cell(value) for value in row])
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _json_value(value):
+    """JSON form of values json can't write itself (datetimes as ISO 8601)."""
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def iter_jsonl(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield one JSON object per line, in chunks of `chunk_size` rows."""
+    names = [name for name, _ in EXPORT_COLUMNS]
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, row)), default=_json_value))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of text chunks on the fly (yields bytes)."""
+    # wbits=31 writes the gzip header/trailer instead of a raw zlib stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        # Flush after every chunk so the client receives data as it is made
+        # (costs a few bytes per chunk of ~2000 rows)
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_chunks(queryset, fmt='csv', compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream a queryset from export_queryset() as CSV/JSONL text or gzip bytes."""
+    rows = queryset.iterator(chunk_size=chunk_size)
+    chunks = iter_csv(rows, chunk_size) if fmt == 'csv' else iter_jsonl(rows, chunk_size)
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode() for chunk in chunks)
+
+
+def export_filename(fmt='csv', compress=False):
+    """Download name such as predictions-20250101-1200.csv.gz."""
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M')
+    return f'predictions-{stamp}.{fmt}' + ('.gz' if compress else '')
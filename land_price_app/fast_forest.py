@@ -0,0 +1,206 @@
+# Fast inference for the trained RandomForest pipeline.
+#
+# scikit-learn's Pipeline.predict() goes through the ColumnTransformer, builds
+# a sparse one-hot matrix and then calls each of the 100 trees separately.
+# For one row that per-call overhead is most of the time.
+#
+# CompiledPipeline copies everything prediction needs out of the fitted
+# pipeline once (when the model is loaded):
+#   - a FeatureEncoder (encoding.py) with the StandardScaler means and scales
+#     and the OneHotEncoder vocabularies as {value: column} dicts
+#   - every tree's split features, thresholds, children and leaf values,
+#     concatenated into flat NumPy arrays
+# and then moves every (row, tree) pair down one level at a time with a few
+# NumPy operations, dropping pairs once they reach a leaf. Results match
+# sklearn to float tolerance.
+import json
+import os
+import pickle
+
+import numpy as np
+
+from .encoding import FeatureEncoder
+
+
+class NotCompilableError(ValueError):
+    """Raised when a model uses parts the compiler doesn't support."""
+
+
+class CompiledPipeline:
+    """A fitted StandardScaler/OneHotEncoder/RandomForest pipeline as flat arrays."""
+
+    # From this many rows on, sklearn's compiled tree code is faster than the
+    # NumPy level-by-level walk, so large batches are handed to the original
+    # regressor (with our encoded matrix, still skipping the ColumnTransformer)
+    LARGE_BATCH_ROWS = 512
+
+    def __init__(self, encoder, forest, regressor=None):
+        # Turns input rows into the model's numeric input matrix
+        self.encoder = encoder
+        # Flat tree arrays (see _compile_forest)
+        self.feature = forest['feature']
+        self.threshold = forest['threshold']
+        self.left = forest['left']
+        self.right = forest['right']
+        self.value = forest['value']
+        self.roots = forest['roots']
+        self.is_leaf = forest['is_leaf']
+        self.max_depth = forest['max_depth']
+        # The fitted sklearn forest, used for large batches (None = never)
+        self.regressor = regressor
+
+    # ----- building -----
+
+    @classmethod
+    def from_pipeline(cls, pipeline, feature_info=None, encoder=None):
+        """Compile a fitted Pipeline(preprocessor=ColumnTransformer, regressor=RandomForest).
+
+        An already built FeatureEncoder for the same model can be passed in.
+        """
+        steps = getattr(pipeline, 'steps', None)
+        if not steps or len(steps) != 2:
+            raise NotCompilableError('Expected a two-step Pipeline (preprocessor, regressor).')
+        preprocessor, regressor = steps[0][1], steps[1][1]
+        if not hasattr(preprocessor, 'transformers_'):
+            raise NotCompilableError('Preprocessor is not a fitted ColumnTransformer.')
+        if not hasattr(regressor, 'estimators_'):
+            raise NotCompilableError('Regressor is not a fitted tree ensemble.')
+
+        if encoder is None:
+            if feature_info is None:
+                # Use the columns in the order the preprocessor lists them
+                feature_order = [column for _, transformer, columns in preprocessor.transformers_
+                                 if not (isinstance(transformer, str) and transformer == 'drop')
+                                 for column in columns]
+                feature_info = {'feature_order': feature_order}
+            try:
+                encoder = FeatureEncoder(feature_info, preprocessor)
+            except ValueError as exc:
+                raise NotCompilableError(str(exc))
+        if not encoder.can_transform:
+            raise NotCompilableError('The preprocessor could not be compiled.')
+        if encoder.n_features != regressor.n_features_in_:
+            raise NotCompilableError('Transformed width does not match the regressor input.')
+        return cls(encoder, _compile_forest(regressor), regressor)
+
+    # ----- shared-memory artifact -----
+
+    # Arrays saved as raw .npy files (memory-mapped read-only when loaded)
+    ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'is_leaf')
+
+    def save(self, directory, version=None):
+        """Write the compiled model as .npy files plus a small metadata file.
+
+        Loading it with load(mmap=True) maps the tree arrays straight from
+        the files, so every worker process shares the same physical memory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAY_NAMES:
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, 'encoder.pkl'), 'wb') as f:
+            pickle.dump(self.encoder, f)
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump({
+                'version': version,
+                'trees': int(len(self.roots)),
+                'nodes': int(len(self.value)),
+                'max_depth': int(self.max_depth),
+                'arrays': list(self.ARRAY_NAMES),
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a model written by save(); mmap=True maps the arrays read-only."""
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+        with open(os.path.join(directory, 'encoder.pkl'), 'rb') as f:
+            encoder = pickle.load(f)
+        forest = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            for name in manifest['arrays']
+        }
+        forest['max_depth'] = manifest['max_depth']
+        # No sklearn regressor: every batch size uses the flat arrays
+        return cls(encoder, forest)
+
+    @property
+    def columns(self):
+        """Input column names in the order rows must use."""
+        return self.encoder.feature_order
+
+    # ----- prediction -----
+
+    def transform(self, X):
+        """Encode a DataFrame, or rows in self.columns order, into the model's input matrix."""
+        if hasattr(X, 'columns'):
+            X = X[self.columns].to_numpy(dtype=object).tolist()
+        return self.encoder.transform(list(X))
+
+    def predict_matrix(self, matrix):
+        """Average all trees' predictions for an already encoded matrix."""
+        if self.regressor is not None and len(matrix) >= self.LARGE_BATCH_ROWS:
+            return self.regressor.predict(matrix)
+        return self.walk_trees(matrix)
+
+    def walk_trees(self, matrix):
+        """Evaluate the flat tree arrays with NumPy (fastest for small batches)."""
+        # Trees compare float32 inputs (like sklearn does) with the thresholds
+        matrix = np.asarray(matrix, dtype=np.float32).astype(np.float64)
+        n_rows, n_trees = matrix.shape[0], len(self.roots)
+        flat = matrix.ravel()
+        # One entry per (row, tree) pair: its current node and where its row starts
+        nodes = np.tile(self.roots, n_rows)
+        row_starts = np.repeat(np.arange(n_rows) * matrix.shape[1], n_trees)
+        # Only pairs that haven't reached a leaf yet are moved down a level
+        active = np.flatnonzero(~self.is_leaf.take(nodes))
+        while active.size:
+            current = nodes.take(active)
+            go_left = flat.take(row_starts.take(active) + self.feature.take(current)) <= self.threshold.take(current)
+            current = np.where(go_left, self.left.take(current), self.right.take(current))
+            nodes[active] = current
+            active = active[~self.is_leaf.take(current)]
+        return self.value.take(nodes).reshape(n_rows, n_trees).mean(axis=1)
+
+    def predict(self, X):
+        """Predict like Pipeline.predict (a DataFrame, or rows in self.columns order)."""
+        return self.predict_matrix(self.transform(X))
+
+
+def _compile_forest(forest):
+    """Concatenate every tree of a fitted forest into flat NumPy arrays."""
+    features, thresholds, lefts, rights, values, roots, leaves = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        # Leaves: point both children at the leaf itself and use feature 0
+        # (the comparison result is ignored because both ways lead back here)
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        values.append(tree.value.reshape(tree.node_count, -1)[:, 0])
+        roots.append(offset)
+        leaves.append(is_leaf)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'left': np.concatenate(lefts).astype(np.intp),
+        'right': np.concatenate(rights).astype(np.intp),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.intp),
+        'is_leaf': np.concatenate(leaves),
+        'max_depth': int(max_depth),
+    }
+
+
+def compile_model(model, feature_info=None, encoder=None):
+    """Return a CompiledPipeline for the model, or None if it can't be compiled."""
+    try:
+        return CompiledPipeline.from_pipeline(model, feature_info, encoder)
+    except NotCompilableError:
+        return None
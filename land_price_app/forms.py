@@ -84,47 +84,10 @@ class LandPredictionForm(forms.ModelForm):
         # Call parent class __init__ to set up basic form
         super().__init__(*args, **kwargs)
         
-        # Load village list from Excel file for dropdown
-        import pandas as pd  # For reading Excel file
-        import os            # For file paths
-        
-        # Get candidate paths to the Excel dataset. We look in two locations:
-        #  - project root (two levels up) — where train_model.py and forms expect it
-        #  - app-level (one level up) — some helpers originally wrote here
-        project_root_path = os.path.join(os.path.dirname(os.path.dirname(__file__)),
-                                         '0a73f94e-90e3-4ebd-9d94-15dc8066ad52.xlsx')
-        app_level_path = os.path.join(os.path.dirname(__file__),
-                                      '0a73f94e-90e3-4ebd-9d94-15dc8066ad52.xlsx')
-
-        # If neither exists, attempt to generate demo artifacts (this will try to
-        # write the dataset to both locations). Ignore errors — we don't want the
-        # site to crash on form load.
-        try:
-            if not os.path.exists(project_root_path) and not os.path.exists(app_level_path):
-                from .training import create_dummy_model as _cdm
-                _cdm.create_dummy_model_artifacts(os.path.dirname(__file__))
-        except Exception:
-            pass
-
-        # Try reading the dataset from the project root first, then fallback to
-        # the app-level file. If neither works, keep villages empty so dropdown
-        # shows the placeholder.
-        villages = []
-        try:
-            if os.path.exists(project_root_path):
-                df = pd.read_excel(project_root_path)
-            elif os.path.exists(app_level_path):
-                df = pd.read_excel(app_level_path)
-            else:
-                df = None
-
-            if df is not None and 'Village' in df.columns:
-                villages = sorted(df['Village'].dropna().unique())
-        except Exception:
-            # If anything goes wrong (file not found, read error, bad data),
-            # keep villages empty. We avoid raising exceptions in form init so the
-            # site doesn't return 500 on render.
-            villages = []
+        # Get the village list for the dropdown. It is loaded once per process
+        # (from the model's feature info) and then served from memory.
+        from .ml_helpers import get_villages
+        villages = get_villages()
         
         # Set village dropdown choices (if any) or a default placeholder
         # Format: [(value, display_name), ...]
@@ -135,6 +98,102 @@ class LandPredictionForm(forms.ModelForm):
             self.fields['village'].widget.choices = [('', 'Select village')]
 
 
+# This form validates ONE row of a batch prediction request (JSON API).
+# It has the same fields as LandPredictionForm, but the village is checked
+# against a set passed in once per batch, so validating thousands of rows
+# doesn't rebuild the village dropdown each time.
+class PredictionRowForm(forms.Form):
+    # Village name (same limit as the LandPrediction.village column)
+    village = forms.CharField(max_length=150)
+
+    # Area and distance must be numbers (not negative)
+    area_sqft = forms.FloatField(min_value=0)
+    distance_to_city_km = forms.FloatField(min_value=0)
+
+    # Dropdown values must be one of the options used by the main form
+    road_access = forms.ChoiceField(choices=LandPredictionForm.ROAD_ACCESS_CHOICES)
+    water_source = forms.ChoiceField(choices=LandPredictionForm.WATER_SOURCE_CHOICES)
+    electricity_available = forms.BooleanField(required=False)
+    land_use = forms.ChoiceField(choices=LandPredictionForm.LAND_USE_CHOICES)
+    soil_type = forms.ChoiceField(choices=LandPredictionForm.SOIL_TYPE_CHOICES)
+    nearby_development = forms.ChoiceField(choices=LandPredictionForm.DEVELOPMENT_CHOICES)
+
+    # Characters that make a spreadsheet treat a cell as a formula
+    FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+    def __init__(self, *args, villages=None, **kwargs):
+        # villages: set of known villages, built once by the caller for the
+        # whole batch (None = the model has no village list)
+        super().__init__(*args, **kwargs)
+        self.villages = villages
+
+    def clean_village(self):
+        village = self.cleaned_data['village'].strip()
+        if village.startswith(self.FORMULA_PREFIXES):
+            raise forms.ValidationError('Village must not start with =, +, - or @.', code='invalid')
+        if self.villages is not None and village not in self.villages:
+            raise forms.ValidationError(f'Unknown village {village!r}: not in the model vocabulary.', code='unknown')
+        return village
+
+
+# Admin upload form for importing a spreadsheet of parcels (see bulk_import.py)
+class PredictionImportForm(forms.Form):
+    # The spreadsheet: same columns as the prediction form (or the training workbook)
+    file = forms.FileField(help_text='CSV or XLSX with columns village, area_sqft, distance_to_city_km, '
+                                     'road_access, water_source, electricity_available, land_use, soil_type, '
+                                     'nearby_development')
+
+    # Villages the model was not trained on are rejected unless this is ticked
+    allow_unknown_villages = forms.BooleanField(required=False)
+
+    # Uploading a file that was already imported does nothing unless this is ticked
+    import_again = forms.BooleanField(required=False, help_text='Import the file again even if it was imported before')
+
+    def clean_file(self):
+        # The file types bulk_import can read (imported here: bulk_import imports this module)
+        from .bulk_import import UPLOAD_EXTENSIONS
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(UPLOAD_EXTENSIONS):
+            raise forms.ValidationError(f'Only {", ".join(UPLOAD_EXTENSIONS)} files can be imported.')
+        return upload
+
+
+# Filters for the prediction export (the export view and `manage.py export_predictions`)
+class PredictionExportForm(forms.Form):
+    # Date range of created_at (both days included)
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+
+    # Only one village / one user's predictions (username)
+    village = forms.CharField(required=False, max_length=150)
+    user = forms.CharField(required=False, max_length=150)
+
+    # Output format and optional gzip compression
+    format = forms.ChoiceField(required=False, choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')])
+    gzip = forms.BooleanField(required=False)
+
+    def clean_format(self):
+        # CSV unless asked otherwise
+        return self.cleaned_data['format'] or 'csv'
+
+    def clean_user(self):
+        # Turn the username into a User (None = all users)
+        username = self.cleaned_data['user']
+        if not username:
+            return None
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise forms.ValidationError(f'User {username!r} does not exist.')
+        return user
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError('start must not be after end.')
+        return cleaned_data
+
+
 # This form handles user registration (sign up)
 class CustomUserCreationForm(UserCreationForm):
     # Add email field (not in default UserCreationForm)
@@ -0,0 +1,74 @@
+import pickle
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from land_price_app.fast_forest import CompiledPipeline, NotCompilableError
+from land_price_app.ml_helpers import MODEL_PATH
+from land_price_app.training import dataset
+
+
+def _timed(func, repeat):
+    """Run func `repeat` times and return the list of durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+class Command(BaseCommand):
+    help = 'Compare sklearn and compiled (flat-array) forest inference: accuracy and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows in the batch test (default 1000)')
+        parser.add_argument('--repeat', type=int, default=50, help='Repetitions of the single-row test (default 50)')
+
+    def handle(self, *args, **options):
+        # Load the pickled pipeline directly (independent of ML_INFERENCE_ENGINE)
+        with open(MODEL_PATH, 'rb') as f:
+            model = pickle.load(f)
+        start = time.perf_counter()
+        try:
+            compiled = CompiledPipeline.from_pipeline(model)
+        except NotCompilableError as exc:
+            raise CommandError(f'Model cannot be compiled: {exc}')
+        compile_seconds = time.perf_counter() - start
+
+        # Sample input rows from the training dataset
+        df = dataset.load_dataset()
+        if 'Water_Source' in df.columns:
+            df['Water_Source'] = df['Water_Source'].fillna('None')
+        X = df[compiled.columns]
+        batch = X.sample(n=options['rows'], replace=True, random_state=0).reset_index(drop=True)
+        one = X.iloc[:1]
+
+        # Accuracy: both engines on the same batch
+        max_diff = float(np.abs(model.predict(batch) - compiled.predict(batch)).max())
+
+        repeat = options['repeat']
+        results = []
+        # 'compiled' hands large batches to sklearn's tree code; 'numpy walk'
+        # shows the pure flat-array evaluation for every batch size
+        engines = (
+            ('sklearn', model.predict),
+            ('compiled', compiled.predict),
+            ('numpy walk', lambda rows: compiled.walk_trees(compiled.transform(rows))),
+        )
+        for name, predict in engines:
+            single = _timed(lambda: predict(one), repeat)
+            batched = _timed(lambda: predict(batch), max(3, repeat // 10))
+            results.append((name, statistics.median(single), statistics.median(batched)))
+
+        self.stdout.write(f'Compiled {len(compiled.roots)} trees / {len(compiled.value)} nodes '
+                          f'in {compile_seconds * 1000:.1f} ms; max |sklearn - compiled| = {max_diff:.3g}')
+        self.stdout.write(f'{"engine":<12} {"1 row (ms)":>12} {f"{len(batch)} rows (ms)":>16} {"rows/sec":>12}')
+        for name, single, batched in results:
+            self.stdout.write(f'{name:<12} {single * 1000:>12.3f} {batched * 1000:>16.2f} {len(batch) / batched:>12.0f}')
+        speedup_single = results[0][1] / results[1][1]
+        speedup_batch = results[0][2] / results[1][2]
+        self.stdout.write(self.style.SUCCESS(
+            f'Compiled engine speed-up: {speedup_single:.1f}x single row, {speedup_batch:.1f}x batch'))
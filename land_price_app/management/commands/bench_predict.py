@@ -0,0 +1,208 @@
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from land_price_app import ml_helpers
+from land_price_app.forms import LandPredictionForm
+from land_price_app.prediction_cache import reset_cache
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _summary(durations, rows_per_call=1):
+    """p50/p95/p99/mean in ms and rows/sec for a list of durations (seconds)."""
+    ordered = sorted(durations)
+    total = sum(ordered)
+    return {
+        'calls': len(ordered),
+        'rows_per_call': rows_per_call,
+        'p50_ms': _percentile(ordered, 0.50) * 1000,
+        'p95_ms': _percentile(ordered, 0.95) * 1000,
+        'p99_ms': _percentile(ordered, 0.99) * 1000,
+        'mean_ms': total / len(ordered) * 1000,
+        'rows_per_sec': len(ordered) * rows_per_call / total if total else 0.0,
+    }
+
+
+def _timed(func, calls):
+    """Call func(i) for i in range(calls) and return the durations in seconds."""
+    durations = []
+    for i in range(calls):
+        start = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _git_commit():
+    """Current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _bench_host():
+    """A host name that passes ALLOWED_HOSTS for the test client requests."""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark model loading, feature preparation, predictions and the /result/ and dashboard pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help='Calls per single-row benchmark (default 200)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Rows per batched call (default 100)')
+        parser.add_argument('--batches', type=int, default=20, help='Batched calls (default 20)')
+        parser.add_argument('--cold', type=int, default=3, help='Cold model loads (default 3)')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per page benchmark (default 50)')
+        parser.add_argument('--output', default='bench_predict.json', help='JSON results file (default bench_predict.json)')
+        parser.add_argument('--baseline', default=None,
+                            help='Earlier results file: fail if any p50 got slower than --max-slowdown')
+        parser.add_argument('--max-slowdown', type=float, default=1.25,
+                            help='Allowed p50 ratio against --baseline (default 1.25)')
+        parser.add_argument('--min-ms', type=float, default=0.05,
+                            help='Ignore regressions of benchmarks whose p50 is below this (timer noise, default 0.05)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the inputs')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        villages = ml_helpers.get_villages()
+        if not villages:
+            raise CommandError('No village vocabulary: run `python manage.py bootstrap_artifacts` first.')
+
+        # Every input is different (area/distance vary), so the prediction
+        # cache never answers for the model
+        def record(i):
+            return {
+                'village': rng.choice(villages),
+                'area_sqft': round(500 + i * 0.37 + rng.random() * 4000, 2),
+                'distance_to_city_km': round(rng.random() * 30, 2),
+                'road_access': rng.choice(LandPredictionForm.ROAD_ACCESS_CHOICES)[0],
+                'water_source': rng.choice(LandPredictionForm.WATER_SOURCE_CHOICES)[0],
+                'electricity_available': rng.random() < 0.7,
+                'land_use': rng.choice(LandPredictionForm.LAND_USE_CHOICES)[0],
+                'soil_type': rng.choice(LandPredictionForm.SOIL_TYPE_CHOICES)[0],
+                'nearby_development': rng.choice(LandPredictionForm.DEVELOPMENT_CHOICES)[0],
+            }
+
+        results = {}
+        self.stdout.write('Loading model...')
+
+        # Cold load: drop the in-process model and read the artifacts again
+        def cold_load(_):
+            ml_helpers.registry.clear()
+            if ml_helpers.load_model()[0] is None:
+                raise CommandError('ML model artifacts not found: run `python manage.py bootstrap_artifacts`.')
+        results['load_model_cold'] = _summary(_timed(cold_load, options['cold']))
+        results['load_model_warm'] = _summary(_timed(lambda _: ml_helpers.load_model(), options['repeat']))
+
+        _, feature_info = ml_helpers.load_model()
+        inputs = [record(i) for i in range(options['repeat'])]
+        results['prepare_features'] = _summary(
+            _timed(lambda i: ml_helpers.prepare_features(inputs[i], feature_info), options['repeat']))
+
+        reset_cache()
+        inputs = [record(i) for i in range(options['repeat'])]
+        results['predict_price'] = _summary(
+            _timed(lambda i: ml_helpers.predict_price(inputs[i]), options['repeat']))
+
+        batch_size = options['batch_size']
+        batches = [[record(i * batch_size + j) for j in range(batch_size)] for i in range(options['batches'])]
+        results['predict_prices_batch'] = _summary(
+            _timed(lambda i: ml_helpers.predict_prices(batches[i]), options['batches']), batch_size)
+
+        self.stdout.write('Timing pages...')
+        results.update(self._bench_pages(record, options['requests']))
+
+        report = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'model': ml_helpers.registry.status(),
+            'settings': {
+                'ML_INFERENCE_ENGINE': getattr(settings, 'ML_INFERENCE_ENGINE', None),
+                'ML_MODEL_FORMAT': getattr(settings, 'ML_MODEL_FORMAT', None),
+                'PREDICTION_BATCHING': getattr(settings, 'PREDICTION_BATCHING', None),
+                'PREDICTION_CACHE': getattr(settings, 'PREDICTION_CACHE', None),
+            },
+            'results': results,
+        }
+
+        self.stdout.write(f'{"benchmark":<22} {"calls":>6} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"rows/sec":>10}')
+        for name, result in results.items():
+            self.stdout.write(f'{name:<22} {result["calls"]:>6} {result["p50_ms"]:>9.3f} {result["p95_ms"]:>9.3f} '
+                              f'{result["p99_ms"]:>9.3f} {result["rows_per_sec"]:>10.0f}')
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['max_slowdown'], options['min_ms'])
+
+    def _bench_pages(self, record, requests):
+        """Time POST /result/ and GET /dashboard/ through the test client.
+
+        Everything runs in a transaction that is rolled back, so the
+        benchmark leaves no predictions or users behind.
+        """
+        results = {}
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'bench-{time.time_ns()}', password=None)
+            client = Client(HTTP_HOST=_bench_host())
+            client.force_login(user)
+            inputs = [record(10 ** 6 + i) for i in range(requests)]
+
+            def post_result(i):
+                response = client.post('/result/', inputs[i])
+                if response.status_code != 200:
+                    raise CommandError(f'/result/ returned {response.status_code}')
+
+            def get_dashboard(_):
+                response = client.get('/dashboard/')
+                if response.status_code != 200:
+                    raise CommandError(f'/dashboard/ returned {response.status_code}')
+
+            results['result_page'] = _summary(_timed(post_result, requests))
+            results['dashboard_page'] = _summary(_timed(get_dashboard, requests))
+            transaction.set_rollback(True)
+        return results
+
+    def _compare(self, results, baseline_path, max_slowdown, min_ms):
+        """Print p50 ratios against an earlier run and fail on regressions."""
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+        regressions = []
+        self.stdout.write(f'{"benchmark":<22} {"baseline":>9} {"now":>9} {"ratio":>7}')
+        for name, result in results.items():
+            if name not in baseline or not baseline[name]['p50_ms']:
+                continue
+            ratio = result['p50_ms'] / baseline[name]['p50_ms']
+            self.stdout.write(f'{name:<22} {baseline[name]["p50_ms"]:>9.3f} {result["p50_ms"]:>9.3f} {ratio:>7.2f}')
+            if ratio > max_slowdown and result['p50_ms'] >= min_ms:
+                regressions.append(f'{name} ({ratio:.2f}x)')
+        if regressions:
+            raise CommandError(f'Slower than {baseline_path}: {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS(f'No p50 regression above {max_slowdown:.2f}x'))
@@ -0,0 +1,22 @@
+import os
+from django.core.management.base import BaseCommand
+from land_price_app import ml_helpers
+from land_price_app.training.create_dummy_model import create_dummy_model_artifacts
+
+class Command(BaseCommand):
+    help = 'Create demo model artifacts and dataset if the trained ones are missing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Replace existing model artifacts with the demo model')
+
+    def handle(self, *args, **options):
+        # Never overwrite a trained model unless asked to
+        if not options['force'] and os.path.exists(ml_helpers.MODEL_PATH) and os.path.exists(ml_helpers.FEATURE_PATH):
+            self.stdout.write('Model artifacts already exist - nothing to do (use --force to replace them).')
+            return
+
+        paths = create_dummy_model_artifacts(os.path.dirname(ml_helpers.__file__))
+        self.stdout.write(self.style.SUCCESS('Created demo artifacts:'))
+        for path in paths:
+            self.stdout.write(f'  {path}')
@@ -0,0 +1,135 @@
+import re
+from urllib.parse import quote
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from land_price_app.models import LandPrediction
+
+# Pages whose database queries are checked: (name, URL). Admin filter values
+# are filled in from the data so the filters match real rows.
+PAGES = (
+    ('home', '/'),
+    ('dashboard', '/dashboard/'),
+    ('dashboard (quantile buckets)', '/dashboard/?method=quantile&buckets=10'),
+    ('admin changelist', '/admin/land_price_app/landprediction/'),
+    ('admin changelist (later page)', '/admin/land_price_app/landprediction/?after={cursor}'),
+    ('admin village filter', '/admin/land_price_app/landprediction/?village={village}'),
+    ('admin land use filter', '/admin/land_price_app/landprediction/?land_use={land_use}'),
+    ('admin soil type filter', '/admin/land_price_app/landprediction/?soil_type={soil_type}'),
+    ('export (last 7 days)', '/predictions/export/?start={week_ago}'),
+    ('export (village, last 7 days)', '/predictions/export/?start={week_ago}&village={village}'),
+)
+
+EXPLAIN_PREFIX = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN ', 'mysql': 'EXPLAIN '}
+
+# SQLite: "SCAN <table>" reads the table; "SCAN <table> USING [COVERING] INDEX" reads an index
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+# PostgreSQL: "Seq Scan on <table>"
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def _explain(sql):
+    """EXPLAIN a captured SQL statement: returns (plan text, tables read in full)."""
+    with connection.cursor() as cursor:
+        cursor.execute(EXPLAIN_PREFIX[connection.vendor] + sql)
+        columns = [column[0].lower() for column in cursor.description]
+        rows = cursor.fetchall()
+    plan = '\n'.join(' '.join(str(value) for value in row) for row in rows)
+    scanned = set()
+    for row in rows:
+        if connection.vendor == 'sqlite':
+            match = SQLITE_SCAN.match(row[-1])
+            if match:
+                scanned.add(match.group(1))
+        elif connection.vendor == 'postgresql':
+            scanned.update(POSTGRES_SCAN.findall(row[0]))
+        else:
+            # MySQL: access type ALL means a full table scan
+            values = dict(zip(columns, row))
+            if values.get('type') == 'ALL':
+                scanned.add(values.get('table'))
+    return plan, scanned
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the prediction queries of the home, dashboard, admin and export pages and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help='Only flag scans when the predictions table has at least this many rows (default 10000)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error if any scan is flagged')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in EXPLAIN_PREFIX:
+            raise CommandError(f'EXPLAIN is not supported for {connection.vendor}.')
+        table = LandPrediction._meta.db_table
+        rows = LandPrediction.objects.count()
+        large = rows >= options['min_rows']
+        self.stdout.write(f'{table}: {rows} rows ({connection.vendor})')
+
+        sample = LandPrediction.objects.order_by().values('village', 'land_use', 'soil_type').first() or {}
+        # A keyset cursor (see admin_changelist.KeysetChangeList) halfway down the list
+        middle = LandPrediction.objects.order_by('-created_at', '-id').values('created_at', 'id')[rows // 2:].first()
+        values = {
+            'cursor': quote(f"{middle['created_at'].isoformat()}|{middle['id']}") if middle else '',
+            'village': sample.get('village', ''),
+            'land_use': sample.get('land_use', ''),
+            'soil_type': sample.get('soil_type', ''),
+            'week_ago': (timezone.localdate() - timedelta(days=7)).isoformat(),
+        }
+
+        flagged = []
+        # The pages run as a throwaway superuser inside a transaction that is
+        # rolled back at the end, so nothing is left in the database
+        with transaction.atomic():
+            user = User.objects.create_superuser(f'plan-check-{timezone.now():%H%M%S%f}', password=None)
+            client = Client(HTTP_HOST='localhost', SERVER_NAME='localhost')
+            client.force_login(user)
+            for name, url in PAGES:
+                url = url.format(**values)
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(url)
+                    if response.streaming:
+                        for _ in response.streaming_content:
+                            pass
+                if response.status_code != 200:
+                    self.stdout.write(self.style.WARNING(f'{name}: {url} returned {response.status_code}, skipped'))
+                    continue
+
+                queries = [query['sql'] for query in captured.captured_queries
+                           if table in query['sql'] and query['sql'].lstrip().upper().startswith('SELECT')]
+                self.stdout.write(f'{name} ({url}): {len(queries)} prediction queries')
+                for sql in queries:
+                    plan, scanned = _explain(sql)
+                    if table in scanned:
+                        flagged.append((name, sql, plan))
+                        status = self.style.ERROR('FULL SCAN') if large else self.style.WARNING('full scan (small table)')
+                    else:
+                        status = self.style.SUCCESS('index')
+                    self.stdout.write(f'  [{status}] {sql[:140]}')
+                    if options['verbose_plans']:
+                        for line in plan.splitlines():
+                            self.stdout.write(f'      {line}')
+            transaction.set_rollback(True)
+
+        if not flagged:
+            self.stdout.write(self.style.SUCCESS('No full scans of the predictions table.'))
+            return
+        message = f'{len(flagged)} queries scan the whole predictions table'
+        if not large:
+            self.stdout.write(self.style.WARNING(f'{message} (fewer than {options["min_rows"]} rows, not flagged).'))
+            return
+        for name, sql, plan in flagged:
+            self.stdout.write(self.style.ERROR(f'{name}: {sql}'))
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+        if options['fail']:
+            raise CommandError(message)
+        self.stdout.write(self.style.ERROR(message))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from land_price_app.fast_forest import NotCompilableError
+from land_price_app.ml_helpers import MODEL_PATH, MODEL_ARRAYS_DIR, export_model_arrays
+
+class Command(BaseCommand):
+    help = 'Export ml_model.pkl as memory-mappable NumPy arrays (for ML_MODEL_FORMAT=arrays)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=MODEL_PATH, help='Pickled model to export')
+        parser.add_argument('--output', default=MODEL_ARRAYS_DIR, help='Folder for the exported versions')
+
+    def handle(self, *args, **options):
+        try:
+            version, folder = export_model_arrays(options['model'], options['output'])
+        except NotCompilableError as exc:
+            raise CommandError(f'Model cannot be exported: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Exported model version {version} to {folder}'))
@@ -0,0 +1,52 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from land_price_app.export import DEFAULT_CHUNK_SIZE, FORMATS, export_chunks, export_queryset
+from land_price_app.forms import PredictionExportForm
+
+
+class Command(BaseCommand):
+    help = 'Export predictions as CSV or JSON Lines (streamed, optionally gzipped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help='Output file (default: stdout)')
+        parser.add_argument('--format', choices=FORMATS, default='csv', help='csv (default) or jsonl')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--start', default='', help='First day (YYYY-MM-DD)')
+        parser.add_argument('--end', default='', help='Last day (YYYY-MM-DD)')
+        parser.add_argument('--village', default='', help='Only this village')
+        parser.add_argument('--user', default='', help="Only this user's predictions (username)")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f'Rows per database fetch (default {DEFAULT_CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        # Same validation as the export endpoint
+        form = PredictionExportForm({
+            'start': options['start'], 'end': options['end'], 'village': options['village'],
+            'user': options['user'], 'format': options['format'], 'gzip': options['gzip'],
+        })
+        if not form.is_valid():
+            raise CommandError('; '.join(f'{field}: {" ".join(errors)}' for field, errors in form.errors.items()))
+        filters = form.cleaned_data
+        queryset = export_queryset(filters['start'], filters['end'], filters['village'], filters['user'])
+        chunks = export_chunks(queryset, filters['format'], filters['gzip'], options['chunk_size'])
+
+        started = time.perf_counter()
+        written = 0
+        to_stdout = options['output'] == '-'
+        output = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if to_stdout:
+                output.flush()
+            else:
+                output.close()
+
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(
+                f'Wrote {written / 1024 / 1024:.1f} MB to {options["output"]} in {time.perf_counter() - started:.1f}s'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from land_price_app.view_counter import get_counter
+
+
+class Command(BaseCommand):
+    help = 'Write buffered blog post views to the database (run on shutdown or from cron)'
+
+    def handle(self, *args, **options):
+        counter = get_counter()
+        if counter.backend == 'local':
+            # A per-process buffer lives in the web workers, not in this command
+            self.stdout.write(self.style.WARNING(
+                "BLOG_VIEW_COUNTER uses the 'local' backend: each worker writes its own "
+                'views every FLUSH_INTERVAL seconds and when it exits. Nothing to flush here.'))
+            return
+        pending = counter.pending()
+        written = counter.flush()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} views for {len(pending)} posts ({counter.backend} backend)'))
@@ -0,0 +1,174 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from land_price_app.forms import LandPredictionForm
+from land_price_app.ml_helpers import get_villages, predict_prices
+from land_price_app.models import LandPrediction
+from land_price_app.rollups import add_predictions, rebuild_rollups
+
+# Distributions accepted by --area/--distance, with the meaning of their two numbers
+DISTRIBUTIONS = {
+    'uniform': 'low:high',
+    'normal': 'mean:std',
+    'lognormal': 'mean:sigma (of the log)',
+}
+
+
+def distribution(spec):
+    """argparse type for 'name:a:b' specs, e.g. 'uniform:1000:10000'."""
+    try:
+        name, a, b = spec.split(':')
+        a, b = float(a), float(b)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected name:a:b, got {spec!r}')
+    if name not in DISTRIBUTIONS:
+        raise argparse.ArgumentTypeError(f'unknown distribution {name!r} (use {", ".join(DISTRIBUTIONS)})')
+    return name, a, b
+
+
+def sample(rng, spec, size, minimum):
+    """Draw `size` values from a distribution spec, rounded to 2 decimals and at least `minimum`."""
+    name, a, b = spec
+    if name == 'uniform':
+        values = rng.uniform(a, b, size)
+    elif name == 'normal':
+        values = rng.normal(a, b, size)
+    else:
+        values = rng.lognormal(a, b, size)
+    return np.round(np.maximum(values, minimum), 2)
+
+
+def set_created_at(predictions, dates):
+    """Store generated dates in created_at of already inserted predictions.
+
+    created_at is auto_now_add, so bulk_create() saves "now". One
+    parameterized UPDATE run with executemany() per chunk rewrites it
+    (bulk_update() builds a CASE expression per row and is several times slower).
+    """
+    field = LandPrediction._meta.get_field('created_at')
+    quote = connection.ops.quote_name
+    sql = (f'UPDATE {quote(LandPrediction._meta.db_table)} SET {quote(field.column)} = %s '
+           f'WHERE {quote(LandPrediction._meta.pk.column)} = %s')
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(field.get_db_prep_save(date, connection), prediction.pk)
+                                 for prediction, date in zip(predictions, dates)])
+    for prediction, date in zip(predictions, dates):
+        prediction.created_at = date
+
+
+def parse_date(value):
+    """argparse type for YYYY-MM-DD dates (as aware datetimes at midnight)."""
+    try:
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected YYYY-MM-DD, got {value!r}')
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic LandPrediction rows for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000, help='Rows to create (default 100000)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk_create (default 5000)')
+        parser.add_argument('--area', type=distribution, default=('uniform', 1000, 10000),
+                            help='Area (sqft) distribution as name:a:b (default uniform:1000:10000)')
+        parser.add_argument('--distance', type=distribution, default=('uniform', 0.5, 40),
+                            help='Distance (km) distribution as name:a:b (default uniform:0.5:40)')
+        parser.add_argument('--electricity-rate', type=float, default=0.5,
+                            help='Share of rows with electricity (default 0.5)')
+        parser.add_argument('--start', type=parse_date, default=None,
+                            help='Earliest created_at as YYYY-MM-DD (default one year ago)')
+        parser.add_argument('--end', type=parse_date, default=None, help='Latest created_at as YYYY-MM-DD (default now)')
+        parser.add_argument('--score', action='store_true',
+                            help='Score every row with the real model (slower, plausible prices)')
+        parser.add_argument('--price-range', type=float, nargs=2, default=(300, 1500), metavar=('LOW', 'HIGH'),
+                            help='Uniform predicted_price range without --score (default 300 1500)')
+        parser.add_argument('--rollups', choices=['rebuild', 'add'], default='rebuild',
+                            help='rebuild: recompute the rollup tables once at the end (fastest for many rows); '
+                                 'add: add every chunk to them as it is inserted')
+        parser.add_argument('--user', default=None, help='Username to own the rows (default: no user)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed (for repeatable data)')
+
+    def handle(self, *args, **options):
+        count, chunk_size = options['count'], options['chunk_size']
+        if count < 1 or chunk_size < 1:
+            raise CommandError('--count and --chunk-size must be positive.')
+
+        end = options['end'] or timezone.now()
+        start = options['start'] or end - timedelta(days=365)
+        if start >= end:
+            raise CommandError('--start must be before --end.')
+
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"User {options['user']!r} does not exist.")
+
+        # Vocabularies: the villages the model knows and the form's choices
+        vocabularies = {
+            'village': [village for village in get_villages() if village],
+            'road_access': [value for value, _ in LandPredictionForm.ROAD_ACCESS_CHOICES],
+            'water_source': [value for value, _ in LandPredictionForm.WATER_SOURCE_CHOICES],
+            'land_use': [value for value, _ in LandPredictionForm.LAND_USE_CHOICES],
+            'soil_type': [value for value, _ in LandPredictionForm.SOIL_TYPE_CHOICES],
+            'nearby_development': [value for value, _ in LandPredictionForm.DEVELOPMENT_CHOICES],
+        }
+        if not vocabularies['village']:
+            raise CommandError('No village vocabulary: run `python manage.py bootstrap_artifacts` first.')
+
+        rng = np.random.default_rng(options['seed'])
+        span = (end - start).total_seconds()
+
+        started = time.perf_counter()
+        created = 0
+        while created < count:
+            size = min(chunk_size, count - created)
+            rows = self._rows(rng, size, vocabularies, options)
+            if options['score']:
+                try:
+                    prices = predict_prices(rows)
+                except RuntimeError as exc:
+                    raise CommandError(str(exc))
+            else:
+                prices = np.round(rng.uniform(*options['price_range'], size), 2).tolist()
+            dates = [start + timedelta(seconds=float(offset)) for offset in rng.uniform(0, span, size)]
+
+            predictions = [
+                LandPrediction(user=user, predicted_price=price, **row)
+                for row, price in zip(rows, prices)
+            ]
+            # One transaction per chunk: the rows and their rollup totals together
+            with transaction.atomic():
+                LandPrediction.objects.bulk_create(predictions, batch_size=chunk_size)
+                # The INSERT stored "now" (auto_now_add); write the spread-out dates
+                set_created_at(predictions, dates)
+                if options['rollups'] == 'add':
+                    add_predictions(predictions)
+            created += size
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{created}/{count} rows ({created / elapsed:.0f} rows/sec)')
+
+        if options['rollups'] == 'rebuild':
+            # Two GROUP BY queries instead of one UPDATE per day/village per chunk
+            self.stdout.write('Rebuilding rollups...')
+            rebuild_rollups()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} predictions in {time.perf_counter() - started:.1f}s'))
+
+    def _rows(self, rng, size, vocabularies, options):
+        """Build `size` input dicts (model inputs, without price/user/date)."""
+        columns = {name: rng.choice(values, size).tolist() for name, values in vocabularies.items()}
+        columns['area_sqft'] = sample(rng, options['area'], size, 1).tolist()
+        columns['distance_to_city_km'] = sample(rng, options['distance'], size, 0).tolist()
+        columns['electricity_available'] = (rng.random(size) < options['electricity_rate']).tolist()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
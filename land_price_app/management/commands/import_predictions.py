@@ -0,0 +1,57 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from land_price_app.bulk_import import ImportFileError, import_file
+
+
+class Command(BaseCommand):
+    help = 'Score and save a CSV/XLSX file of parcels as predictions (streamed in chunks, resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file (headers: village, area_sqft, distance_to_city_km, ...)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows per chunk (default 2000)')
+        parser.add_argument('--user', default=None, help='Username to own the predictions (default: no user)')
+        parser.add_argument('--restart', action='store_true', help='Ignore earlier progress and start from the first row')
+        parser.add_argument('--allow-unknown-villages', action='store_true',
+                            help='Accept villages the model has not seen (they get no village signal)')
+        parser.add_argument('--errors', default=None, help='Append invalid rows (row number, reasons) to this CSV file')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"User {options['user']!r} does not exist.")
+
+        def progress(stats):
+            self.stdout.write(f"{stats['rows_done']} rows read, {stats['created']} saved, "
+                              f"{stats['invalid']} invalid ({stats['rows_per_sec']:.0f} rows/sec)")
+
+        try:
+            stats = import_file(
+                options['path'],
+                chunk_size=options['chunk_size'],
+                user=user,
+                restart=options['restart'],
+                check_villages=not options['allow_unknown_villages'],
+                errors_path=options['errors'],
+                progress=progress,
+            )
+        except (ImportFileError, OSError) as exc:
+            raise CommandError(str(exc))
+        except RuntimeError as exc:
+            # predict_prices() without model artifacts
+            raise CommandError(str(exc))
+
+        if stats['already_imported']:
+            self.stdout.write(self.style.WARNING('This file was already imported (use --restart to import it again).'))
+            return
+        if stats['resumed_from']:
+            self.stdout.write(f"Resumed after the {stats['resumed_from']} rows imported earlier.")
+        for row, messages in stats['errors'][:20]:
+            self.stdout.write(self.style.WARNING(f"Row {row}: {'; '.join(messages)}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['created']} predictions ({stats['invalid']} invalid rows) "
+            f"in {stats['seconds']:.1f}s"))
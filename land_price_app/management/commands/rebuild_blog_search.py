@@ -0,0 +1,30 @@
+from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+
+from land_price_app.blog_search import create_index, missing_triggers, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Create the blog full-text search index again and fill it from all posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only check that the SQLite index triggers exist (exit status 1 if not)')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            missing = missing_triggers()
+            if missing:
+                raise CommandError(f"Missing blog search triggers: {', '.join(missing)}. "
+                                   'Run rebuild_blog_search without --check.')
+            self.stdout.write(self.style.SUCCESS('Blog search index triggers are in place'))
+            return
+
+        # The schema editor runs the statements in one transaction
+        with connection.schema_editor() as schema_editor:
+            created = create_index(schema_editor)
+        if not created:
+            self.stdout.write(self.style.WARNING(
+                f'No full-text index for {connection.vendor}; blog search uses icontains.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the blog search index ({search_backend(refresh=True)})'))
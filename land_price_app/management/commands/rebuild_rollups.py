@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from land_price_app.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = ('Rebuild the daily and village prediction rollup tables from all predictions '
+            '(needed after QuerySet.update(), bulk_update() or raw SQL writes, which send no signals)')
+
+    def handle(self, *args, **options):
+        days, villages = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups: {days} days, {villages} villages'))
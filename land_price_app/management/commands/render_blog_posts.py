@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from land_price_app.models import BlogPost
+
+
+class Command(BaseCommand):
+    help = ('Render blog post content to HTML and fill in summaries and reading times '
+            '(migration 0009 does this once; use --all after the renderer changes)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Render every post again (e.g. after the renderer changed), not only unrendered ones')
+
+    def handle(self, *args, **options):
+        posts = BlogPost.objects.all()
+        if not options['all']:
+            posts = posts.filter(content_html='')
+        rendered = 0
+        for post in posts.iterator():
+            # save() renders the content (once) when 'summary' is in update_fields
+            # and saves the HTML and reading time with it. save(), not update(),
+            # so the blog cache is invalidated by the signals; updated_at is
+            # left as it was
+            post.save(update_fields=['summary'])
+            rendered += 1
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} blog posts'))
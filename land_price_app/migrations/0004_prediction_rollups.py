@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:53
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_rollups(apps, schema_editor):
+    # Fill the new rollup tables from the predictions that already exist
+    # (a frozen copy of rollups.rebuild_rollups: two GROUP BY queries)
+    LandPrediction = apps.get_model('land_price_app', 'LandPrediction')
+    DailyPredictionRollup = apps.get_model('land_price_app', 'DailyPredictionRollup')
+    VillagePredictionRollup = apps.get_model('land_price_app', 'VillagePredictionRollup')
+    db_alias = schema_editor.connection.alias
+
+    def aggregates():
+        return {
+            'count': Count('id'),
+            'sum_price': Sum('predicted_price'),
+            'sum_value': Sum(F('predicted_price') * F('area_sqft')),
+            'sum_area': Sum('area_sqft'),
+            'sum_distance': Sum('distance_to_city_km'),
+            'electricity_count': Count('id', filter=Q(electricity_available=True)),
+            'min_price': Min('predicted_price'),
+            'max_price': Max('predicted_price'),
+        }
+
+    predictions = LandPrediction.objects.using(db_alias).order_by()
+    daily_rows = predictions.annotate(day=TruncDate('created_at')).values('day').annotate(**aggregates())
+    DailyPredictionRollup.objects.using(db_alias).bulk_create(
+        [DailyPredictionRollup(**row) for row in daily_rows], batch_size=500)
+    village_rows = predictions.values('village').annotate(**aggregates())
+    VillagePredictionRollup.objects.using(db_alias).bulk_create(
+        [VillagePredictionRollup(**row) for row in village_rows], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_price_app', '0003_blogpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPredictionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.BigIntegerField(default=0)),
+                ('sum_price', models.FloatField(default=0)),
+                ('sum_value', models.FloatField(default=0)),
+                ('sum_area', models.FloatField(default=0)),
+                ('sum_distance', models.FloatField(default=0)),
+                ('electricity_count', models.BigIntegerField(default=0)),
+                ('min_price', models.FloatField(blank=True, null=True)),
+                ('max_price', models.FloatField(blank=True, null=True)),
+                ('day', models.DateField(unique=True)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VillagePredictionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.BigIntegerField(default=0)),
+                ('sum_price', models.FloatField(default=0)),
+                ('sum_value', models.FloatField(default=0)),
+                ('sum_area', models.FloatField(default=0)),
+                ('sum_distance', models.FloatField(default=0)),
+                ('electricity_count', models.BigIntegerField(default=0)),
+                ('min_price', models.FloatField(blank=True, null=True)),
+                ('max_price', models.FloatField(blank=True, null=True)),
+                ('village', models.CharField(max_length=150, unique=True)),
+            ],
+            options={
+                'ordering': ['village'],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
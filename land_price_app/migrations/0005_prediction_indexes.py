@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_price_app', '0004_prediction_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='landprediction',
+            index=models.Index(fields=['created_at', 'village', 'predicted_price'], name='lp_created_cover_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landprediction',
+            index=models.Index(fields=['village', '-created_at'], name='lp_village_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landprediction',
+            index=models.Index(fields=['land_use', '-created_at'], name='lp_land_use_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landprediction',
+            index=models.Index(fields=['soil_type', '-created_at'], name='lp_soil_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landprediction',
+            index=models.Index(fields=['electricity_available', 'created_at'], name='lp_elec_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landprediction',
+            index=models.Index(fields=['predicted_price'], name='lp_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landprediction',
+            index=models.Index(fields=['area_sqft'], name='lp_area_idx'),
+        ),
+    ]
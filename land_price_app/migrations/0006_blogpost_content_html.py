@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_price_app', '0005_prediction_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='blogpost',
+            name='content',
+            field=models.TextField(help_text='Full blog post content (Markdown: ## headings, **bold**, - lists)'),
+        ),
+        migrations.AlterField(
+            model_name='blogpost',
+            name='summary',
+            field=models.TextField(blank=True, help_text='Short summary for blog listing (empty = first paragraph)', max_length=300),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Full-text search index for blog posts (see land_price_app/blog_search.py):
+# an FTS5 table with triggers on SQLite, a tsvector column with a GIN index on
+# PostgreSQL, nothing on other databases.
+#
+# The SQL is copied here, not imported, so this migration keeps doing the
+# same thing when blog_search.py changes.
+
+from django.db import OperationalError, migrations
+
+SQLITE_CREATE = [
+    """CREATE VIRTUAL TABLE land_price_app_blogpost_fts USING fts5(
+        title, summary, content, author,
+        content='land_price_app_blogpost', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER land_price_app_blogpost_fts_insert AFTER INSERT ON land_price_app_blogpost BEGIN
+        INSERT INTO land_price_app_blogpost_fts(rowid, title, summary, content, author)
+        VALUES (new.id, new.title, new.summary, new.content, new.author);
+    END""",
+    """CREATE TRIGGER land_price_app_blogpost_fts_delete AFTER DELETE ON land_price_app_blogpost BEGIN
+        INSERT INTO land_price_app_blogpost_fts(land_price_app_blogpost_fts, rowid, title, summary, content, author)
+        VALUES ('delete', old.id, old.title, old.summary, old.content, old.author);
+    END""",
+    """CREATE TRIGGER land_price_app_blogpost_fts_update
+        AFTER UPDATE OF title, summary, content, author ON land_price_app_blogpost BEGIN
+        INSERT INTO land_price_app_blogpost_fts(land_price_app_blogpost_fts, rowid, title, summary, content, author)
+        VALUES ('delete', old.id, old.title, old.summary, old.content, old.author);
+        INSERT INTO land_price_app_blogpost_fts(rowid, title, summary, content, author)
+        VALUES (new.id, new.title, new.summary, new.content, new.author);
+    END""",
+    "INSERT INTO land_price_app_blogpost_fts(land_price_app_blogpost_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS land_price_app_blogpost_fts_insert',
+    'DROP TRIGGER IF EXISTS land_price_app_blogpost_fts_delete',
+    'DROP TRIGGER IF EXISTS land_price_app_blogpost_fts_update',
+    'DROP TABLE IF EXISTS land_price_app_blogpost_fts',
+]
+
+POSTGRES_CREATE = [
+    """ALTER TABLE land_price_app_blogpost ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(author, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'D')
+    ) STORED""",
+    'CREATE INDEX land_price_app_blogpost_search_idx ON land_price_app_blogpost USING GIN (search_vector)',
+]
+
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS land_price_app_blogpost_search_idx',
+    'ALTER TABLE land_price_app_blogpost DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            for sql in SQLITE_CREATE:
+                schema_editor.execute(sql)
+        except OperationalError:
+            # SQLite built without FTS5: search uses icontains
+            drop_search_index(apps, schema_editor)
+    elif vendor == 'postgresql':
+        for sql in POSTGRES_CREATE:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_price_app', '0006_blogpost_content_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
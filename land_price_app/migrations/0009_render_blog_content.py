@@ -0,0 +1,36 @@
+# Fill in content_html, reading_time and empty summaries (added in 0006) for
+# the posts saved before BlogPost.save() rendered them. Same result as
+# `manage.py render_blog_posts`, which is still there to render every post
+# again after the renderer changes.
+#
+# blog_markup only turns text into HTML (no models), so it is imported
+# rather than copied.
+
+from django.db import migrations
+
+
+def render_posts(apps, schema_editor):
+    from land_price_app.blog_markup import make_summary, reading_time, render_markdown
+    BlogPost = apps.get_model('land_price_app', 'BlogPost')
+    db_alias = schema_editor.connection.alias
+    posts = BlogPost.objects.using(db_alias).filter(content_html='')
+    for post in posts.only('id', 'content', 'summary').iterator():
+        content_html = render_markdown(post.content)
+        # update() leaves updated_at as it was
+        BlogPost.objects.using(db_alias).filter(pk=post.pk).update(
+            content_html=content_html,
+            reading_time=reading_time(post.content),
+            summary=post.summary if post.summary.strip() else make_summary(content_html),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_price_app', '0008_prediction_import'),
+    ]
+
+    operations = [
+        # Nothing to undo: 0006 drops the columns when migrating back past it
+        migrations.RunPython(render_posts, migrations.RunPython.noop),
+    ]
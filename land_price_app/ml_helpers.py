@@ -1,104 +1,514 @@
 # Import necessary libraries
 import os      # For file path operations
 import pickle  # For loading saved ML model
+import hashlib    # For fingerprinting the model file (model version)
+import threading  # For a lock so only one thread reloads the model at a time
+import time       # For load timings and reload checks
+from collections import namedtuple, deque  # Small helper containers
 import pandas as pd  # For data manipulation (DataFrame)
+from .prediction_cache import get_cache as get_prediction_cache  # Cache of recent predictions
+from .fast_forest import CompiledPipeline, compile_model  # Optional flat-array inference engine
+from .encoding import FeatureEncoder  # Input dicts -> model input matrix without pandas
+from .batching import MicroBatcher  # Scores concurrent requests together
+
+# Paths to the saved model and the feature information
+MODEL_PATH = os.path.join(os.path.dirname(__file__), 'training', 'ml_model.pkl')
+FEATURE_PATH = os.path.join(os.path.dirname(__file__), 'training', 'feature_info.pkl')
+
+# Shared-memory model format: one folder of raw .npy arrays per model version,
+# and a CURRENT file naming the version to serve (see export_model_arrays)
+MODEL_ARRAYS_DIR = os.path.join(os.path.dirname(__file__), 'training', 'model_arrays')
+MODEL_ARRAYS_POINTER = os.path.join(MODEL_ARRAYS_DIR, 'CURRENT')
+
+# The Excel dataset can live in the project root (where train_model.py reads it)
+# or in the app folder (where the demo helper also writes it)
+DATASET_FILENAME = '0a73f94e-90e3-4ebd-9d94-15dc8066ad52.xlsx'
+DATASET_PATHS = [
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), DATASET_FILENAME),
+    os.path.join(os.path.dirname(__file__), DATASET_FILENAME),
+]
+
+# One loaded version of the artifacts. The registry swaps the whole tuple at
+# once, so a request never sees a new model with old feature info.
+LoadedModel = namedtuple('LoadedModel', [
+    'model',          # The trained pipeline (or demo model)
+    'feature_info',   # Feature order and encoding info
+    'version',        # Short content hash of ml_model.pkl
+    'signature',      # (mtime, size) of both files when they were loaded
+    'loaded_at',      # Unix time when this version was loaded
+    'load_seconds',   # How long reading + unpickling took
+    'encoder',        # FeatureEncoder: input dicts -> model input matrix
+    'compiled',       # Flat-array version of the model (fast_forest) or None
+    'format',         # 'pickle' (ml_model.pkl) or 'arrays' (export_model_arrays)
+])
+
+# Artifact formats the registry can load (settings.ML_MODEL_FORMAT)
+MODEL_FORMATS = ('pickle', 'arrays')
+
+
+def _file_signature(model_path, feature_path):
+    """Return the (mtime, size) of both artifact files, or None if one is missing."""
+    try:
+        model_stat = os.stat(model_path)
+        feature_stat = os.stat(feature_path)
+    except OSError:
+        return None
+    return (model_stat.st_mtime_ns, model_stat.st_size,
+            feature_stat.st_mtime_ns, feature_stat.st_size)
 
-# This function loads the trained ML model and feature information from files
-def load_model():
-    """Load the trained model and feature information."""
-    # Get the path to the model file (ml_model.pkl)
-    # __file__ is current file location, dirname gets folder, join adds path
-    model_path = os.path.join(os.path.dirname(__file__), 'training', 'ml_model.pkl')
-    
-    # Get the path to the feature info file (feature_info.pkl)
-    feature_path = os.path.join(os.path.dirname(__file__), 'training', 'feature_info.pkl')
-    
-    # Check that the model and feature files exist and load them.
-    # If missing, return (None, None) so callers can handle absence gracefully.
-    if not os.path.exists(model_path) or not os.path.exists(feature_path):
-        # Try to create demo artifacts automatically (useful for deployments where
-        # the trained model wasn't committed). This creates a small dataset and
-        # a minimal dummy model so the site can show predictions for demo/demoing.
-        try:
-            from .training import create_dummy_model as _cdm
-            _cdm.create_dummy_model_artifacts(os.path.dirname(__file__))
-        except Exception:
-            # If creation failed, return None so caller can handle gracefully
-            return None, None
-        # After attempting to create, continue to load if they exist
-        if not os.path.exists(model_path) or not os.path.exists(feature_path):
-            return None, None
+
+def _read_artifacts(model_path, feature_path, model_format='pickle'):
+    """Read and unpickle both artifact files and return a LoadedModel."""
+    if model_format not in MODEL_FORMATS:
+        raise ValueError(f'Unknown model format {model_format!r} (use {", ".join(MODEL_FORMATS)})')
+    start = time.perf_counter()
+    # Take the signature before reading so a file replaced while we read it
+    # is picked up again on the next check
+    signature = _file_signature(model_path, feature_path)
+
+    # Shared-memory format: the pointer file names the folder of arrays
+    if model_format == 'arrays':
+        return _read_model_arrays(model_path, feature_path, signature, start)
 
     # Open and load the model file
     # 'rb' means read binary (pickle files are binary)
     with open(model_path, 'rb') as f:
-        model = pickle.load(f)  # Load the trained model
+        model_bytes = f.read()
+    model = pickle.loads(model_bytes)  # Load the trained model
 
     # Open and load the feature info file
     with open(feature_path, 'rb') as f:
         feature_info = pickle.load(f)  # Load feature order and encoding info
-    
+
+    # The model version is a short hash of the model file contents
+    version = hashlib.sha256(model_bytes).hexdigest()[:12]
+
+    # Work out the feature encoding once, so requests don't need pandas
+    encoder = FeatureEncoder.from_model(model, feature_info)
+
+    # Optionally compile the forest into flat NumPy arrays for fast inference
+    # (models the compiler doesn't support keep using sklearn)
+    compiled = None
+    if _inference_engine() == 'compiled':
+        compiled = compile_model(model, feature_info, encoder)
+    return LoadedModel(model, feature_info, version, signature,
+                       time.time(), time.perf_counter() - start, encoder, compiled, 'pickle')
+
+
+def _read_model_arrays(pointer_path, feature_path, signature, start):
+    """Load a model exported by export_model_arrays() with memory-mapped arrays."""
+    with open(pointer_path) as f:
+        version = f.read().strip()
+    # The tree arrays are mapped read-only from the .npy files, so all worker
+    # processes share one copy in the OS page cache instead of one copy each
+    compiled = CompiledPipeline.load(os.path.join(os.path.dirname(pointer_path), version), mmap=True)
+
+    with open(feature_path, 'rb') as f:
+        feature_info = pickle.load(f)
+    return LoadedModel(compiled, feature_info, version, signature,
+                       time.time(), time.perf_counter() - start, compiled.encoder, compiled, 'arrays')
+
+
+def export_model_arrays(model_path=MODEL_PATH, arrays_dir=MODEL_ARRAYS_DIR):
+    """Write ml_model.pkl in the shared-memory format and make it the served version.
+
+    Returns (version, folder). Raises NotCompilableError for unsupported models.
+    """
+    with open(model_path, 'rb') as f:
+        model_bytes = f.read()
+    version = hashlib.sha256(model_bytes).hexdigest()[:12]
+    compiled = CompiledPipeline.from_pipeline(pickle.loads(model_bytes))
+
+    # Write into a temp folder and rename it, so a worker never maps half a model
+    target = os.path.join(arrays_dir, version)
+    if not os.path.exists(target):
+        tmp_target = f'{target}.{os.getpid()}.tmp'
+        compiled.save(tmp_target, version=version)
+        os.replace(tmp_target, target)
+
+    # Switch the served version by replacing the pointer file in one step
+    pointer = os.path.join(arrays_dir, os.path.basename(MODEL_ARRAYS_POINTER))
+    tmp_pointer = f'{pointer}.{os.getpid()}.tmp'
+    with open(tmp_pointer, 'w') as f:
+        f.write(version)
+    os.replace(tmp_pointer, pointer)
+    return version, target
+
+
+def _default_model_format():
+    """Return settings.ML_MODEL_FORMAT ('pickle' or 'arrays')."""
+    from django.conf import settings
+    return getattr(settings, 'ML_MODEL_FORMAT', 'pickle')
+
+
+def _default_model_path(model_format):
+    """Return the file the registry watches for the given format."""
+    return MODEL_ARRAYS_POINTER if model_format == 'arrays' else MODEL_PATH
+
+
+def _inference_engine():
+    """Return settings.ML_INFERENCE_ENGINE ('sklearn' or 'compiled')."""
+    from django.conf import settings
+    return getattr(settings, 'ML_INFERENCE_ENGINE', 'sklearn')
+
+
+class ModelRegistry:
+    """Keep the model in memory for the whole worker process.
+
+    Artifacts are loaded once and then served from memory. Every
+    ``check_interval`` seconds the registry compares the files' mtime and size
+    with the loaded version and, if they changed, loads the new files and
+    swaps them in without a restart.
+    """
+
+    def __init__(self, model_path=None, feature_path=FEATURE_PATH, check_interval=None, model_format=None):
+        self._model_path = model_path
+        self._model_format = model_format
+        self.feature_path = feature_path
+        self._check_interval = check_interval
+        self._lock = threading.Lock()   # Only one thread loads at a time
+        self._active = None             # Currently served LoadedModel
+        self._last_check = 0.0          # When we last compared file signatures
+        self._load_count = 0            # How many times artifacts were loaded
+        self._failed_loads = 0          # How many loads raised an error
+        self._load_history = deque(maxlen=20)  # Recent (version, seconds) pairs
+
+    @property
+    def model_format(self):
+        """'pickle' or 'arrays' (settings.ML_MODEL_FORMAT by default)."""
+        if self._model_format is None:
+            self._model_format = _default_model_format()
+        return self._model_format
+
+    @property
+    def model_path(self):
+        """The model file (or shared-array pointer) to load; from the format by default."""
+        if self._model_path is None:
+            self._model_path = _default_model_path(self.model_format)
+        return self._model_path
+
+    @property
+    def check_interval(self):
+        """Seconds between file checks (settings.ML_MODEL_CHECK_INTERVAL by default)."""
+        if self._check_interval is not None:
+            return self._check_interval
+        from django.conf import settings
+        return getattr(settings, 'ML_MODEL_CHECK_INTERVAL', 2.0)
+
+    def get(self):
+        """Return the active LoadedModel, loading or reloading it if needed."""
+        active = self._active
+        now = time.monotonic()
+        # Fast path: model loaded and checked recently - no file system access
+        if active is not None and now - self._last_check < self.check_interval:
+            return active
+
+        with self._lock:
+            # Another thread may have done the work while we waited
+            active = self._active
+            if active is not None and now - self._last_check < self.check_interval:
+                return active
+            self._last_check = now
+            signature = _file_signature(self.model_path, self.feature_path)
+            if signature is None:
+                # Files were removed: keep serving what we have (if anything)
+                return active
+            if active is not None and signature == active.signature:
+                return active
+            return self._load()
+
+    def active(self):
+        """Return the LoadedModel being served, or None - without loading or checking files."""
+        return self._active
+
+    def reload(self):
+        """Force a reload of the artifacts and return the new LoadedModel."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            return self._load()
+
+    def clear(self):
+        """Forget the loaded model (the next get() loads it again)."""
+        with self._lock:
+            self._active = None
+            self._last_check = 0.0
+
+    def _load(self):
+        """Load the artifacts and swap them in. Caller must hold the lock."""
+        try:
+            loaded = _read_artifacts(self.model_path, self.feature_path, self.model_format)
+        except Exception:
+            # A half-written file must not take the site down: keep the old model
+            self._failed_loads += 1
+            if self._active is None:
+                raise
+            return self._active
+        self._load_count += 1
+        self._load_history.append((loaded.version, loaded.load_seconds))
+        # A single assignment, so readers see either the old or the new model
+        self._active = loaded
+        return loaded
+
+    def status(self):
+        """Return a dict describing the active model and load timings."""
+        active = self._active
+        return {
+            'loaded': active is not None,
+            'version': active.version if active else None,
+            'loaded_at': active.loaded_at if active else None,
+            'load_seconds': active.load_seconds if active else None,
+            'engine': ('compiled' if active.compiled is not None else 'sklearn') if active else None,
+            'format': active.format if active else None,
+            'load_count': self._load_count,
+            'failed_loads': self._failed_loads,
+            'load_history': list(self._load_history),
+        }
+
+
+# One registry per worker process
+registry = ModelRegistry()
+
+
+def model_status():
+    """Return information about the model served by this process."""
+    status = registry.status()
+    status['prediction_cache'] = get_prediction_cache().stats()
+    batcher = get_batcher()
+    status['batching'] = batcher.stats() if batcher is not None else None
+    return status
+
+
+def _active_model():
+    """Return the active LoadedModel (or None if the artifacts are missing)."""
+    # The registry keeps the unpickled model in memory, so this is only slow
+    # the first time (and after the files on disk change).
+    # Missing artifacts are NOT created here (that would write files during a
+    # request) - run `python manage.py bootstrap_artifacts` instead.
+    try:
+        return registry.get()
+    except Exception:
+        return None
+
+
+# This function loads the trained ML model and feature information from files
+def load_model():
+    """Load the trained model and feature information."""
+    loaded = _active_model()
+    # If missing, return (None, None) so callers can handle absence gracefully.
+    if loaded is None:
+        return None, None
+
     # Return both the model and feature info
-    return model, feature_info
+    return loaded.model, loaded.feature_info
+
+# Cached village list: (feature_info it came from, dataset signature, villages)
+_village_cache = (None, None, [])
+_village_lock = threading.Lock()
+
+
+def _dataset_signature():
+    """Return (path, mtime, size) of the first dataset file found, or None."""
+    for path in DATASET_PATHS:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        return (path, stat.st_mtime_ns, stat.st_size)
+    return None
+
+
+def _read_villages_from_dataset(path):
+    """Read the sorted village names from the dataset (cached by caller)."""
+    from .training import dataset
+    # Only the Village column is read from the columnar cache
+    df = dataset.load_dataset(path, columns=['Village'])
+    return sorted(df['Village'].dropna().astype(str).unique())
+
+
+# This function returns the villages for the prediction form dropdown
+def get_villages():
+    """Return the sorted list of known villages (kept in memory).
+
+    Newer models store the list in feature_info['villages'] at training time.
+    For older models the Excel dataset is read once and cached until the model
+    or the dataset file changes.
+    """
+    global _village_cache
+    _, feature_info = load_model()
+
+    cached_info, cached_signature, villages = _village_cache
+    # Case 1: the model knows its villages - valid for as long as this model is active
+    if feature_info is not None and feature_info.get('villages'):
+        if cached_info is not feature_info:
+            _village_cache = (feature_info, None, list(feature_info['villages']))
+        return _village_cache[2]
+
+    # Case 2: older model without a vocabulary - fall back to the dataset
+    signature = _dataset_signature()
+    if cached_info is feature_info and cached_signature == signature:
+        return villages
+
+    with _village_lock:
+        # Another thread may have refreshed the cache while we waited
+        cached_info, cached_signature, villages = _village_cache
+        if cached_info is feature_info and cached_signature == signature:
+            return villages
+        try:
+            villages = _read_villages_from_dataset(signature[0]) if signature else []
+        except Exception:
+            # A broken or unreadable file must not break the home page
+            villages = []
+        _village_cache = (feature_info, signature, villages)
+    return villages
 
 # This function prepares the input data in the correct format for the model
 def prepare_features(data, feature_info):
     """Prepare features for prediction in the correct order."""
-    features = []  # Empty list to store feature values
-    
-    # Loop through each feature in the order the model expects
-    for feature in feature_info['feature_order']:
-        # The model was trained with specific feature names (e.g., 'Area_sqft')
-        # But forms use lowercase names (e.g., 'area_sqft')
-        # So we try different variations to find the right one
-        
-        # First, try exact match
-        if feature in data:
-            val = data[feature]
-        else:
-            # Try with first letter lowercase (Area_sqft -> area_sqft)
-            alt1 = feature[0].lower() + feature[1:]
-            # Try all lowercase (Area_sqft -> area_sqft)
-            alt2 = feature.lower()
-            
-            # Check if alternative names exist in data
-            if alt1 in data:
-                val = data[alt1]
-            elif alt2 in data:
-                val = data[alt2]
-            else:
-                # If feature not found, raise error with helpful message
-                raise KeyError(f"Feature '{feature}' not found in input data keys: {list(data.keys())}")
-
-        # Add the value to our features list
-        features.append(val)
-
-    # Return the list of features in correct order
-    return features
+    # The model was trained with specific feature names (e.g., 'Area_sqft')
+    # But forms use lowercase names (e.g., 'area_sqft')
+    # The encoder works out once which spelling the input uses for each
+    # feature and raises KeyError with a helpful message if one is missing
+    active = registry.active()
+    if active is not None and active.feature_info is feature_info:
+        encoder = active.encoder
+    else:
+        encoder = FeatureEncoder(feature_info)
+    return encoder.resolve(data)
+
+# One micro-batcher per process (created when batching is enabled)
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Return the micro-batcher configured in settings, or None if batching is off."""
+    global _batcher
+    from django.conf import settings
+    config = getattr(settings, 'PREDICTION_BATCHING', {})
+    if not config.get('ENABLED'):
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    predict_prices,
+                    max_batch_size=config.get('MAX_BATCH_SIZE', 64),
+                    max_wait=config.get('MAX_WAIT_MS', 3) / 1000,
+                    timeout=config.get('TIMEOUT_MS', 1000) / 1000,
+                )
+    return _batcher
+
 
 # This is the main function that predicts land price
 def predict_price(data):
     """Make a price prediction using the trained model."""
+    # With batching on, rows from concurrent requests are scored together
+    batcher = get_batcher()
+    if batcher is not None:
+        return batcher.predict(data)
+    # predict_prices() does the work for one row as well: it checks the
+    # prediction cache first and only runs the model on a cache miss
+    return predict_prices([data])[0]
+
+
+# Same as predict_price, for async views
+async def apredict_price(data):
+    """Make a price prediction without blocking the event loop."""
+    batcher = get_batcher()
+    if batcher is not None:
+        return await batcher.apredict(data)
+    from asgiref.sync import sync_to_async
+    return await sync_to_async(predict_price, thread_sensitive=False)(data)
+
+# This function predicts prices for many parcels at once
+def predict_prices(records):
+    """Predict the price per sqft for a list of input dicts in one model call."""
     # Step 1: Load the trained model and feature information
-    model, feature_info = load_model()
-    if model is None or feature_info is None:
+    loaded = _active_model()
+    if loaded is None:
         # Model or feature info not available on this installation
         # Raise a clear RuntimeError to be handled by caller (views)
-        raise RuntimeError('ML model not available on server. Train/upload model to enable predictions.')
-    
-    # Step 2: Prepare the input data in the format model expects
-    # Convert user input to list of values in correct order
-    features = prepare_features(data, feature_info)
-    
-    # Step 3: Create a DataFrame (table) with one row
-    # The model was trained on a DataFrame, so we need to give it a DataFrame
-    # [features] creates a list with one row, columns=feature_order sets column names
-    df = pd.DataFrame([features], columns=feature_info['feature_order'])
-
-    # Step 4: Use the model to predict the price
-    # model.predict() takes DataFrame and returns array of predictions
-    # [0] gets the first (and only) prediction value
-    predicted_price = model.predict(df)[0]
-    
-    # Step 5: Return the predicted price per square foot
-    return predicted_price
+        raise RuntimeError('ML model not available on server. Train/upload the model or run '
+                           '`python manage.py bootstrap_artifacts` to enable predictions.')
+    model, feature_info = loaded.model, loaded.feature_info
+
+    # Nothing to score
+    if not records:
+        return []
+
+    # Step 2: Put every record's values in the order the model expects
+    # (rounded to the cache's plot-size steps, if configured)
+    feature_order = feature_info['feature_order']
+    encoder = loaded.encoder
+    cache = get_prediction_cache()
+    rows = [cache.quantize(encoder.resolve(record), feature_order) for record in records]
+
+    # Step 3: Reuse cached predictions for rows we have seen before
+    # (the key includes the model version, so a new model starts fresh)
+    prices = cache.get_many(loaded.version, rows)
+    missing = [index for index in range(len(rows)) if index not in prices]
+
+    if missing:
+        # Step 4: Encode the remaining rows into one matrix and make ONE predict call.
+        # The forest is evaluated once for the whole matrix instead of once per row.
+        missing_rows = [rows[index] for index in missing]
+        if loaded.compiled is not None:
+            # The compiled engine gives the same results without sklearn overhead
+            predictions = loaded.compiled.predict_matrix(encoder.transform(missing_rows))
+        elif encoder.can_transform:
+            # Our encoder builds the same matrix as the ColumnTransformer,
+            # so the regressor can be called directly (no DataFrame needed)
+            predictions = model.steps[-1][1].predict(encoder.transform(missing_rows))
+        else:
+            # Other models (e.g. the demo model) expect a DataFrame
+            df = pd.DataFrame(missing_rows, columns=feature_order)
+            predictions = model.predict(df)
+        new_prices = [(rows[index], float(price)) for index, price in zip(missing, predictions)]
+        prices.update(zip(missing, (price for _, price in new_prices)))
+        cache.set_many(loaded.version, new_prices)
+
+    # Step 5: Return plain floats in the same order as the input
+    return [prices[index] for index in range(len(rows))]
+
+
+# Sample input used to warm up the model (the village is filled in from the vocabulary)
+WARMUP_RECORD = {
+    'area_sqft': 1200.0,
+    'distance_to_city_km': 5.0,
+    'road_access': 'City Road',
+    'water_source': 'Well',
+    'electricity_available': True,
+    'land_use': 'Residential',
+    'soil_type': 'Loamy',
+    'nearby_development': 'Medium',
+}
+
+# Result of the last warmup in this process (reported by /readyz)
+_warmup_state = {'done': False, 'ok': False, 'seconds': None, 'error': None}
+_warmup_lock = threading.Lock()
+
+
+def warmup():
+    """Load the model and village list and run one prediction, so the first
+    real request doesn't pay for it. Returns the warmup state dict."""
+    with _warmup_lock:
+        # A failed warmup (e.g. artifacts not deployed yet) is retried next time
+        if _warmup_state['done'] and _warmup_state['ok']:
+            return dict(_warmup_state)
+        start = time.perf_counter()
+        try:
+            villages = get_villages()
+            if _active_model() is None:
+                raise RuntimeError('ML model artifacts not found.')
+            predict_prices([dict(WARMUP_RECORD, village=villages[0] if villages else '')])
+            _warmup_state.update(ok=True, error=None)
+        except Exception as exc:
+            # Report the problem (e.g. missing artifacts) instead of crashing the worker
+            _warmup_state.update(ok=False, error=str(exc))
+        _warmup_state.update(done=True, seconds=time.perf_counter() - start)
+        return dict(_warmup_state)
+
+
+def warmup_status():
+    """Return the warmup state of this process without running it."""
+    return dict(_warmup_state)
@@ -52,6 +52,105 @@ class LandPrediction(models.Model):
     class Meta:
         # Order predictions by newest first (minus sign means descending order)
         ordering = ['-created_at']
+        # Indexes for the queries that read this (large) table. Each one
+        # matches a query shape; `manage.py check_query_plans` verifies them.
+        indexes = [
+            # Newest first (home/dashboard/admin, backward scan), created_at
+            # ranges (export, rollup refresh) and, with village and price in
+            # the key, "since a date, per village" averages without table reads
+            models.Index(fields=['created_at', 'village', 'predicted_price'], name='lp_created_cover_idx'),
+            # Admin list filters (filter, then newest first) and their
+            # distinct-value lists; village also serves export/rollup filters
+            models.Index(fields=['village', '-created_at'], name='lp_village_created_idx'),
+            models.Index(fields=['land_use', '-created_at'], name='lp_land_use_created_idx'),
+            models.Index(fields=['soil_type', '-created_at'], name='lp_soil_type_created_idx'),
+            # Electricity filter within a date range
+            models.Index(fields=['electricity_available', 'created_at'], name='lp_elec_created_idx'),
+            # Price histogram / min / max: reads only this index
+            models.Index(fields=['predicted_price'], name='lp_price_idx'),
+            # "Most common area" GROUP BY area_sqft on the dashboard
+            models.Index(fields=['area_sqft'], name='lp_area_idx'),
+        ]
+
+# Pre-computed totals for a group of predictions (one day or one village).
+# The dashboard reads these small tables instead of scanning every prediction.
+# abstract = True means this class has no table of its own - it only shares
+# its fields with the two rollup tables below.
+class PredictionRollup(models.Model):
+    # How many predictions are in this group
+    count = models.BigIntegerField(default=0)
+    
+    # Sum of predicted price per sqft (average = sum_price / count)
+    sum_price = models.FloatField(default=0)
+    
+    # Sum of price × area (total market value of the group)
+    sum_value = models.FloatField(default=0)
+    
+    # Sum of areas and distances (for averages)
+    sum_area = models.FloatField(default=0)
+    sum_distance = models.FloatField(default=0)
+    
+    # How many predictions in the group have electricity
+    electricity_count = models.BigIntegerField(default=0)
+    
+    # Lowest and highest predicted price in the group (empty for an empty group)
+    min_price = models.FloatField(null=True, blank=True)
+    max_price = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    # Average price of the group (0 for an empty group)
+    @property
+    def avg_price(self):
+        return self.sum_price / self.count if self.count else 0
+
+# Totals for all predictions made on one day
+class DailyPredictionRollup(PredictionRollup):
+    # The day (one row per day)
+    day = models.DateField(unique=True)
+
+    def __str__(self):
+        return f"{self.day}: {self.count} predictions"
+
+    class Meta:
+        ordering = ['day']
+
+# Totals for all predictions of one village
+class VillagePredictionRollup(PredictionRollup):
+    # The village name (one row per village)
+    village = models.CharField(max_length=150, unique=True)
+
+    def __str__(self):
+        return f"{self.village}: {self.count} predictions"
+
+    class Meta:
+        ordering = ['village']
+
+# Progress of a spreadsheet import (see bulk_import.py), one row per file
+# content. It is updated in the same transaction as the predictions of each
+# chunk, so after a crash the import continues exactly after the last saved
+# chunk and never saves a chunk twice.
+class PredictionImport(models.Model):
+    # sha256 of the file contents (the same file imported twice is one row)
+    source_hash = models.CharField(max_length=64, unique=True)
+    
+    # Where the file was last imported from
+    source = models.CharField(max_length=500)
+    
+    # Data rows read so far, predictions saved and rows rejected
+    rows_done = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    invalid = models.PositiveIntegerField(default=0)
+    
+    # True once every row of the file was read
+    finished = models.BooleanField(default=False)
+    
+    # Last time a chunk was saved
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.rows_done} rows"
 
 # This class creates a table to store messages from contact form
 class ContactMessage(models.Model):
@@ -101,10 +200,17 @@ class BlogPost(models.Model):
     image = models.URLField(max_length=500, blank=True, help_text='URL to blog post image')
     
     # Short summary shown in blog listing (max 300 characters)
-    summary = models.TextField(max_length=300, help_text='Short summary for blog listing')
+    # Left empty, it is taken from the first paragraph of the content on save
+    summary = models.TextField(max_length=300, blank=True, help_text='Short summary for blog listing (empty = first paragraph)')
+    
+    # Full blog post content (can be very long), written in Markdown
+    content = models.TextField(help_text='Full blog post content (Markdown: ## headings, **bold**, - lists)')
     
-    # Full blog post content (can be very long)
-    content = models.TextField(help_text='Full blog post content')
+    # The content as HTML, rendered once on save (see blog_markup.py)
+    content_html = models.TextField(blank=True, editable=False)
+    
+    # Estimated minutes to read the post, computed on save
+    reading_time = models.PositiveIntegerField(default=0, editable=False)
     
     # Whether this post should be featured on homepage (True/False)
     featured = models.BooleanField(default=False, help_text='Show on homepage')
@@ -131,6 +237,24 @@ class BlogPost(models.Model):
     def __str__(self):
         return self.title
     
+    # Render the Markdown content to HTML and fill in the summary and reading time
+    def render_content(self):
+        from .blog_markup import make_summary, reading_time, render_markdown
+        self.content_html = render_markdown(self.content)
+        self.reading_time = reading_time(self.content)
+        if not self.summary.strip():
+            self.summary = make_summary(self.content_html)
+    
+    # Render the content once here, not on every page view. Saves that don't
+    # touch the content (update_fields without it) leave the HTML alone.
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'content', 'summary'} & set(update_fields):
+            self.render_content()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'content_html', 'reading_time', 'summary'}
+        super().save(*args, **kwargs)
+    
     # Generate the URL for this blog post
     # Example: /blog/how-to-buy-land/
     def get_absolute_url(self):
@@ -0,0 +1,224 @@
+# Cache for model predictions.
+#
+# Many requests ask for the same parcel (same village, road, soil, ... and a
+# common plot size), so the forest doesn't need to run again for them. The
+# cache key is the model version plus the ordered feature values from
+# prepare_features(), so a new model never returns old predictions.
+#
+# Settings (see settings.PREDICTION_CACHE):
+#   BACKEND        'local' (per process LRU), 'django' (shared through Django's
+#                  cache framework, e.g. Redis/Memcached) or 'off'
+#   MAX_ENTRIES    size limit of the local LRU cache
+#   TTL            seconds an entry stays valid (0 = no expiry for 'local')
+#   AREA_STEP      round Area_sqft to this step before predicting (0 = off)
+#   DISTANCE_STEP  round Distance_to_City_km to this step (0 = off)
+#   CACHE_ALIAS    which Django cache to use for the 'django' backend
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Default settings (used for any key missing from settings.PREDICTION_CACHE)
+DEFAULTS = {
+    'BACKEND': 'local',
+    'MAX_ENTRIES': 10000,
+    'TTL': 3600,
+    'AREA_STEP': 0,
+    'DISTANCE_STEP': 0,
+    'CACHE_ALIAS': 'default',
+}
+
+# Which feature each quantization setting rounds
+QUANTIZED_FEATURES = {
+    'Area_sqft': 'AREA_STEP',
+    'Distance_to_City_km': 'DISTANCE_STEP',
+}
+
+
+def _normalize(value):
+    """Turn a feature value into a stable, hashable value for the key."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    # numpy numbers and anything else with a float value
+    try:
+        if hasattr(value, 'dtype'):
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+class PredictionCache:
+    """Base class: key building, quantization and hit/miss counters."""
+
+    backend = 'off'
+
+    def __init__(self, config):
+        self.config = config
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, features, feature_order):
+        """Round the configured numeric features to their step (in place) and return them."""
+        for index, name in enumerate(feature_order):
+            step = self.config.get(QUANTIZED_FEATURES.get(name, ''), 0)
+            if step:
+                features[index] = round(float(features[index]) / step) * step
+        return features
+
+    def make_key(self, version, features):
+        """Return the cache key for one feature row of a model version."""
+        return (version,) + tuple(_normalize(value) for value in features)
+
+    def get_many(self, version, rows):
+        """Return {row index: price} for the rows found in the cache."""
+        return {}
+
+    def set_many(self, version, rows_with_prices):
+        """Store (features, price) pairs."""
+
+    def clear(self):
+        """Drop every entry."""
+
+    def _count(self, hits, misses):
+        with self._counter_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        """Return counters for monitoring."""
+        total = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class LocalPredictionCache(PredictionCache):
+    """LRU + TTL cache inside this worker process."""
+
+    backend = 'local'
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._entries = OrderedDict()  # key -> (expires_at, price), oldest first
+        self._lock = threading.Lock()
+        self._version = None           # Model version of the stored entries
+
+    def get_many(self, version, rows):
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                # A new model is active: old predictions are useless, free them
+                self._entries.clear()
+                self._version = version
+            for index, features in enumerate(rows):
+                key = self.make_key(version, features)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, price = entry
+                if expires_at and expires_at < now:
+                    del self._entries[key]
+                    continue
+                # Mark as recently used
+                self._entries.move_to_end(key)
+                found[index] = price
+        self._count(len(found), len(rows) - len(found))
+        return found
+
+    def set_many(self, version, rows_with_prices):
+        ttl = self.config['TTL']
+        expires_at = time.monotonic() + ttl if ttl else 0
+        max_entries = self.config['MAX_ENTRIES']
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            for features, price in rows_with_prices:
+                key = self.make_key(version, features)
+                self._entries[key] = (expires_at, price)
+                self._entries.move_to_end(key)
+            # Remove the least recently used entries over the limit
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        stats = super().stats()
+        stats['size'] = len(self._entries)
+        return stats
+
+
+class DjangoPredictionCache(PredictionCache):
+    """Cache shared by all workers through Django's cache framework."""
+
+    backend = 'django'
+
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.config['CACHE_ALIAS']]
+
+    def _storage_key(self, version, features):
+        # Cache servers need short string keys: hash the feature tuple
+        digest = hashlib.sha1(repr(self.make_key(version, features)).encode()).hexdigest()
+        return f'land_price:prediction:{version}:{digest}'
+
+    def get_many(self, version, rows):
+        keys = [self._storage_key(version, features) for features in rows]
+        stored = self._cache().get_many(keys)
+        found = {index: stored[key] for index, key in enumerate(keys) if key in stored}
+        self._count(len(found), len(rows) - len(found))
+        return found
+
+    def set_many(self, version, rows_with_prices):
+        self._cache().set_many(
+            {self._storage_key(version, features): price for features, price in rows_with_prices},
+            timeout=self.config['TTL'] or None,
+        )
+
+    def clear(self):
+        # Entries of old model versions simply stop being used; the
+        # cache server expires them. Nothing to do per process.
+        pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the prediction cache configured in settings (created once)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from django.conf import settings
+                config = dict(DEFAULTS, **getattr(settings, 'PREDICTION_CACHE', {}))
+                backends = {
+                    'local': LocalPredictionCache,
+                    'django': DjangoPredictionCache,
+                }
+                _cache = backends.get(config['BACKEND'], PredictionCache)(config)
+    return _cache
+
+
+def reset_cache():
+    """Forget the cache object (it is rebuilt from settings on next use)."""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def cache_stats():
+    """Return hit/miss counters of the prediction cache."""
+    return get_cache().stats()
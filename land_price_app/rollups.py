@@ -0,0 +1,205 @@
+# Pre-aggregated prediction totals (rollups) for the dashboard and home page.
+#
+# Every saved LandPrediction is added to two small tables: one row per day and
+# one row per village. Pages then read a few rollup rows instead of looping
+# over every prediction. signals.py keeps the tables up to date on save/delete;
+# code that uses bulk_create() (which sends no signals) calls add_predictions().
+#
+# Other bulk writes send no signals either: QuerySet.update(), bulk_update(),
+# raw SQL and loaddata/fixtures leave the rollups out of date. Run
+# `manage.py rebuild_rollups` after them (or call refresh_groups() for the
+# days and villages they touched).
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.utils import timezone
+
+# Fields that hold totals (summed when predictions are added)
+SUM_FIELDS = ('count', 'sum_price', 'sum_value', 'sum_area', 'sum_distance', 'electricity_count')
+
+# most_common_area() needs a GROUP BY over every prediction, so its result
+# is cached for this many seconds instead of being kept in a rollup table
+MOST_COMMON_AREA_KEY = 'land_price:rollups:most_common_area'
+MOST_COMMON_AREA_TIMEOUT = 600
+
+
+def _default_models():
+    """Return the (prediction, daily rollup, village rollup) model classes."""
+    from .models import LandPrediction, DailyPredictionRollup, VillagePredictionRollup
+    return LandPrediction, DailyPredictionRollup, VillagePredictionRollup
+
+
+def prediction_day(prediction):
+    """Return the (local) day a prediction belongs to."""
+    created_at = prediction.created_at or timezone.now()
+    if timezone.is_aware(created_at):
+        return timezone.localdate(created_at)
+    return created_at.date()
+
+
+def day_range(day):
+    """Filter kwargs for the predictions of one (local) day.
+
+    A created_at range instead of created_at__date, which wraps the column
+    in a function and can't use the created_at index.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return {'created_at__gte': start, 'created_at__lt': start + timedelta(days=1)}
+
+
+def _group_totals(predictions, key_func):
+    """Add up a list of predictions per key in Python: {key: totals}."""
+    groups = {}
+    for pred in predictions:
+        totals = groups.setdefault(key_func(pred), {
+            'count': 0, 'sum_price': 0.0, 'sum_value': 0.0, 'sum_area': 0.0,
+            'sum_distance': 0.0, 'electricity_count': 0,
+            'min_price': None, 'max_price': None,
+        })
+        price = pred.predicted_price
+        totals['count'] += 1
+        totals['sum_price'] += price
+        totals['sum_value'] += price * pred.area_sqft
+        totals['sum_area'] += pred.area_sqft
+        totals['sum_distance'] += pred.distance_to_city_km
+        totals['electricity_count'] += 1 if pred.electricity_available else 0
+        totals['min_price'] = price if totals['min_price'] is None else min(totals['min_price'], price)
+        totals['max_price'] = price if totals['max_price'] is None else max(totals['max_price'], price)
+    return groups
+
+
+def _apply_totals(rollup_model, key_field, groups):
+    """Add per-key totals to the rollup rows with one UPDATE per key."""
+    for key, totals in groups.items():
+        # Make sure the row exists, then add to it inside the database.
+        # F() expressions make the update safe when two requests run at once.
+        rollup_model.objects.get_or_create(**{key_field: key})
+        low, high = Value(totals['min_price']), Value(totals['max_price'])
+        rollup_model.objects.filter(**{key_field: key}).update(
+            min_price=Least(Coalesce(F('min_price'), low), low),
+            max_price=Greatest(Coalesce(F('max_price'), high), high),
+            **{field: F(field) + totals[field] for field in SUM_FIELDS},
+        )
+
+
+def add_predictions(predictions):
+    """Add newly created predictions to the daily and village rollups."""
+    predictions = list(predictions)
+    if not predictions:
+        return
+    _, daily_model, village_model = _default_models()
+    with transaction.atomic():
+        _apply_totals(daily_model, 'day', _group_totals(predictions, prediction_day))
+        _apply_totals(village_model, 'village', _group_totals(predictions, lambda p: p.village))
+
+
+def _aggregates():
+    """Database aggregates that compute one rollup row from raw predictions."""
+    return {
+        'count': Count('id'),
+        'sum_price': Sum('predicted_price'),
+        'sum_value': Sum(F('predicted_price') * F('area_sqft')),
+        'sum_area': Sum('area_sqft'),
+        'sum_distance': Sum('distance_to_city_km'),
+        'electricity_count': Count('id', filter=Q(electricity_available=True)),
+        'min_price': Min('predicted_price'),
+        'max_price': Max('predicted_price'),
+    }
+
+
+def refresh_groups(days=(), villages=()):
+    """Recompute some rollup rows from the raw predictions.
+
+    Used after an edit or a delete, where min/max can't be updated
+    incrementally. Only the predictions of the given days/villages are read.
+    """
+    prediction_model, daily_model, village_model = _default_models()
+    with transaction.atomic():
+        for day in set(days):
+            totals = prediction_model.objects.filter(**day_range(day)).aggregate(**_aggregates())
+            _store_group(daily_model, 'day', day, totals)
+        for village in set(villages):
+            totals = prediction_model.objects.filter(village=village).aggregate(**_aggregates())
+            _store_group(village_model, 'village', village, totals)
+
+
+def _store_group(rollup_model, key_field, key, totals):
+    """Save recomputed totals for one key (or delete the row if the group is empty)."""
+    if not totals['count']:
+        rollup_model.objects.filter(**{key_field: key}).delete()
+        return
+    rollup_model.objects.update_or_create(**{key_field: key}, defaults=totals)
+
+
+def rebuild_rollups(prediction_model=None, daily_model=None, village_model=None):
+    """Rebuild both rollup tables from scratch with two GROUP BY queries.
+
+    The model classes can be passed in so data migrations can use their
+    historical models. Run it after writes that send no signals (update(),
+    bulk_update(), raw SQL). Returns (number of days, number of villages).
+    """
+    if prediction_model is None:
+        prediction_model, daily_model, village_model = _default_models()
+
+    with transaction.atomic():
+        daily_model.objects.all().delete()
+        village_model.objects.all().delete()
+
+        # One row per day: TruncDate groups by the date part of created_at
+        daily_rows = (prediction_model.objects.order_by()
+                      .annotate(day=TruncDate('created_at')).values('day')
+                      .annotate(**_aggregates()))
+        daily_model.objects.bulk_create([daily_model(**row) for row in daily_rows], batch_size=500)
+
+        # One row per village
+        village_rows = prediction_model.objects.order_by().values('village').annotate(**_aggregates())
+        village_model.objects.bulk_create([village_model(**row) for row in village_rows], batch_size=500)
+
+    cache.delete(MOST_COMMON_AREA_KEY)
+    return daily_model.objects.count(), village_model.objects.count()
+
+
+def overall_totals():
+    """Return totals over all predictions, read from the village rollups.
+
+    The result has the same keys the dashboard used to compute from raw rows.
+    """
+    _, _, village_model = _default_models()
+    totals = village_model.objects.aggregate(
+        count=Sum('count'), sum_price=Sum('sum_price'), sum_value=Sum('sum_value'),
+        sum_area=Sum('sum_area'), sum_distance=Sum('sum_distance'),
+        electricity_count=Sum('electricity_count'),
+        min_price=Min('min_price'), max_price=Max('max_price'),
+    )
+    count = totals['count'] or 0
+    return {
+        'total_predictions': count,
+        'avg_price': totals['sum_price'] / count if count else None,
+        'min_price': totals['min_price'],
+        'max_price': totals['max_price'],
+        'total_market_value': totals['sum_value'] or 0,
+        'avg_area': totals['sum_area'] / count if count else None,
+        'avg_distance': totals['sum_distance'] / count if count else None,
+        'electricity_count': totals['electricity_count'] or 0,
+    }
+
+
+def most_common_area():
+    """Return the most frequent area_sqft (None without predictions).
+
+    The GROUP BY runs at most once per MOST_COMMON_AREA_TIMEOUT seconds;
+    the dashboard shows the cached value in between.
+    """
+    cached = cache.get(MOST_COMMON_AREA_KEY)
+    if cached is not None:
+        return cached['area_sqft']
+    prediction_model, _, _ = _default_models()
+    row = (prediction_model.objects.order_by().values('area_sqft')
+           .annotate(count=Count('id')).order_by('-count').first())
+    area = row['area_sqft'] if row else None
+    # Stored in a dict so "no predictions" (None) is cached too
+    cache.set(MOST_COMMON_AREA_KEY, {'area_sqft': area}, MOST_COMMON_AREA_TIMEOUT)
+    return area
@@ -0,0 +1,66 @@
+# Signal handlers - functions Django calls automatically when models are saved
+# or deleted. They are connected in apps.py (LandPriceAppConfig.ready).
+# QuerySet.update(), bulk_create(), bulk_update() and raw SQL don't send these
+# signals: after such writes to LandPrediction, run `manage.py rebuild_rollups`
+# (bulk_create callers use rollups.add_predictions() instead).
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import BlogPost, LandPrediction
+from . import blog_cache, rollups
+
+
+# Before an existing prediction is edited, remember its old day and village
+# so both the old and the new rollup rows can be corrected afterwards
+@receiver(pre_save, sender=LandPrediction)
+def remember_old_rollup_keys(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    old = sender.objects.filter(pk=instance.pk).values('village', 'created_at').first()
+    if old:
+        instance._old_rollup_keys = (rollups.prediction_day(sender(**old)), old['village'])
+
+
+# After a prediction is saved, update the rollup tables
+@receiver(post_save, sender=LandPrediction)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        # New prediction: just add it to the totals (fast, no scans)
+        rollups.add_predictions([instance])
+    else:
+        # Edited prediction: recompute the affected groups
+        old_day, old_village = getattr(instance, '_old_rollup_keys', (None, None))
+        days = {rollups.prediction_day(instance), old_day} - {None}
+        villages = {instance.village, old_village} - {None}
+        rollups.refresh_groups(days=days, villages=villages)
+
+
+# After a prediction is deleted, recompute its groups (min/max may change)
+@receiver(post_delete, sender=LandPrediction)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    rollups.refresh_groups(days=[rollups.prediction_day(instance)], villages=[instance.village])
+
+
+# Before a blog post is edited, remember its old slug and category: the cache
+# entries under the old values must be dropped too
+@receiver(pre_save, sender=BlogPost)
+def remember_old_blog_keys(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    old = sender.objects.filter(pk=instance.pk).values('slug', 'category').first()
+    if old:
+        instance._old_blog_keys = (old['slug'], old['category'])
+
+
+# After a blog post is saved or deleted, drop the cached blog pages it is on
+@receiver(post_save, sender=BlogPost)
+def invalidate_blog_cache_on_save(sender, instance, raw=False, **kwargs):
+    old_slug, old_category = getattr(instance, '_old_blog_keys', (None, None))
+    blog_cache.invalidate_post(instance, old_slug, old_category)
+
+
+@receiver(post_delete, sender=BlogPost)
+def invalidate_blog_cache_on_delete(sender, instance, **kwargs):
+    blog_cache.invalidate_post(instance)
@@ -1,3 +1,856 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
\ No newline at end of file
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from land_price_app import blog_cache, blog_search, ml_helpers, prediction_cache, rollups, view_counter
+from land_price_app.admin import LandPredictionAdmin
+from land_price_app.batching import MicroBatcher
+from land_price_app.blog_markup import render_markdown
+from land_price_app import bulk_import
+from land_price_app.bulk_import import import_file
+from land_price_app.distribution import bucket_counts, distribution, histogram_from_values
+from land_price_app.models import (BlogPost, DailyPredictionRollup, LandPrediction, PredictionImport,
+                                   VillagePredictionRollup)
+from land_price_app.training.create_dummy_model import DummyModel
+
+HAS_MODEL = os.path.exists(ml_helpers.MODEL_PATH) and os.path.exists(ml_helpers.FEATURE_PATH)
+
+# Villages of the bundled training dataset
+VILLAGES = ['Ainwade', 'Ambavade', 'Bhalavani']
+
+# Parcel fields used by the tests (the village is added per test)
+PARCEL = {
+    'area_sqft': 1200.0,
+    'distance_to_city_km': 5.0,
+    'road_access': 'City Road',
+    'water_source': 'Well',
+    'electricity_available': True,
+    'land_use': 'Residential',
+    'soil_type': 'Loamy',
+    'nearby_development': 'Medium',
+}
+
+
+def make_prediction(**fields):
+    """Save one LandPrediction (through save(), so the signals run)."""
+    return LandPrediction.objects.create(**{**PARCEL, 'village': 'Village A', 'predicted_price': 100.0, **fields})
+
+
+def make_post(title, content='Some text.', **fields):
+    slug = fields.pop('slug', title.lower().replace(' ', '-'))
+    return BlogPost.objects.create(title=title, slug=slug, content=content, **fields)
+
+
+def shared_cache_settings(directory):
+    """CACHES with a file cache: shared between processes, so the blog cache uses it."""
+    return {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}}
+
+
+# --- Model registry ---------------------------------------------------------
+
+class ModelRegistryTests(SimpleTestCase):
+    """The registry serves one loaded model and swaps in new files when they change."""
+
+    def setUp(self):
+        if not HAS_MODEL:
+            self.skipTest('model artifacts not available')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.model_path = os.path.join(self.directory, 'ml_model.pkl')
+        self.feature_path = os.path.join(self.directory, 'feature_info.pkl')
+        shutil.copyfile(ml_helpers.MODEL_PATH, self.model_path)
+        shutil.copyfile(ml_helpers.FEATURE_PATH, self.feature_path)
+        self.registry = ml_helpers.ModelRegistry(model_path=self.model_path, feature_path=self.feature_path,
+                                                 check_interval=0)
+
+    def replace_model(self, content):
+        with open(self.model_path, 'wb') as f:
+            f.write(content)
+        # Make sure the signature changes even on coarse file system clocks
+        stat = os.stat(self.model_path)
+        os.utime(self.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_loaded_once(self):
+        first = self.registry.get()
+        self.assertIs(self.registry.get(), first)
+        self.assertEqual(self.registry.status()['load_count'], 1)
+
+    def test_reload_on_change(self):
+        first = self.registry.get()
+        self.replace_model(pickle.dumps(DummyModel()))
+        second = self.registry.get()
+        self.assertIsNot(second, first)
+        self.assertNotEqual(second.version, first.version)
+        self.assertIsInstance(second.model, DummyModel)
+
+    def test_broken_file_keeps_old_model(self):
+        first = self.registry.get()
+        self.replace_model(b'not a pickle')
+        self.assertIs(self.registry.get(), first)
+        self.assertEqual(self.registry.status()['failed_loads'], 1)
+
+    def test_missing_files_keep_old_model(self):
+        first = self.registry.get()
+        os.remove(self.model_path)
+        self.assertIs(self.registry.get(), first)
+
+    def test_check_interval(self):
+        registry = ml_helpers.ModelRegistry(model_path=self.model_path, feature_path=self.feature_path,
+                                            check_interval=3600)
+        first = registry.get()
+        self.replace_model(pickle.dumps(DummyModel()))
+        # Not checked again yet: still the old model
+        self.assertIs(registry.get(), first)
+        self.assertIsNot(registry.reload(), first)
+
+
+# --- DummyModel -------------------------------------------------------------
+
+def loop_predict(df):
+    """DummyModel.predict as it was before it was vectorized (one row at a time)."""
+    prices = []
+    for _, row in df.iterrows():
+        area = float(row.get('Area_sqft', 0) or 0)
+        distance = float(row.get('Distance_to_City_km', 0) or 0)
+        electricity = row.get('Electricity_Available', False)
+        price = 20 + (area * 0.02) - (distance * 0.3)
+        if electricity:
+            price += 3
+        village = str(row.get('Village', '') or '')
+        price += min(len(village), 20) * 0.1
+        prices.append(float(price))
+    return np.array(prices)
+
+
+class DummyModelTests(SimpleTestCase):
+    """The vectorized DummyModel.predict gives the same prices as the old loop."""
+
+    def assertSamePrices(self, df):
+        np.testing.assert_array_equal(DummyModel().predict(df), loop_predict(df))
+
+    def test_complete_rows(self):
+        self.assertSamePrices(pd.DataFrame({
+            'Village': ['Village A', 'A very long village name indeed', ''],
+            'Area_sqft': [1000, 1500.5, 0],
+            'Distance_to_City_km': [5.0, 0, 20],
+            'Electricity_Available': [True, False, True],
+        }))
+
+    def test_missing_values(self):
+        self.assertSamePrices(pd.DataFrame({
+            'Village': ['Village A', np.nan, None, ''],
+            'Area_sqft': [1000, np.nan, None, '1200'],
+            'Distance_to_City_km': [None, 3.5, np.nan, ''],
+            'Electricity_Available': [np.nan, None, False, 'yes'],
+        }))
+
+    def test_missing_columns(self):
+        self.assertSamePrices(pd.DataFrame({'Area_sqft': [1000, 2000]}))
+        self.assertSamePrices(pd.DataFrame({'Village': ['Village B'], 'Electricity_Available': [np.nan]}))
+
+
+# --- predict_prices ---------------------------------------------------------
+
+@override_settings(PREDICTION_CACHE={'BACKEND': 'off'})
+class PredictPricesTests(SimpleTestCase):
+    """predict_prices() gives the sklearn pipeline's prices, in input order."""
+
+    def setUp(self):
+        if not HAS_MODEL:
+            self.skipTest('model artifacts not available')
+        with open(ml_helpers.MODEL_PATH, 'rb') as f:
+            self.pipeline = pickle.load(f)
+        with open(ml_helpers.FEATURE_PATH, 'rb') as f:
+            self.feature_order = pickle.load(f)['feature_order']
+        self.records = [
+            dict(PARCEL, village=VILLAGES[i % len(VILLAGES)], area_sqft=500.0 + 250 * i,
+                 distance_to_city_km=0.5 * i, electricity_available=i % 2 == 0,
+                 road_access=('Rural Road', 'City Road', 'Highway')[i % 3])
+            for i in range(25)
+        ]
+        prediction_cache.reset_cache()
+        self.addCleanup(prediction_cache.reset_cache)
+
+    def expected(self):
+        # What the original code did: one DataFrame row per record, columns in feature order
+        df = pd.DataFrame([[record[feature.lower()] for feature in self.feature_order] for record in self.records],
+                          columns=self.feature_order)
+        return self.pipeline.predict(df)
+
+    def predict_with(self, registry):
+        with mock.patch.object(ml_helpers, 'registry', registry):
+            return ml_helpers.predict_prices(self.records)
+
+    def test_sklearn_engine(self):
+        with override_settings(ML_INFERENCE_ENGINE='sklearn'):
+            registry = ml_helpers.ModelRegistry(model_path=ml_helpers.MODEL_PATH)
+            self.assertIsNone(registry.get().compiled)
+            np.testing.assert_allclose(self.predict_with(registry), self.expected(), rtol=1e-9)
+
+    def test_compiled_engine(self):
+        with override_settings(ML_INFERENCE_ENGINE='compiled'):
+            registry = ml_helpers.ModelRegistry(model_path=ml_helpers.MODEL_PATH)
+            self.assertIsNotNone(registry.get().compiled)
+            np.testing.assert_allclose(self.predict_with(registry), self.expected(), rtol=1e-9)
+
+    def test_single_prediction(self):
+        registry = ml_helpers.ModelRegistry(model_path=ml_helpers.MODEL_PATH)
+        with mock.patch.object(ml_helpers, 'registry', registry):
+            price = ml_helpers.predict_price(self.records[3])
+        self.assertAlmostEqual(price, self.expected()[3])
+
+    def test_shared_arrays(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        ml_helpers.export_model_arrays(arrays_dir=directory)
+        registry = ml_helpers.ModelRegistry(model_path=os.path.join(directory, 'CURRENT'),
+                                             model_format='arrays')
+        np.testing.assert_allclose(self.predict_with(registry), self.expected(), rtol=1e-9)
+        self.assertEqual(registry.status()['format'], 'arrays')
+
+    def test_cached_predictions(self):
+        registry = ml_helpers.ModelRegistry(model_path=ml_helpers.MODEL_PATH)
+        with override_settings(PREDICTION_CACHE={'BACKEND': 'local'}):
+            prediction_cache.reset_cache()
+            first = self.predict_with(registry)
+            second = self.predict_with(registry)
+            stats = prediction_cache.get_cache().stats()
+        self.assertEqual(first, second)
+        self.assertEqual(stats['hits'], len(self.records))
+        np.testing.assert_allclose(second, self.expected(), rtol=1e-9)
+
+    def test_new_model_is_not_served_from_cache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        model_path = os.path.join(directory, 'ml_model.pkl')
+        shutil.copyfile(ml_helpers.MODEL_PATH, model_path)
+        registry = ml_helpers.ModelRegistry(model_path=model_path, check_interval=0)
+        with override_settings(PREDICTION_CACHE={'BACKEND': 'local'}):
+            prediction_cache.reset_cache()
+            self.predict_with(registry)
+            with open(model_path, 'wb') as f:
+                pickle.dump(DummyModel(), f)
+            stat = os.stat(model_path)
+            os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            prices = self.predict_with(registry)
+        df = pd.DataFrame([[record[feature.lower()] for feature in self.feature_order] for record in self.records],
+                          columns=self.feature_order)
+        np.testing.assert_allclose(prices, DummyModel().predict(df))
+
+    def test_no_records(self):
+        registry = ml_helpers.ModelRegistry(model_path=ml_helpers.MODEL_PATH)
+        with mock.patch.object(ml_helpers, 'registry', registry):
+            self.assertEqual(ml_helpers.predict_prices([]), [])
+
+
+# --- Micro-batching ---------------------------------------------------------
+
+class MicroBatcherTests(SimpleTestCase):
+    """Every input is scored exactly once, even when its caller times out."""
+
+    def setUp(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def predict_many(self, items):
+        self.calls.append(list(items))
+        if 'slow' in items:
+            self.release.wait(5)
+        return [f'{item}!' for item in items]
+
+    def test_batches(self):
+        batcher = MicroBatcher(self.predict_many, max_wait=0.05)
+        futures = [batcher.submit(item) for item in 'abc']
+        self.assertEqual([future.result(5) for future in futures], ['a!', 'b!', 'c!'])
+        self.assertEqual(self.calls, [['a', 'b', 'c']])
+
+    def test_timeout_before_the_batch_starts(self):
+        batcher = MicroBatcher(self.predict_many, max_wait=0)
+        busy = batcher.submit('slow')
+        # The batch thread is busy: the caller gives up and scores its input itself
+        self.assertEqual(batcher.predict('a', timeout=0.05), 'a!')
+        self.release.set()
+        busy.result(5)
+        batcher.predict('b')
+        self.assertEqual(self.calls, [['slow'], ['a'], ['b']])
+        self.assertEqual(batcher.stats()['timeouts'], 1)
+
+    def test_timeout_after_the_batch_started(self):
+        batcher = MicroBatcher(self.predict_many, max_wait=0)
+        threading.Timer(0.2, self.release.set).start()
+        # Its batch is already running: the caller waits for that result
+        self.assertEqual(batcher.predict('slow', timeout=0.05), 'slow!')
+        self.assertEqual(self.calls, [['slow']])
+        self.assertEqual(batcher.stats()['timeouts'], 0)
+
+
+# --- Batch prediction API ---------------------------------------------------
+
+class BatchPredictionApiTests(TestCase):
+    """/api/predict/batch/ scores the valid rows and reports the invalid ones."""
+
+    url = '/api/predict/batch/'
+
+    def setUp(self):
+        if not HAS_MODEL:
+            self.skipTest('model artifacts not available')
+
+    def post(self, body, client=None):
+        return (client or self.client).post(self.url, json.dumps(body), content_type='application/json')
+
+    def test_valid_and_invalid_rows(self):
+        rows = [dict(PARCEL, village=VILLAGES[0]), dict(PARCEL, village=VILLAGES[1], area_sqft=-1), 'not a row']
+        response = self.post({'rows': rows})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['index'], 0)
+        self.assertEqual([error['index'] for error in data['errors']], [1, 2])
+        self.assertIn('area_sqft', data['errors'][0]['errors'])
+        self.assertEqual(LandPrediction.objects.count(), 0)
+
+    def test_bare_list(self):
+        response = self.post([dict(PARCEL, village=VILLAGES[0])] * 3)
+        self.assertEqual(response.json()['count'], 3)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json').status_code, 400)
+        self.assertEqual(self.post({'rows': []}).status_code, 400)
+        self.assertEqual(self.post({'rows': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        with override_settings(BATCH_PREDICTION_MAX_ROWS=2):
+            self.assertEqual(self.post({'rows': [dict(PARCEL, village=VILLAGES[0])] * 3}).status_code, 413)
+
+    def test_villages_are_checked(self):
+        rows = [dict(PARCEL, village='Not a village'), dict(PARCEL, village='=HYPERLINK("x")')]
+        data = self.post({'rows': rows}).json()
+        self.assertEqual(data['count'], 0)
+        self.assertEqual([error['errors']['village'][0]['code'] for error in data['errors']], ['unknown', 'invalid'])
+
+    def test_save_needs_login_and_csrf(self):
+        rows = [dict(PARCEL, village=VILLAGES[0])]
+        self.assertEqual(self.post({'rows': rows, 'save': True}).status_code, 401)
+        # Scoring without saving stays open
+        self.assertEqual(self.post({'rows': rows}).status_code, 200)
+
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.create_user('user', password='password'))
+        self.assertEqual(self.post({'rows': rows, 'save': True}, client).status_code, 403)
+        self.assertEqual(LandPrediction.objects.count(), 0)
+
+    def test_save(self):
+        user = User.objects.create_user('user', password='password')
+        self.client.force_login(user)
+        rows = [dict(PARCEL, village=village) for village in VILLAGES]
+        response = self.post({'rows': rows, 'save': True})
+        self.assertEqual(response.json()['count'], 3)
+        saved = LandPrediction.objects.order_by('pk')
+        self.assertEqual([prediction.village for prediction in saved], VILLAGES)
+        self.assertTrue(all(prediction.user == user for prediction in saved))
+        self.assertEqual([prediction.predicted_price for prediction in saved],
+                         [result['predicted_price'] for result in response.json()['results']])
+
+
+# --- Rollups ----------------------------------------------------------------
+
+class RollupTests(TestCase):
+    """The rollup tables always match aggregates over the raw predictions."""
+
+    def assertRollupsMatch(self):
+        def compare(rollup_rows, rows, key):
+            expected = {row[key]: row for row in rows}
+            actual = {getattr(rollup, key): rollup for rollup in rollup_rows.filter(count__gt=0)}
+            self.assertEqual(set(actual), set(expected))
+            for name, row in expected.items():
+                rollup = actual[name]
+                self.assertEqual(rollup.count, row['count'])
+                self.assertAlmostEqual(rollup.sum_price, row['sum_price'])
+                self.assertAlmostEqual(rollup.min_price, row['min_price'])
+                self.assertAlmostEqual(rollup.max_price, row['max_price'])
+
+        aggregates = {'count': Count('id'), 'sum_price': Sum('predicted_price'),
+                      'min_price': Min('predicted_price'), 'max_price': Max('predicted_price')}
+        predictions = LandPrediction.objects.order_by()
+        compare(VillagePredictionRollup.objects, predictions.values('village').annotate(**aggregates), 'village')
+        compare(DailyPredictionRollup.objects,
+                predictions.annotate(day=TruncDate('created_at')).values('day').annotate(**aggregates), 'day')
+
+    def test_create(self):
+        make_prediction(predicted_price=100)
+        make_prediction(predicted_price=300)
+        make_prediction(village='Village B', predicted_price=50)
+        self.assertRollupsMatch()
+
+    def test_edit(self):
+        low = make_prediction(predicted_price=100)
+        make_prediction(predicted_price=300)
+        # The old minimum goes away and the row moves to another village
+        low.predicted_price = 500
+        low.village = 'Village B'
+        low.save()
+        self.assertRollupsMatch()
+
+    def test_delete(self):
+        make_prediction(predicted_price=100)
+        highest = make_prediction(predicted_price=900)
+        only = make_prediction(village='Village B')
+        highest.delete()
+        only.delete()
+        self.assertRollupsMatch()
+
+    def test_bulk_create(self):
+        make_prediction()
+        # bulk_create() sends no signals: add_predictions() updates the rollups
+        created = LandPrediction.objects.bulk_create([
+            LandPrediction(**{**PARCEL, 'village': village, 'predicted_price': price})
+            for village, price in [('Village A', 20), ('Village C', 70), ('Village C', 90)]
+        ])
+        rollups.add_predictions(created)
+        self.assertRollupsMatch()
+
+    @override_settings(PREDICTION_CACHE={'BACKEND': 'off'})
+    def test_bulk_import(self):
+        if not HAS_MODEL:
+            self.skipTest('model artifacts not available')
+        make_prediction()
+        villages = ml_helpers.get_villages()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'parcels.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(PARCEL) + ['village'])
+            for i in range(30):
+                writer.writerow(list(PARCEL.values()) + [villages[i % 3]])
+            writer.writerow(list(PARCEL.values()) + ['Not a village'])
+
+        stats = import_file(path, chunk_size=7)
+        self.assertEqual((stats['created'], stats['invalid']), (30, 1))
+        self.assertEqual(LandPrediction.objects.count(), 31)
+        self.assertRollupsMatch()
+
+    def test_most_common_area_is_cached(self):
+        cache.delete(rollups.MOST_COMMON_AREA_KEY)
+        self.addCleanup(cache.delete, rollups.MOST_COMMON_AREA_KEY)
+        self.assertIsNone(rollups.most_common_area())
+        make_prediction(area_sqft=1200)
+        make_prediction(area_sqft=500)
+        make_prediction(area_sqft=500)
+        # "No predictions" was cached; a rebuild clears it
+        self.assertIsNone(rollups.most_common_area())
+        rollups.rebuild_rollups()
+        self.assertEqual(rollups.most_common_area(), 500)
+        with self.assertNumQueries(0):
+            self.assertEqual(rollups.most_common_area(), 500)
+
+    def test_generate_predictions(self):
+        if not HAS_MODEL:
+            self.skipTest('model artifacts not available')
+        call_command('generate_predictions', '--count', '30', '--chunk-size', '7', '--seed', '1', '--rollups', 'add',
+                     '--start', '2025-01-01', '--end', '2025-03-01', stdout=io.StringIO())
+        dates = LandPrediction.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+        self.assertGreaterEqual(dates['first'].date().isoformat(), '2025-01-01')
+        self.assertLess(dates['last'].date().isoformat(), '2025-03-01')
+        self.assertRollupsMatch()
+        # New predictions still get the current time
+        self.assertTrue(LandPrediction._meta.get_field('created_at').auto_now_add)
+        self.assertEqual(make_prediction().created_at.date(), timezone.now().date())
+
+    def test_rebuild(self):
+        make_prediction(predicted_price=100)
+        make_prediction(village='Village B', predicted_price=50)
+        # update() bypasses the signals; a rebuild brings the tables back in line
+        LandPrediction.objects.update(predicted_price=10)
+        rollups.rebuild_rollups()
+        self.assertRollupsMatch()
+
+    def test_overall_totals(self):
+        make_prediction(predicted_price=100, area_sqft=1000)
+        make_prediction(village='Village B', predicted_price=300, area_sqft=2000)
+        totals = rollups.overall_totals()
+        self.assertEqual(totals['total_predictions'], 2)
+        self.assertAlmostEqual(totals['avg_price'], 200)
+        self.assertEqual((totals['min_price'], totals['max_price']), (100, 300))
+        self.assertAlmostEqual(totals['total_market_value'], 100 * 1000 + 300 * 2000)
+
+
+# --- Bulk import ------------------------------------------------------------
+
+@override_settings(PREDICTION_CACHE={'BACKEND': 'off'})
+class BulkImportTests(TestCase):
+    """Imports save every valid row exactly once, even when they are interrupted."""
+
+    def setUp(self):
+        if not HAS_MODEL:
+            self.skipTest('model artifacts not available')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'parcels.csv')
+
+    def write_rows(self, villages, **fields):
+        with open(self.path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(PARCEL) + ['village'])
+            for village in villages:
+                writer.writerow(list({**PARCEL, **fields}.values()) + [village])
+
+    def test_resume_after_failed_chunk(self):
+        self.write_rows([VILLAGES[i % 3] for i in range(20)])
+        # The second chunk fails after its INSERT: the whole chunk is rolled back
+        add_predictions = bulk_import.add_predictions
+        calls = []
+
+        def fail_second_chunk(created):
+            calls.append(len(created))
+            add_predictions(created)
+            if len(calls) == 2:
+                raise RuntimeError('crash')
+
+        with mock.patch.object(bulk_import, 'add_predictions', side_effect=fail_second_chunk):
+            with self.assertRaises(RuntimeError):
+                import_file(self.path, chunk_size=7)
+        self.assertEqual(LandPrediction.objects.count(), 7)
+        self.assertEqual(PredictionImport.objects.get().rows_done, 7)
+
+        stats = import_file(self.path, chunk_size=7)
+        self.assertEqual((stats['resumed_from'], stats['created']), (7, 20))
+        self.assertEqual(LandPrediction.objects.count(), 20)
+        self.assertTrue(bulk_import.already_imported(self.path))
+        self.assertTrue(import_file(self.path)['already_imported'])
+
+    def test_numbers_must_be_finite(self):
+        self.write_rows([VILLAGES[0]], area_sqft='inf')
+        stats = import_file(self.path)
+        self.assertEqual((stats['created'], stats['invalid']), (0, 1))
+        self.assertIn('area_sqft must be a finite number >= 0', stats['errors'][0][1])
+
+    def test_empty_vocabulary_accepts_any_village(self):
+        self.write_rows(['Not a village'])
+        with mock.patch.object(bulk_import, 'get_villages', return_value=[]):
+            stats = import_file(self.path)
+        self.assertEqual(stats['created'], 1)
+
+    def test_upload_names(self):
+        for extension in bulk_import.UPLOAD_EXTENSIONS:
+            self.assertTrue(bulk_import.UPLOAD_NAME.match(f'0123456789abcdef{extension}'))
+        self.assertFalse(bulk_import.UPLOAD_NAME.match('0123456789abcdef.xls'))
+
+
+# --- Distribution -----------------------------------------------------------
+
+class DistributionTests(TestCase):
+    """Values on a bucket edge go to the bucket above it; the last bucket includes the top edge."""
+
+    EDGES = [0.0, 25.0, 50.0, 75.0, 100.0]
+
+    def setUp(self):
+        self.prices = [0, 24.99, 25, 49.99, 50, 75, 99.99, 100]
+        for price in self.prices:
+            make_prediction(predicted_price=price)
+
+    def test_database_counts(self):
+        counts = bucket_counts(LandPrediction.objects.all(), 'predicted_price', self.EDGES)
+        self.assertEqual(counts, [2, 2, 1, 3])
+
+    def test_numpy_counts_match(self):
+        self.assertEqual(histogram_from_values(self.prices, self.EDGES), [2, 2, 1, 3])
+
+    def test_values_outside_the_edges(self):
+        # Below the lowest edge counts in the first bucket, above the highest in the last
+        # Edges 10, 30, 50, 70, 90
+        result = distribution(LandPrediction.objects.all(), 'predicted_price', buckets=4, low=10, high=90)
+        self.assertEqual(result['data'], [3, 1, 1, 3])
+
+    def test_equal_width_edges(self):
+        result = distribution(LandPrediction.objects.all(), 'predicted_price', buckets=4)
+        self.assertEqual(result['edges'], self.EDGES)
+        self.assertEqual(result['data'], [2, 2, 1, 3])
+
+    def test_quantile_buckets(self):
+        result = distribution(LandPrediction.objects.all(), 'predicted_price', buckets=4, method='quantile')
+        self.assertEqual(sum(result['data']), len(self.prices))
+        self.assertEqual(len(result['edges']), 5)
+
+    def test_empty_queryset(self):
+        result = distribution(LandPrediction.objects.none(), 'predicted_price', buckets=3)
+        self.assertEqual(result['data'], [0, 0, 0])
+
+
+# --- Admin changelist -------------------------------------------------------
+
+class KeysetChangeListTests(TestCase):
+    """Cursor pages list every prediction once, newest first, like OFFSET pages would."""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.user)
+        for i in range(23):
+            make_prediction(predicted_price=i)
+        # Several rows share a created_at, so the id must break the ties
+        now = timezone.now()
+        for index, pk in enumerate(LandPrediction.objects.order_by('pk').values_list('pk', flat=True)):
+            LandPrediction.objects.filter(pk=pk).update(created_at=now - timedelta(minutes=index // 4))
+
+    @mock.patch.object(LandPredictionAdmin, 'list_per_page', 5)
+    def test_pages(self):
+        url = '/admin/land_price_app/landprediction/'
+        seen = []
+        query = ''
+        for _ in range(10):
+            response = self.client.get(url + query)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            seen += [prediction.pk for prediction in changelist.result_list]
+            if not changelist.next_page_url:
+                break
+            query = changelist.next_page_url
+        expected = list(LandPrediction.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/admin/land_price_app/landprediction/?after=nonsense')
+        # The admin redirects to the list with an error flag for bad lookups
+        self.assertEqual(response.status_code, 302)
+
+
+# --- Blog view counter ------------------------------------------------------
+
+class ViewCounterTests(TestCase):
+    """Buffered views end up in the database when the buffer is flushed."""
+
+    def setUp(self):
+        self.post = make_post('Counted post')
+
+    def test_local_buffer_flush(self):
+        counter = view_counter.LocalViewCounter(dict(view_counter.DEFAULTS, FLUSH_INTERVAL=3600,
+                                                     FLUSH_THRESHOLD=1000))
+        for _ in range(3):
+            counter.add(self.post.pk)
+        self.assertEqual(counter.pending(), {self.post.pk: 3})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+
+        self.assertEqual(counter.flush(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 3)
+        self.assertEqual(counter.pending(), {})
+        self.assertEqual(counter.flush(), 0)
+
+    def test_failed_flush_keeps_views(self):
+        counter = view_counter.LocalViewCounter(dict(view_counter.DEFAULTS, FLUSH_INTERVAL=3600))
+        counter.add(self.post.pk, views=2)
+        with mock.patch.object(view_counter, 'write_views', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                counter.flush()
+        self.assertEqual(counter.pending(), {self.post.pk: 2})
+
+    def test_unbuffered_backend(self):
+        counter = view_counter.ViewCounter(dict(view_counter.DEFAULTS, BACKEND='off'))
+        counter.add(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 1)
+
+    def test_shared_buffer_flush(self):
+        counter = view_counter.DjangoViewCounter(dict(view_counter.DEFAULTS, BACKEND='django', FLUSH_THRESHOLD=3))
+        with mock.patch.object(counter, '_ensure_flusher'):
+            self.assertEqual(counter.add(self.post.pk), 1)
+            self.assertFalse(counter._wake.is_set())
+            counter.add(self.post.pk, views=2)
+        # At the threshold the background thread is woken; the request doesn't flush
+        self.assertTrue(counter._wake.is_set())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+
+        self.assertEqual(counter.flush(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 3)
+        self.assertEqual(counter.pending(), {})
+
+    def test_count_view_includes_buffered_views(self):
+        counter = view_counter.LocalViewCounter(dict(view_counter.DEFAULTS, FLUSH_INTERVAL=3600))
+        with mock.patch.object(view_counter, 'get_counter', return_value=counter):
+            view_counter.count_view(self.post)
+            post = BlogPost.objects.get(pk=self.post.pk)
+            view_counter.count_view(post)
+        self.assertEqual(post.views, 2)
+
+
+# --- Blog cache -------------------------------------------------------------
+
+class BlogCacheTests(TestCase):
+    """Saving or deleting a post removes it from every cached page it appears in."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(CACHES=shared_cache_settings(directory),
+                                     BLOG_CACHE={'ENABLED': True, 'TIMEOUT': 600})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.post = make_post('First post', category='market')
+        self.other = make_post('Second post', category='market')
+
+    def test_post_is_cached(self):
+        blog_cache.get_post(self.post.slug)
+        # update() sends no signals: the cached copy is still served
+        BlogPost.objects.filter(pk=self.post.pk).update(title='Changed quietly')
+        with self.assertNumQueries(0):
+            self.assertEqual(blog_cache.get_post(self.post.slug).title, 'First post')
+
+    def test_save_invalidates_post(self):
+        blog_cache.get_post(self.post.slug)
+        self.post.title = 'Edited'
+        self.post.save()
+        self.assertEqual(blog_cache.get_post(self.post.slug).title, 'Edited')
+
+    def test_slug_change(self):
+        old_slug = self.post.slug
+        blog_cache.get_post(old_slug)
+        self.post.slug = 'moved'
+        self.post.save()
+        self.assertIsNone(blog_cache.get_post(old_slug))
+        self.assertEqual(blog_cache.get_post('moved').pk, self.post.pk)
+
+    def test_list_and_related_posts(self):
+        page, _ = blog_cache.get_list_page(1)
+        self.assertEqual(len(page.object_list), 2)
+        self.assertEqual(blog_cache.get_related_posts(self.post), [self.other])
+
+        newest = make_post('Third post', category='market')
+        page, _ = blog_cache.get_list_page(1)
+        self.assertEqual(page.object_list[0].pk, newest.pk)
+        self.assertEqual(blog_cache.get_related_posts(self.post)[0].pk, newest.pk)
+
+        newest.delete()
+        page, _ = blog_cache.get_list_page(1)
+        self.assertEqual(len(page.object_list), 2)
+        self.assertEqual(blog_cache.get_related_posts(self.post), [self.other])
+
+    def test_list_page_is_clamped(self):
+        page, _ = blog_cache.get_list_page('999')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(len(page.object_list), 2)
+        # Only the real page is stored, whatever number was asked for
+        generation = blog_cache._generation('list')
+        self.assertIsNone(blog_cache._cache().get(f'{blog_cache.KEY_PREFIX}list:{generation}:999'))
+        with self.assertNumQueries(0):
+            self.assertEqual(blog_cache.get_list_page('7')[0].number, 1)
+
+    def test_written_views_invalidate_post(self):
+        blog_cache.get_post(self.post.slug)
+        view_counter.write_views({self.post.pk: 5})
+        self.assertEqual(blog_cache.get_post(self.post.slug).views, 5)
+
+    def test_not_used_with_local_memory_cache(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertFalse(blog_cache.enabled())
+            blog_cache.get_post(self.post.slug)
+            BlogPost.objects.filter(pk=self.post.pk).update(title='Changed quietly')
+            self.assertEqual(blog_cache.get_post(self.post.slug).title, 'Changed quietly')
+
+
+# --- Blog Markdown ----------------------------------------------------------
+
+class BlogMarkupTests(SimpleTestCase):
+    """Content is escaped before it is turned into HTML."""
+
+    def test_html_is_escaped(self):
+        html = render_markdown('Hello <script>alert(1)</script>\n\n## <img src=x onerror=alert(1)>')
+        self.assertNotIn('<script>', html)
+        self.assertNotIn('<img', html)
+        self.assertIn('&lt;script&gt;', html)
+
+    def test_unsafe_links_are_dropped(self):
+        html = render_markdown('[click](javascript:alert(1)) and [data](data:text/html,x)')
+        self.assertNotIn('href', html)
+        self.assertIn('click', html)
+
+    def test_link_cannot_break_out_of_the_attribute(self):
+        html = render_markdown('[x](https://example.com/"onmouseover="alert(1))')
+        self.assertNotIn('"onmouseover', html)
+
+    def test_markup_inside_code_is_escaped(self):
+        html = render_markdown('`<b>**not bold**</b>`\n\n```\n<script>\n```')
+        self.assertIn('<code>&lt;b&gt;**not bold**&lt;/b&gt;</code>', html)
+        self.assertIn('<pre><code>&lt;script&gt;</code></pre>', html)
+
+    def test_markup(self):
+        html = render_markdown('## Title\n\n**bold** and *italic* [site](https://example.com)\n\n- one\n- two')
+        self.assertIn('<h2>Title</h2>', html)
+        self.assertIn('<strong>bold</strong> and <em>italic</em> <a href="https://example.com">site</a>', html)
+        self.assertIn('<ul><li>one</li><li>two</li></ul>', html)
+
+
+class RenderBlogPostsTests(TestCase):
+    """render_blog_posts fills in the HTML of posts saved without it."""
+
+    def test_each_post_is_rendered_once(self):
+        post = make_post('Old post', '## Heading\n\nFirst paragraph.')
+        BlogPost.objects.update(content_html='', reading_time=0, summary='')
+        with mock.patch('land_price_app.blog_markup.render_markdown', wraps=render_markdown) as render:
+            call_command('render_blog_posts', stdout=io.StringIO())
+        self.assertEqual(render.call_count, 1)
+        post.refresh_from_db()
+        self.assertIn('<h2>Heading</h2>', post.content_html)
+        self.assertEqual((post.summary, post.reading_time), ('First paragraph.', 1))
+
+
+# --- Blog search ------------------------------------------------------------
+
+class BlogSearchTests(TestCase):
+    """Title matches rank first, with or without a full-text index."""
+
+    def setUp(self):
+        blog_search.search_backend(refresh=True)
+        self.in_content = make_post('Reading land records', 'Check the drainage before you buy a plot.')
+        self.in_title = make_post('Drainage and flooding', 'Low land floods in the monsoon.')
+        self.unrelated = make_post('Soil types', 'Clay holds water.')
+
+    def test_ranking(self):
+        results = blog_search.search_posts('drainage')
+        self.assertEqual([post.pk for post in results], [self.in_title.pk, self.in_content.pk])
+        self.assertIn('<mark>', results[1].search_snippet)
+
+    def test_edits_are_indexed(self):
+        self.unrelated.content = 'Drainage channels keep clay dry.'
+        self.unrelated.save()
+        self.assertIn(self.unrelated.pk, [post.pk for post in blog_search.search_posts('drainage')])
+        self.unrelated.delete()
+        self.assertEqual(len(blog_search.search_posts('drainage')), 2)
+
+    def test_prefix_and_all_words(self):
+        self.assertEqual([post.pk for post in blog_search.search_posts('drain flood')], [self.in_title.pk])
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(blog_search.search_posts('"drainage" OR *'), blog_search.search_posts('drainage OR'))
+        self.assertEqual(blog_search.search_posts('!!!'), [])
+
+    def test_fallback_without_index(self):
+        with mock.patch.object(blog_search, 'search_backend', return_value='basic'):
+            results = blog_search.search_posts('drainage')
+        self.assertEqual([post.pk for post in results], [self.in_title.pk, self.in_content.pk])
+
+    def test_snippet_is_escaped(self):
+        post = make_post('Escaping', 'Drainage <script>alert(1)</script>')
+        result = next(p for p in blog_search.search_posts('drainage') if p.pk == post.pk)
+        self.assertNotIn('<script>', result.search_snippet)
+
+    def test_index_triggers_exist(self):
+        self.assertEqual(blog_search.missing_triggers(), [])
@@ -7,13 +7,17 @@ not intended to be used as a real, production ML model.
 """
 import os
 import pickle
+import numpy as np
 import pandas as pd
 
+# Villages in the demo dataset (also stored in feature_info for the form dropdown)
+DUMMY_VILLAGES = ['Village A', 'Village B', 'Village C', 'Village D']
+
 
 def create_dummy_dataset(target_path):
     """Create a small Excel dataset containing a Village column so the form can load it."""
     df = pd.DataFrame({
-        'Village': ['Village A', 'Village B', 'Village C', 'Village D'],
+        'Village': DUMMY_VILLAGES,
         'Area_sqft': [1000, 1500, 1200, 2000],
         'Distance_to_City_km': [5.0, 10.2, 3.5, 20.0],
         'Road_Access': ['City Road', 'Highway', 'Rural Road', 'City Road'],
@@ -34,20 +38,35 @@ class DummyModel:
     from other columns so predictions behave consistently in the demo.
     """
     def predict(self, df):
-        prices = []
-        for _, row in df.iterrows():
-            area = float(row.get('Area_sqft', 0) or 0)
-            distance = float(row.get('Distance_to_City_km', 0) or 0)
-            electricity = row.get('Electricity_Available', False)
-            # small heuristic: base price per sqft depends on area & distance
-            price = 20 + (area * 0.02) - (distance * 0.3)
-            if electricity:
-                price += 3
-            # small category signal (length of village string)
-            village = str(row.get('Village', '') or '')
-            price += min(len(village), 20) * 0.1
-            prices.append(float(price))
-        return pd.np.array(prices) if hasattr(pd, 'np') else __import__('numpy').array(prices)
+        n_rows = len(df)
+
+        def column(name, default):
+            # Missing columns behave like the old row.get(name, default)
+            if name in df.columns:
+                return df[name]
+            return pd.Series([default] * n_rows, index=df.index, dtype=object)
+
+        def truthy(values):
+            # bool() of every value, as `value or default` / `if value:` saw it
+            # per row: None, 0, False and '' are false, NaN is true
+            return values.map(bool).to_numpy(dtype=bool)
+
+        area = column('Area_sqft', 0)
+        distance = column('Distance_to_City_km', 0)
+        village = column('Village', '')
+        # float(value or 0): empty values count as 0, NaN stays NaN
+        area = area.astype(object).where(truthy(area), 0).astype(float).to_numpy()
+        distance = distance.astype(object).where(truthy(distance), 0).astype(float).to_numpy()
+        electricity = truthy(column('Electricity_Available', False))
+        # str(value or ''): a NaN village is the string 'nan'
+        village_length = village.astype(object).where(truthy(village), '').map(str).str.len().to_numpy()
+
+        # small heuristic: base price per sqft depends on area & distance
+        prices = 20 + (area * 0.02) - (distance * 0.3)
+        prices = prices + np.where(electricity, 3, 0)
+        # small category signal (length of village string)
+        prices = prices + np.minimum(village_length, 20) * 0.1
+        return prices.astype(float)
 
 
 def create_dummy_model_artifacts(base_dir=None):
@@ -94,7 +113,8 @@ def create_dummy_model_artifacts(base_dir=None):
         'numeric_features': ['Area_sqft', 'Distance_to_City_km'],
         'categorical_features': ['Village', 'Road_Access', 'Water_Source', 'Land_Use', 'Soil_Type', 'Nearby_Development'],
         'binary_features': ['Electricity_Available'],
-        'feature_order': ['Area_sqft', 'Distance_to_City_km', 'Village', 'Road_Access', 'Water_Source', 'Land_Use', 'Soil_Type', 'Nearby_Development', 'Electricity_Available']
+        'feature_order': ['Area_sqft', 'Distance_to_City_km', 'Village', 'Road_Access', 'Water_Source', 'Land_Use', 'Soil_Type', 'Nearby_Development', 'Electricity_Available'],
+        'villages': sorted(DUMMY_VILLAGES)
     }
 
     with open(model_path, 'wb') as f:
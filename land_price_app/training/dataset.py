@@ -0,0 +1,141 @@
+"""
+Fast access to the land price dataset.
+
+Parsing the Excel workbook with openpyxl is very slow, so the first load
+converts it to a columnar Feather file in ``.dataset_cache/``. The cache file
+is named after the workbook's content hash, so an edited workbook gets a new
+cache file automatically. Later loads read only the requested columns and
+memory-map the file instead of parsing it again.
+
+If pyarrow is not installed, a pickled DataFrame is used as the cache instead
+(still much faster than Excel, but always reads every column).
+
+This module does not import Django, so train_model.py can use it as a script.
+"""
+import os
+import json
+import hashlib
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather  # Columnar format with memory-mapped reads
+except ImportError:  # pragma: no cover - depends on the installation
+    feather = None
+
+# The source workbook (project root) and the folder that holds the cache files
+DATASET_FILENAME = '0a73f94e-90e3-4ebd-9d94-15dc8066ad52.xlsx'
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                    DATASET_FILENAME)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.dataset_cache')
+
+# Remembers the hash of each source file so we don't re-hash it on every load:
+# {source path: [mtime_ns, size, sha256]}
+MANIFEST_NAME = 'manifest.json'
+
+
+def _read_manifest(cache_dir):
+    """Return the manifest dict (empty if missing or unreadable)."""
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(cache_dir, manifest):
+    """Write the manifest atomically (write to a temp file, then rename)."""
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """Return the sha256 hex digest of a file (read in chunks)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hash(path=None, cache_dir=CACHE_DIR):
+    """Return the content hash of the source workbook.
+
+    The hash is remembered in the manifest together with the file's mtime and
+    size, so an unchanged file is only hashed once.
+    """
+    path = os.path.abspath(path or DEFAULT_DATASET_PATH)
+    stat = os.stat(path)
+    manifest = _read_manifest(cache_dir)
+    entry = manifest.get(path)
+    if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+        return entry[2]
+
+    digest = file_hash(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest[path] = [stat.st_mtime_ns, stat.st_size, digest]
+        _write_manifest(cache_dir, manifest)
+    except OSError:
+        # Read-only deployments still work, they just hash every time
+        pass
+    return digest
+
+
+def cache_path(path=None, cache_dir=CACHE_DIR):
+    """Return the cache file path for a source workbook."""
+    extension = 'feather' if feather is not None else 'pkl'
+    return os.path.join(cache_dir, f'{source_hash(path, cache_dir)[:16]}.{extension}')
+
+
+def build_cache(path=None, cache_dir=CACHE_DIR):
+    """Convert the workbook to the columnar cache (if not done yet) and return its path."""
+    path = os.path.abspath(path or DEFAULT_DATASET_PATH)
+    target = cache_path(path, cache_dir)
+    if os.path.exists(target):
+        return target
+
+    df = pd.read_excel(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temp file and rename, so other processes never read a half file
+    tmp_target = f'{target}.{os.getpid()}.tmp'
+    if feather is not None:
+        # Uncompressed Feather can be memory-mapped without copying
+        df.to_feather(tmp_target, compression='uncompressed')
+    else:
+        df.to_pickle(tmp_target)
+    os.replace(tmp_target, target)
+    return target
+
+
+def load_dataset(path=None, columns=None, cache_dir=CACHE_DIR):
+    """Load the dataset (optionally only some columns) through the columnar cache.
+
+    Falls back to reading the workbook directly if the cache can't be written.
+    """
+    path = os.path.abspath(path or DEFAULT_DATASET_PATH)
+    try:
+        target = build_cache(path, cache_dir)
+    except OSError:
+        # No write access for the cache: read the workbook directly
+        return pd.read_excel(path, usecols=columns)
+
+    if target.endswith('.feather'):
+        table = feather.read_table(target, columns=columns, memory_map=True)
+        return table.to_pandas()
+
+    df = pd.read_pickle(target)
+    return df[columns] if columns is not None else df
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """Delete all cache files. Returns how many files were removed."""
+    removed = 0
+    if not os.path.isdir(cache_dir):
+        return removed
+    for name in os.listdir(cache_dir):
+        os.remove(os.path.join(cache_dir, name))
+        removed += 1
+    return removed
@@ -1,29 +1,69 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from joblib import Memory
+from sklearn.model_selection import train_test_split, GridSearchCV, KFold
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.pipeline import Pipeline
 import pickle
 import os
+import argparse
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+import sklearn
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from . import dataset  # When imported as land_price_app.training.train_model
+except ImportError:
+    import dataset  # When run as a script: python land_price_app/training/train_model.py
+
+try:
+    from land_price_app.fast_forest import compile_model  # Only importable as part of the package
+except ImportError:
+    compile_model = None
+
 # Define column types
 NUMERIC_FEATURES = ['Area_sqft', 'Distance_to_City_km']
 CATEGORICAL_FEATURES = ['Village', 'Road_Access', 'Water_Source', 'Land_Use', 'Soil_Type', 'Nearby_Development']
 BINARY_FEATURES = ['Electricity_Available']
 TARGET = 'Price_per_sqft'
 
+# Hyperparameters of the model trained by default
+REGRESSOR_PARAMS = {'n_estimators': 100, 'random_state': 42}
+
+# Regressor parameters shared by every --search candidate
+SEARCH_BASE_PARAMS = {'random_state': 42}
+
+# Grid explored by --search (keys are Pipeline parameter names)
+SEARCH_GRID = {
+    'regressor__n_estimators': [50, 100, 200],
+    'regressor__max_depth': [None, 8, 16],
+    'regressor__min_samples_leaf': [1, 2, 4],
+    'regressor__max_features': [1.0, 0.5, 'sqrt'],
+}
+
+# Training cache: joblib keeps fitted preprocessors here (shared by all
+# search folds and by runs that only change the regressor), and artifacts/
+# keeps the saved model files of each training fingerprint
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '.training_cache')
+ARTIFACT_CACHE_DIR = os.path.join(CACHE_DIR, 'artifacts')
+ARTIFACT_NAMES = ('feature_info.pkl', 'ml_model.pkl')  # Feature file first (see save_artifacts)
+
+# Path to the dataset
+DATASET_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            '0a73f94e-90e3-4ebd-9d94-15dc8066ad52.xlsx')
+
 def load_data():
     """Load and prepare the dataset."""
-    # Path to the dataset
-    dataset_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                               '0a73f94e-90e3-4ebd-9d94-15dc8066ad52.xlsx')
-    
-    # Read the dataset
-    df = pd.read_excel(dataset_path)
+    # Read the dataset (through the columnar cache - the workbook is only
+    # parsed again when its contents change)
+    df = dataset.load_dataset(DATASET_PATH)
     
     # Handle missing values in Water_Source column
     if 'Water_Source' in df.columns:
@@ -49,28 +89,151 @@ def create_preprocessor():
     
     return preprocessor
 
-def train_model():
-    """Train the Random Forest model and save it along with the preprocessor."""
-    print("Loading data...")
-    df = load_data()
-    
-    # Prepare feature matrix X and target vector y
+def build_pipeline(params=None, memory=None):
+    """Create the preprocessing + RandomForest pipeline.
+
+    With `memory` the fitted preprocessor is cached, so fits that only differ
+    in the regressor's hyperparameters reuse the same transformed matrix.
+    """
+    return Pipeline([
+        ('preprocessor', create_preprocessor()),
+        ('regressor', RandomForestRegressor(**(params or REGRESSOR_PARAMS)))
+    ], memory=memory)
+
+def split_data(df):
+    """Return X_train, X_test, y_train, y_test (same split for every training mode)."""
     X = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES + BINARY_FEATURES]
     y = df[TARGET]
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+def write_atomic(path, write):
+    """Write a file through write(f) so readers only ever see the old or the new file.
+
+    The data goes to a temporary file in the same directory, is flushed to
+    disk and then renamed over `path` (os.replace is atomic on one filesystem).
+    """
+    directory = os.path.dirname(path)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                     delete=False) as f:
+        tmp_path = f.name
+        try:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def save_feature_info(df):
+    """Save the feature lists and the village vocabulary of `df` as feature_info.pkl."""
+    feature_info = {
+        'numeric_features': NUMERIC_FEATURES,
+        'categorical_features': CATEGORICAL_FEATURES,
+        'binary_features': BINARY_FEATURES,
+        'feature_order': NUMERIC_FEATURES + CATEGORICAL_FEATURES + BINARY_FEATURES,
+        # Village vocabulary for the prediction form's dropdown, so the web app
+        # never has to open the Excel workbook
+        'villages': sorted(df['Village'].dropna().astype(str).unique())
+    }
     
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    feature_path = os.path.join(os.path.dirname(__file__), 'feature_info.pkl')
+    write_atomic(feature_path, lambda f: pickle.dump(feature_info, f))
     
-    # Create preprocessing pipeline
-    print("Creating preprocessing pipeline...")
-    preprocessor = create_preprocessor()
+    print(f"Feature information saved at: {feature_path}")
+
+def save_artifacts(model, df):
+    """Save the fitted pipeline and the feature information next to this file."""
+    # Don't pickle the search cache location with the model
+    model.set_params(memory=None)
     
-    # Create and train the model pipeline
+    # The feature information goes first: a running server reloads when the
+    # model file changes, and by then the matching feature file is in place
+    save_feature_info(df)
+    
+    model_path = os.path.join(os.path.dirname(__file__), 'ml_model.pkl')
+    write_atomic(model_path, lambda f: pickle.dump(model, f))
+    
+    print(f"Model saved successfully at: {model_path}")
+
+def training_fingerprint(params=None):
+    """Return a hash of everything the trained artifacts depend on.
+
+    Covers the dataset contents, the feature lists and target, the
+    hyperparameters and the scikit-learn version (pickles are version bound).
+    The dataset hash comes from the dataset cache manifest, so this doesn't
+    read the workbook when it hasn't changed.
+    """
+    config = {
+        'dataset': dataset.source_hash(DATASET_PATH),
+        'numeric_features': NUMERIC_FEATURES,
+        'categorical_features': CATEGORICAL_FEATURES,
+        'binary_features': BINARY_FEATURES,
+        'target': TARGET,
+        'params': params or REGRESSOR_PARAMS,
+        'sklearn': sklearn.__version__,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+def copy_atomic(source, target):
+    """Copy a file with write_atomic, so the target is never half-written."""
+    with open(source, 'rb') as src:
+        write_atomic(target, lambda f: shutil.copyfileobj(src, f))
+
+def restore_cached_artifacts(fingerprint):
+    """Copy the cached artifacts of a fingerprint into place. Returns False on a cache miss."""
+    cached_dir = os.path.join(ARTIFACT_CACHE_DIR, fingerprint[:16])
+    if not all(os.path.exists(os.path.join(cached_dir, name)) for name in ARTIFACT_NAMES):
+        return False
+    for name in ARTIFACT_NAMES:
+        source = os.path.join(cached_dir, name)
+        target = os.path.join(os.path.dirname(__file__), name)
+        # Leave identical files alone, so running servers don't see a "new" model
+        if os.path.exists(target) and dataset.file_hash(target) == dataset.file_hash(source):
+            continue
+        # A server reloading the model never reads a half-written file
+        copy_atomic(source, target)
+    return True
+
+def store_cached_artifacts(fingerprint):
+    """Copy the freshly saved artifacts into the cache under their fingerprint."""
+    cached_dir = os.path.join(ARTIFACT_CACHE_DIR, fingerprint[:16])
+    os.makedirs(cached_dir, exist_ok=True)
+    # Atomic too: an interrupted copy must not leave a truncated file to restore later
+    for name in ARTIFACT_NAMES:
+        copy_atomic(os.path.join(os.path.dirname(__file__), name), os.path.join(cached_dir, name))
+
+def clear_training_cache():
+    """Delete the preprocessor and artifact caches."""
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+def train_model(force=False, params=None):
+    """Train the Random Forest model and save it along with the preprocessor.
+
+    `params` are the regressor's hyperparameters (default REGRESSOR_PARAMS).
+    If the dataset, feature lists and hyperparameters match an earlier run,
+    that run's artifacts are reused instead (unless force=True).
+    """
+    fingerprint = training_fingerprint(params)
+    if not force and restore_cached_artifacts(fingerprint):
+        print(f"Training inputs unchanged (fingerprint {fingerprint[:16]}), reusing cached model.")
+        return
+    
+    print("Loading data...")
+    df = load_data()
+    
+    # Split the data
+    X_train, X_test, y_train, y_test = split_data(df)
+    
+    # Create and train the model pipeline (the fitted preprocessor is cached,
+    # so a change to the hyperparameters only refits the regressor)
     print("Training model...")
-    model = Pipeline([
-        ('preprocessor', preprocessor),
-        ('regressor', RandomForestRegressor(n_estimators=100, random_state=42))
-    ])
+    model = build_pipeline(params, memory=Memory(CACHE_DIR, verbose=0))
     
     model.fit(X_train, y_train)
     
@@ -84,25 +247,159 @@ def train_model():
     
     # Save the model
     print("Saving model...")
-    model_path = os.path.join(os.path.dirname(__file__), 'ml_model.pkl')
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
+    save_artifacts(model, df)
+    store_cached_artifacts(fingerprint)
+
+def measure_latency(predict, row, repeat=50):
+    """Return the median and p95 time (ms) of predict(row) over `repeat` calls."""
+    predict(row)  # Warm-up
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(row)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return durations[len(durations) // 2], durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+
+def search_models(folds=5, n_jobs=-1, top=10, repeat=50, engine='sklearn'):
+    """Grid-search the forest's hyperparameters with k-fold cross-validation.
+
+    The folds run in parallel worker processes (n_jobs=-1 uses every core)
+    and share the cached preprocessor fits. The `top` candidates by mean CV
+    R² are then refitted on the training split and measured: test R²,
+    single-row latency with `engine` and pickled size.
+
+    Returns (leaderboard, df): leaderboard rows are dicts sorted by CV R²,
+    each with its fitted pipeline under 'model'.
+    """
+    if engine == 'compiled' and compile_model is None:
+        raise ValueError("The compiled engine needs the package import: "
+                         "python -m land_price_app.training.train_model")
+    print("Loading data...")
+    df = load_data()
+    X_train, X_test, y_train, y_test = split_data(df)
     
-    print(f"Model saved successfully at: {model_path}")
+    candidates = 1
+    for values in SEARCH_GRID.values():
+        candidates *= len(values)
+    print(f"Searching {candidates} candidates x {folds} folds (n_jobs={n_jobs})...")
+    start = time.perf_counter()
+    search = GridSearchCV(
+        build_pipeline(SEARCH_BASE_PARAMS, memory=Memory(CACHE_DIR, verbose=0)),
+        SEARCH_GRID,
+        cv=KFold(n_splits=folds, shuffle=True, random_state=42),
+        scoring='r2',
+        n_jobs=n_jobs,
+        refit=False,
+    )
+    search.fit(X_train, y_train)
+    print(f"Search finished in {time.perf_counter() - start:.1f}s")
     
-    # Save feature lists for reference
-    feature_info = {
-        'numeric_features': NUMERIC_FEATURES,
-        'categorical_features': CATEGORICAL_FEATURES,
-        'binary_features': BINARY_FEATURES,
-        'feature_order': NUMERIC_FEATURES + CATEGORICAL_FEATURES + BINARY_FEATURES
-    }
+    results = search.cv_results_
+    ranked = np.argsort(-results['mean_test_score'])[:top]
+    row = X_test.iloc[:1]
+    leaderboard = []
+    for index in ranked:
+        params = results['params'][index]
+        model = build_pipeline({**SEARCH_BASE_PARAMS, **{k.split('__', 1)[1]: v for k, v in params.items()}},
+                               memory=Memory(CACHE_DIR, verbose=0))
+        model.fit(X_train, y_train)
+        model.set_params(memory=None)
+        if engine == 'compiled':
+            compiled = compile_model(model)
+            p50, p95 = measure_latency(compiled.predict, row, repeat)
+        else:
+            p50, p95 = measure_latency(model.predict, row, repeat)
+        leaderboard.append({
+            'params': {k.split('__', 1)[1]: v for k, v in params.items()},
+            'cv_r2': float(results['mean_test_score'][index]),
+            'cv_r2_std': float(results['std_test_score'][index]),
+            'test_r2': float(model.score(X_test, y_test)),
+            'latency_ms_p50': p50,
+            'latency_ms_p95': p95,
+            'size_kb': len(pickle.dumps(model)) / 1024,
+            'model': model,
+        })
+    return leaderboard, df
+
+def select_model(leaderboard, latency_budget_ms=None, max_size_kb=None):
+    """Pick the most accurate (by CV R²) entry that fits the budgets, or None."""
+    for entry in leaderboard:
+        if latency_budget_ms is not None and entry['latency_ms_p50'] > latency_budget_ms:
+            continue
+        if max_size_kb is not None and entry['size_kb'] > max_size_kb:
+            continue
+        return entry
+    return None
+
+def print_leaderboard(leaderboard, selected=None):
+    """Print accuracy against latency and size for every measured candidate."""
+    print(f"{'#':>3} {'CV R²':>14} {'test R²':>8} {'p50 ms':>8} {'p95 ms':>8} {'size KB':>9}  params")
+    for rank, entry in enumerate(leaderboard, 1):
+        marker = '*' if entry is selected else ' '
+        params = ', '.join(f"{k}={v}" for k, v in entry['params'].items())
+        print(f"{rank:>2}{marker} {entry['cv_r2']:>7.4f}±{entry['cv_r2_std']:.4f} {entry['test_r2']:>8.4f} "
+              f"{entry['latency_ms_p50']:>8.3f} {entry['latency_ms_p95']:>8.3f} {entry['size_kb']:>9.0f}  {params}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the land price model.')
+    parser.add_argument('--search', action='store_true',
+                        help='Cross-validated hyperparameter search with a latency/size leaderboard')
+    parser.add_argument('--folds', type=int, default=5, help='Cross-validation folds (default 5)')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel worker processes (default -1 = all cores)')
+    parser.add_argument('--top', type=int, default=10, help='Candidates to refit and measure (default 10)')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed predictions per candidate (default 50)')
+    parser.add_argument('--engine', choices=['sklearn', 'compiled'], default='sklearn',
+                        help='Inference engine to time (compiled needs python -m)')
+    parser.add_argument('--latency-budget-ms', type=float, default=None,
+                        help='Only select models whose median single-row latency is within this budget')
+    parser.add_argument('--max-size-kb', type=float, default=None,
+                        help='Only select models whose pickle is at most this size')
+    parser.add_argument('--save', action='store_true', help='Save the selected model as ml_model.pkl')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the leaderboard to this JSON file')
+    parser.add_argument('--params', type=json.loads, default=None,
+                        help='Regressor hyperparameters as JSON, e.g. \'{"n_estimators": 200}\' '
+                             '(default %s)' % json.dumps(REGRESSOR_PARAMS).replace('%', '%%'))
+    parser.add_argument('--force', action='store_true', help='Retrain even if the training inputs are unchanged')
+    parser.add_argument('--clear-cache', action='store_true', help='Delete the training cache first')
+    parser.add_argument('--feature-info-only', action='store_true',
+                        help='Only rewrite feature_info.pkl from the dataset (keeps ml_model.pkl)')
+    args = parser.parse_args(argv)
     
-    feature_path = os.path.join(os.path.dirname(__file__), 'feature_info.pkl')
-    with open(feature_path, 'wb') as f:
-        pickle.dump(feature_info, f)
+    if args.clear_cache:
+        clear_training_cache()
+        print("Training cache cleared.")
     
-    print(f"Feature information saved at: {feature_path}")
+    if args.feature_info_only:
+        save_feature_info(load_data())
+        return
+    
+    if not args.search:
+        train_model(force=args.force, params=args.params)
+        return
+    
+    leaderboard, df = search_models(args.folds, args.jobs, args.top, args.repeat, args.engine)
+    selected = select_model(leaderboard, args.latency_budget_ms, args.max_size_kb)
+    print_leaderboard(leaderboard, selected)
+    
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump([{k: v for k, v in entry.items() if k != 'model'} for entry in leaderboard], f, indent=2)
+        print(f"Leaderboard written to: {args.json_path}")
+    
+    if selected is None:
+        print("No candidate meets the latency/size budget.")
+        return
+    print(f"Selected: {selected['params']} (test R² {selected['test_r2']:.4f}, "
+          f"{selected['latency_ms_p50']:.3f} ms, {selected['size_kb']:.0f} KB)")
+    if args.save:
+        print("Saving model...")
+        save_artifacts(selected['model'], df)
+        # Cached like a plain training run with the same hyperparameters,
+        # so running with --params reuses it instead of retraining
+        params = {**SEARCH_BASE_PARAMS, **selected['params']}
+        store_cached_artifacts(training_fingerprint(params))
+        print(f"Cached; train again with: --params '{json.dumps(params)}'")
 
 if __name__ == '__main__':
-    train_model()
\ No newline at end of file
+    main()
\ No newline at end of file
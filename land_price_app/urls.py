@@ -18,6 +18,19 @@ urlpatterns = [
     # URL: /result/
     path('result/', views.result, name='result'),
     
+    # Batch prediction API - score many parcels in one JSON request
+    # URL: /api/predict/batch/
+    path('api/predict/batch/', views.predict_batch_api, name='predict_batch_api'),
+    
+    # Health checks for the load balancer (no trailing slash, no redirects)
+    # /healthz - the worker is alive; /readyz - the model is loaded and warm
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+    
+    # Prediction export - streamed CSV/JSON Lines download (requires login)
+    # URL: /predictions/export/?start=2025-01-01&end=2025-01-31&village=...&format=jsonl&gzip=1
+    path('predictions/export/', views.export_predictions, name='export_predictions'),
+    
     # Dashboard page - shows analytics (requires login)
     # URL: /dashboard/
     path('dashboard/', views.dashboard, name='dashboard'),
@@ -34,6 +47,10 @@ urlpatterns = [
     # URL: /blog/
     path('blog/', views.blog, name='blog'),
     
+    # Blog search - ranked full-text search over all posts
+    # URL: /blog/search/?q=road+access (before blog_detail, or "search" would be taken as a slug)
+    path('blog/search/', views.blog_search, name='blog_search'),
+    
     # Blog detail page - shows single blog post
     # <slug:slug> means capture the slug from URL (e.g., /blog/how-to-buy-land/)
     # slug is URL-friendly version of title
@@ -0,0 +1,292 @@
+# Buffered view counter for blog posts.
+#
+# Saving the post on every page view (views += 1; save()) costs one write per
+# hit and loses increments when two requests read the same old value. The
+# counter here only adds the hit to a buffer; the buffered hits are written
+# as ONE "UPDATE ... SET views = views + n" per post, every FLUSH_INTERVAL
+# seconds or as soon as FLUSH_THRESHOLD hits are waiting.
+#
+# Settings (see settings.BLOG_VIEW_COUNTER):
+#   BACKEND          'local' (buffer in each worker process), 'django' (buffer
+#                    in Django's shared cache, e.g. Redis/Memcached) or 'off'
+#                    (one atomic UPDATE per view, no buffering)
+#   FLUSH_INTERVAL   seconds between flushes
+#   FLUSH_THRESHOLD  flush as soon as this many views are waiting
+#
+# Flushes run in a background thread of each worker, never in the request.
+#   CACHE_ALIAS      which Django cache to use for the 'django' backend
+#
+# Local buffers are flushed when the process exits (atexit, and gunicorn's
+# worker_exit hook); `manage.py flush_blog_views` flushes the shared buffer.
+import atexit
+import logging
+import os
+import threading
+
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# Default settings (used for any key missing from settings.BLOG_VIEW_COUNTER)
+DEFAULTS = {
+    'BACKEND': 'local',
+    'FLUSH_INTERVAL': 10,
+    'FLUSH_THRESHOLD': 100,
+    'CACHE_ALIAS': 'default',
+}
+
+
+def write_views(counts):
+    """Add {post id: views} to the posts, one F() update per post."""
+    from . import blog_cache
+    from .models import BlogPost
+    with transaction.atomic():
+        for post_id, views in counts.items():
+            BlogPost.objects.filter(pk=post_id).update(views=F('views') + views)
+    # The cached posts still have the old counts
+    blog_cache.forget_posts(list(counts))
+
+
+class ViewCounter:
+    """Base class ('off' backend): every view is written at once, atomically."""
+
+    backend = 'off'
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self.recorded = 0   # Views recorded by this process
+        self.flushes = 0    # Flushes that wrote something
+        self.written = 0    # Views written by those flushes
+
+    def add(self, post_id, views=1):
+        """Record views of a post.
+
+        Returns how many views to add to a BlogPost loaded before this call
+        to show its current total (the buffered views, this one included).
+        """
+        write_views({post_id: views})
+        self._count(recorded=views, flushes=1, written=views)
+        return views
+
+    def pending(self):
+        """Return {post id: buffered views}."""
+        return {}
+
+    def flush(self):
+        """Write the buffered views to the database; returns how many were written."""
+        return 0
+
+    def _count(self, recorded=0, flushes=0, written=0):
+        with self._lock:
+            self.recorded += recorded
+            self.flushes += flushes
+            self.written += written
+
+    def stats(self):
+        """Return counters for monitoring."""
+        return {
+            'backend': self.backend,
+            'recorded': self.recorded,
+            'flushes': self.flushes,
+            'written': self.written,
+            'pending': sum(self.pending().values()),
+        }
+
+
+class BufferedViewCounter(ViewCounter):
+    """Base class for the buffered backends: a background thread writes the buffer.
+
+    The thread flushes every FLUSH_INTERVAL seconds, or at once when add()
+    wakes it because FLUSH_THRESHOLD views are waiting. Requests never wait
+    for a flush.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._thread = None
+        self._pid = None
+        self._wake = threading.Event()
+
+    def _ensure_flusher(self):
+        """Start the flush thread (again after a fork - threads don't survive it)."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='blog-view-flusher', daemon=True)
+            self._thread.start()
+
+    def _flush_soon(self):
+        """Wake the background thread to flush now (the request doesn't wait)."""
+        self._wake.set()
+
+    def _flush_due(self, woken):
+        """True when the background thread should flush (woken early, or the interval passed)."""
+        return True
+
+    def _run(self):
+        """Background loop: flush every FLUSH_INTERVAL seconds or when woken at the threshold."""
+        while True:
+            woken = self._wake.wait(self.config['FLUSH_INTERVAL'])
+            self._wake.clear()
+            try:
+                if self._flush_due(woken):
+                    self.flush()
+            except Exception:
+                logger.exception('Could not write buffered blog views')
+            finally:
+                # This thread has its own database connection; don't keep it open
+                close_old_connections()
+
+
+class LocalViewCounter(BufferedViewCounter):
+    """Buffer inside this worker process, flushed by a background thread."""
+
+    backend = 'local'
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._buffer = {}            # post id -> views not yet written
+
+    def add(self, post_id, views=1):
+        self._ensure_flusher()
+        with self._lock:
+            self._buffer[post_id] = self._buffer.get(post_id, 0) + views
+            self.recorded += views
+            waiting = self._buffer[post_id]
+            due = sum(self._buffer.values()) >= self.config['FLUSH_THRESHOLD']
+        if due:
+            self._flush_soon()
+        return waiting
+
+    def pending(self):
+        with self._lock:
+            return dict(self._buffer)
+
+    def flush(self):
+        with self._lock:
+            counts, self._buffer = self._buffer, {}
+        if not counts:
+            return 0
+        try:
+            write_views(counts)
+        except Exception:
+            # Keep the views for the next attempt instead of losing them
+            with self._lock:
+                for post_id, views in counts.items():
+                    self._buffer[post_id] = self._buffer.get(post_id, 0) + views
+            raise
+        written = sum(counts.values())
+        self._count(flushes=1, written=written)
+        return written
+
+
+class DjangoViewCounter(BufferedViewCounter):
+    """Buffer shared by all workers through Django's cache framework.
+
+    Every post has one counter key. incr() and decr() are atomic on
+    Redis/Memcached, and a flush subtracts exactly what it wrote, so views
+    added while flushing are kept for the next flush. A view costs one
+    incr(); the interval check runs in each worker's background thread.
+    """
+
+    backend = 'django'
+
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.config['CACHE_ALIAS']]
+
+    def _key(self, post_id):
+        return f'land_price:blog_views:{post_id}'
+
+    def add(self, post_id, views=1):
+        self._ensure_flusher()
+        cache = self._cache()
+        key = self._key(post_id)
+        try:
+            waiting = cache.incr(key, views)
+        except ValueError:
+            # First view since the key expired or was flushed away: add() only
+            # creates the key when it's still missing, incr() then counts atomically
+            cache.add(key, 0, timeout=None)
+            waiting = cache.incr(key, views)
+        self._count(recorded=views)
+        if waiting >= self.config['FLUSH_THRESHOLD']:
+            self._flush_soon()
+        return waiting
+
+    def _flush_due(self, woken):
+        """Woken at the threshold, or the first worker to check in this FLUSH_INTERVAL."""
+        if woken:
+            return True
+        return self._cache().add('land_price:blog_views:next_flush', 1, timeout=self.config['FLUSH_INTERVAL'])
+
+    def pending(self):
+        from .models import BlogPost
+        # Blog posts are few: ask for every post's counter in one round trip
+        keys = {self._key(post_id): post_id for post_id in BlogPost.objects.values_list('pk', flat=True)}
+        stored = self._cache().get_many(list(keys))
+        return {keys[key]: views for key, views in stored.items() if views}
+
+    def flush(self):
+        cache = self._cache()
+        # Only one process flushes at a time, or the same views would be written twice
+        if not cache.add('land_price:blog_views:flushing', 1, timeout=60):
+            return 0
+        try:
+            counts = self.pending()
+            if not counts:
+                return 0
+            write_views(counts)
+            for post_id, views in counts.items():
+                cache.decr(self._key(post_id), views)
+        finally:
+            cache.delete('land_price:blog_views:flushing')
+        written = sum(counts.values())
+        self._count(flushes=1, written=written)
+        return written
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_counter():
+    """Return the view counter configured in settings (created once)."""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                from django.conf import settings
+                config = dict(DEFAULTS, **getattr(settings, 'BLOG_VIEW_COUNTER', {}))
+                backends = {
+                    'local': LocalViewCounter,
+                    'django': DjangoViewCounter,
+                }
+                _counter = backends.get(config['BACKEND'], ViewCounter)(config)
+    return _counter
+
+
+def count_view(post):
+    """Record one view of a post and set post.views to the total including buffered views."""
+    post.views += get_counter().add(post.pk)
+    return post
+
+
+def flush_views():
+    """Write this process's buffered views (and the shared buffer for 'django')."""
+    if _counter is None:
+        return 0
+    return _counter.flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush_views()
+    except Exception:
+        logger.exception('Could not write buffered blog views at exit')
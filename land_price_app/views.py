@@ -3,10 +3,18 @@ from django.shortcuts import render, redirect  # render: show HTML pages, redire
 from django.contrib.auth.decorators import login_required  # Require user to be logged in
 from django.contrib.auth import logout  # Function to log out user
 from django.contrib import messages  # Show success/error messages to user
-from django.db.models import Avg, Min, Max, Count  # Database calculation functions
+from django.http import JsonResponse, StreamingHttpResponse  # JSON API replies, streamed downloads
+from django.views.decorators.csrf import csrf_exempt  # Allow API calls without a CSRF token
+from django.views.decorators.http import require_POST  # Only allow POST requests
 from .models import LandPrediction, ContactMessage, BlogPost  # Import our database models
-from .forms import LandPredictionForm, CustomUserCreationForm  # Import our forms
-from .ml_helpers import predict_price  # Import ML prediction function
+from .models import DailyPredictionRollup, VillagePredictionRollup  # Pre-computed totals
+from .forms import LandPredictionForm, CustomUserCreationForm, PredictionRowForm, PredictionExportForm  # Import our forms
+from .ml_helpers import get_villages, predict_price, predict_prices  # Import ML prediction functions
+from .rollups import add_predictions, most_common_area, overall_totals  # Pre-computed prediction totals
+from .distribution import distribution, DEFAULT_LABELS  # Histogram bucket counts
+from .view_counter import count_view  # Buffered blog view counts
+from . import blog_cache  # Cached blog posts
+from .blog_search import search_posts  # Full-text blog search
 
 # This function shows the home page with prediction form
 def home(request):
@@ -14,14 +22,9 @@ def home(request):
     # Create an empty form for user to fill
     form = LandPredictionForm()
     
-    # Calculate statistics from all predictions in database
-    # aggregate() performs calculations on multiple records
-    stats = LandPrediction.objects.aggregate(
-        avg_price=Avg('predicted_price'),      # Average of all predicted prices
-        min_price=Min('predicted_price'),      # Minimum price found
-        max_price=Max('predicted_price'),      # Maximum price found
-        total_predictions=Count('id')          # Count total number of predictions
-    )
+    # Statistics over all predictions, read from the small rollup table
+    # (kept up to date on every save) instead of scanning every prediction
+    stats = overall_totals()
 
     # Get the 5 most recent predictions (order by newest first, limit to 5)
     recent_predictions = LandPrediction.objects.order_by('-created_at')[:5]
@@ -90,6 +93,158 @@ def result(request):
     # If form not submitted or invalid, go back to home page
     return redirect('land_price_app:home')
 
+# CSRF check for a view marked csrf_exempt: runs the same check the
+# middleware would. Returns an error response, or None if the check passes.
+def _csrf_failure(request):
+    from django.middleware.csrf import CsrfViewMiddleware
+    check = CsrfViewMiddleware(lambda req: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+# This API scores many parcels in one request (JSON in, JSON out)
+# csrf_exempt: scoring (without "save") is open to scripts/other services.
+# Saving rows needs a logged-in user and then the CSRF check is done in the view.
+@csrf_exempt
+@require_POST
+def predict_batch_api(request):
+    """Predict prices for a batch of parcels sent as JSON.
+
+    Body: {"rows": [{...}, ...], "save": false}
+    Invalid rows are reported in "errors" and the valid rows are still scored.
+    "save": true needs a logged-in user (and a CSRF token).
+    """
+    import json                       # For reading the request body
+    from django.conf import settings  # For the batch size limit
+    from django.core.exceptions import RequestDataTooBig
+
+    max_rows = getattr(settings, 'BATCH_PREDICTION_MAX_ROWS', 5000)
+
+    # Step 1: Read the JSON body
+    try:
+        payload = json.loads(request.body)
+    except RequestDataTooBig:
+        return JsonResponse({'error': 'Request body too large.'}, status=413)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': 'Request body must be valid JSON.'}, status=400)
+
+    # Accept either {"rows": [...]} or a bare list of rows
+    if isinstance(payload, list):
+        payload = {'rows': payload}
+    if not isinstance(payload, dict) or not isinstance(payload.get('rows'), list):
+        return JsonResponse({'error': 'Expected a JSON object with a "rows" list.'}, status=400)
+
+    # Saving writes to the database: only for logged-in users, and a browser
+    # session must not be usable from other sites (CSRF)
+    save = bool(payload.get('save'))
+    if save:
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Log in to save predictions.'}, status=401)
+        if _csrf_failure(request) is not None:
+            return JsonResponse({'error': 'CSRF check failed.'}, status=403)
+
+    rows = payload['rows']
+    if not rows:
+        return JsonResponse({'error': 'No rows to predict.'}, status=400)
+    if len(rows) > max_rows:
+        return JsonResponse({'error': f'Too many rows: {len(rows)} (maximum is {max_rows}).'}, status=413)
+
+    # Step 2: Validate every row, remember which ones are OK
+    villages = set(get_villages()) or None  # Known villages (None = no list available)
+    valid_indexes = []  # Position of each valid row in the request
+    valid_data = []     # Cleaned data for each valid row
+    errors = []         # Validation errors for the invalid rows
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'errors': {'__all__': ['Row must be a JSON object.']}})
+            continue
+        form = PredictionRowForm(row, villages=villages)
+        if form.is_valid():
+            valid_indexes.append(index)
+            valid_data.append(form.cleaned_data)
+        else:
+            errors.append({'index': index, 'errors': form.errors.get_json_data()})
+
+    # Step 3: Score all valid rows with one vectorized model call
+    # (no model call at all when every row is invalid)
+    prices = []
+    if valid_data:
+        try:
+            prices = predict_prices(valid_data)
+        except RuntimeError:
+            return JsonResponse({'error': 'ML model not available on server.'}, status=503)
+
+    # Step 4 (optional): save the predictions with one bulk INSERT
+    if save and valid_data:
+        created = LandPrediction.objects.bulk_create([
+            LandPrediction(user=request.user, predicted_price=price, **data)
+            for data, price in zip(valid_data, prices)
+        ], batch_size=500)
+        # bulk_create() sends no signals, so update the rollup tables here
+        add_predictions(created)
+
+    # Step 5: Send back one result per valid row (plus the errors)
+    results = [
+        {
+            'index': index,
+            'predicted_price': price,
+            'total_value': price * data['area_sqft'],
+        }
+        for index, data, price in zip(valid_indexes, valid_data, prices)
+    ]
+    return JsonResponse({
+        'count': len(results),
+        'results': results,
+        'errors': errors,
+    }, status=200 if results or not errors else 400)
+
+# Liveness probe: the process is up and answering requests
+def healthz(request):
+    """Return 200 as long as the worker can serve requests."""
+    return JsonResponse({'status': 'ok'})
+
+# Readiness probe: only report ready once the model is loaded and warm,
+# so the load balancer doesn't send users to a cold worker
+def readyz(request):
+    """Warm up this worker if needed and report whether it is ready."""
+    from .ml_helpers import model_status, warmup
+    state = warmup()  # Runs once per process; later probes just read the result
+    status = model_status()
+    ready = state['ok'] and status['loaded']
+    return JsonResponse({
+        'status': 'ready' if ready else 'not ready',
+        'model_loaded': status['loaded'],
+        'model_version': status['version'],
+        'engine': status['engine'],
+        'model_format': status['format'],
+        'model_load_seconds': status['load_seconds'],
+        'warmup_seconds': state['seconds'],
+        'error': state['error'],
+    }, status=200 if ready else 503)
+
+# Download predictions as CSV or JSON Lines, streamed row chunk by row chunk
+# Staff can export everything; other users only get their own predictions
+@login_required
+def export_predictions(request):
+    """Stream predictions filtered by ?start, ?end, ?village, ?user (?format=jsonl, ?gzip=1)."""
+    from .export import CONTENT_TYPES, export_chunks, export_filename, export_queryset
+
+    form = PredictionExportForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    filters = form.cleaned_data
+    user = filters['user'] if request.user.is_staff else request.user
+
+    queryset = export_queryset(filters['start'], filters['end'], filters['village'], user)
+    fmt, compress = filters['format'], filters['gzip']
+    # The generator runs while the response is sent, so the first bytes go
+    # out right away and memory doesn't grow with the number of rows
+    response = StreamingHttpResponse(
+        export_chunks(queryset, fmt, compress),
+        content_type='application/gzip' if compress else CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, compress)}"'
+    return response
+
 # This decorator means user must be logged in to see dashboard
 @login_required
 def dashboard(request):
@@ -99,21 +254,10 @@ def dashboard(request):
     from datetime import timedelta     # For date calculations
     import json                        # For JSON data
     
-    # Calculate basic statistics from all predictions
-    stats = LandPrediction.objects.aggregate(
-        avg_price=Avg('predicted_price'),           # Average price
-        min_price=Min('predicted_price'),           # Minimum price
-        max_price=Max('predicted_price'),            # Maximum price
-        total_predictions=Count('id'),              # Total count
-        avg_area=Avg('area_sqft'),                  # Average area
-        avg_distance=Avg('distance_to_city_km')      # Average distance
-    )
-    
-    # Calculate total market value of all predictions
-    # Loop through all predictions and sum up (price × area) for each
-    total_market_value = 0
-    for pred in LandPrediction.objects.all():
-        total_market_value += pred.predicted_price * pred.area_sqft
+    # Basic statistics from the village rollup table (one small row per village)
+    # instead of aggregating or looping over every prediction
+    stats = overall_totals()
+    total_market_value = stats['total_market_value']
     
     # Get 10 most recent predictions
     recent_predictions = LandPrediction.objects.all()[:10]
@@ -122,77 +266,57 @@ def dashboard(request):
     for pred in recent_predictions:
         pred.total_value = pred.predicted_price * pred.area_sqft
     
-    # Group predictions by village and calculate average price for each village
-    # values('village') groups by village name
-    # annotate() adds calculated fields (avg_price, count)
-    village_stats = LandPrediction.objects.values('village').annotate(
-        avg_price=Avg('predicted_price'),  # Average price for this village
-        count=Count('id')                   # Number of predictions for this village
-    ).order_by('-avg_price')  # Sort by highest average price first
+    # Average price and count for each village, read from the village rollups
+    # Sort by highest average price first
+    village_stats = [
+        {'village': row.village, 'avg_price': row.avg_price, 'count': row.count}
+        for row in VillagePredictionRollup.objects.filter(count__gt=0)
+    ]
+    village_stats.sort(key=lambda stat: stat['avg_price'], reverse=True)
     
     # Extract village names and prices for chart
     village_labels = [stat['village'] for stat in village_stats]  # List of village names
     village_prices = [float(stat['avg_price']) for stat in village_stats]  # List of prices
     
     # Get top 10 villages by average price
-    top_villages = list(village_stats[:10])
-    
-    # Categorize prices into ranges (Low, Medium, High, Premium)
-    # Get all predicted prices
-    all_prices = [p.predicted_price for p in LandPrediction.objects.all()]
-    
-    if all_prices:  # Only if we have prices
-        min_p = min(all_prices)  # Find minimum price
-        max_p = max(all_prices)  # Find maximum price
-        range_size = (max_p - min_p) / 4  # Divide price range into 4 equal parts
-        
-        # Count how many prices fall into each category
-        ranges = {
-            'Low': sum(1 for p in all_prices if p < min_p + range_size),           # Lowest 25%
-            'Medium': sum(1 for p in all_prices if min_p + range_size <= p < min_p + 2*range_size),  # 25-50%
-            'High': sum(1 for p in all_prices if min_p + 2*range_size <= p < min_p + 3*range_size),  # 50-75%
-            'Premium': sum(1 for p in all_prices if p >= min_p + 3*range_size)     # Top 25%
-        }
-        price_ranges = {
-            'labels': list(ranges.keys()),  # Category names
-            'data': list(ranges.values())   # Count for each category
-        }
-    else:
-        # If no prices, use empty data
-        price_ranges = {'labels': ['Low', 'Medium', 'High', 'Premium'], 'data': [0, 0, 0, 0]}
+    top_villages = village_stats[:10]
+    
+    # Categorize prices into ranges (Low, Medium, High, Premium by default)
+    # ?buckets=N asks for a finer histogram, ?method=quantile for equal-count buckets
+    try:
+        bucket_count = int(request.GET.get('buckets', 4))
+    except ValueError:
+        bucket_count = 4
+    method = 'quantile' if request.GET.get('method') == 'quantile' else 'equal'
+    # Counting happens in the database (one query); the lowest and highest
+    # price come from the rollup totals we already have
+    price_ranges = distribution(
+        LandPrediction.objects.all(), 'predicted_price',
+        buckets=bucket_count, method=method, labels=DEFAULT_LABELS,
+        low=stats['min_price'], high=stats['max_price'],
+    )
     
-    # Get price trends over last 30 days
+    # Get price trends over last 30 days from the daily rollups (one row per day)
     thirty_days_ago = timezone.now() - timedelta(days=30)  # Calculate date 30 days ago
-    # Filter predictions from last 30 days, ordered by date
-    trend_predictions = LandPrediction.objects.filter(created_at__gte=thirty_days_ago).order_by('created_at')
-    
-    # Group predictions by date and calculate average price for each day
-    from collections import defaultdict
-    daily_avg = defaultdict(list)  # Dictionary to store prices for each date
+    trend_rows = DailyPredictionRollup.objects.filter(
+        day__gte=timezone.localdate(thirty_days_ago), count__gt=0
+    ).order_by('day')
     
-    # Loop through predictions and group by date
-    for pred in trend_predictions:
-        date_key = pred.created_at.date().isoformat()  # Get date as string (e.g., "2025-01-15")
-        daily_avg[date_key].append(pred.predicted_price)  # Add price to that date's list
+    # Dates and average price for each day
+    trend_dates = [row.day.isoformat() for row in trend_rows]  # e.g., "2025-01-15"
+    trend_prices = [row.avg_price for row in trend_rows]
     
-    # Sort dates and calculate average price for each day
-    trend_dates = sorted(daily_avg.keys())  # List of dates in order
-    # For each date, calculate average of all prices on that day
-    trend_prices = [sum(daily_avg[date]) / len(daily_avg[date]) for date in trend_dates]
-    
-    # Find most common land area size
-    most_common_area = LandPrediction.objects.values('area_sqft').annotate(
-        count=Count('id')  # Count how many times each area appears
-    ).order_by('-count').first()  # Get the one with highest count
+    # Find most common land area size (a GROUP BY over every prediction,
+    # so the result is cached for a few minutes - see rollups.py)
+    common_area = most_common_area()
     
     # Calculate percentage of predictions with electricity
-    electricity_count = LandPrediction.objects.filter(electricity_available=True).count()  # Count with electricity
+    electricity_count = stats['electricity_count']  # Count with electricity (from rollups)
     # Calculate percentage (with electricity / total * 100)
     electricity_percentage = (electricity_count / stats['total_predictions'] * 100) if stats['total_predictions'] > 0 else 0
     
-    # Count predictions made in last 30 days
-    this_month = timezone.now() - timedelta(days=30)
-    active_predictions = LandPrediction.objects.filter(created_at__gte=this_month).count()
+    # Count predictions made in last 30 days (sum of the daily counts)
+    active_predictions = sum(row.count for row in trend_rows)
     
     # Prepare all data to send to dashboard template
     context = {
@@ -207,7 +331,7 @@ def dashboard(request):
         'top_villages': top_villages,                        # Top performing villages
         'price_ranges': price_ranges,                        # Price distribution data
         'trend_data': {'dates': trend_dates, 'prices': trend_prices},  # Trend data for line chart
-        'most_common_area': most_common_area['area_sqft'] if most_common_area else 'N/A',  # Most common area
+        'most_common_area': common_area if common_area is not None else 'N/A',  # Most common area
         'avg_distance': round(stats['avg_distance'] or 0, 2),  # Average distance (rounded to 2 decimals)
         'electricity_percentage': round(electricity_percentage, 1),  # Electricity percentage
         'active_predictions': active_predictions             # Predictions this month
@@ -255,22 +379,9 @@ def faq(request):
 # This function shows list of all blog posts
 def blog(request):
     """Display blog posts list."""
-    from django.core.paginator import Paginator  # For splitting posts into pages
-    
-    # Get all non-featured posts, ordered by newest first
-    posts = BlogPost.objects.filter(featured=False).order_by('-created_at')
-    
-    # Get the most recent featured post (if any)
-    featured_post = BlogPost.objects.filter(featured=True).order_by('-created_at').first()
-    
-    # Split posts into pages (9 posts per page)
-    paginator = Paginator(posts, 9)
-    
-    # Get which page number user wants (from URL, e.g., ?page=2)
-    page_number = request.GET.get('page')
-    
-    # Get the requested page
-    blog_posts = paginator.get_page(page_number)
+    # Posts for the requested page (e.g. ?page=2, 9 per page) and the most
+    # recent featured post, from the blog cache (see blog_cache.py)
+    blog_posts, featured_post = blog_cache.get_list_page(request.GET.get('page'))
     
     # Prepare data for template
     context = {
@@ -281,25 +392,44 @@ def blog(request):
     # Show blog listing page
     return render(request, 'land_price_app/blog.html', context)
 
+# This function searches the blog posts (full-text index, see blog_search.py)
+def blog_search(request):
+    """Display blog posts matching a search query, best match first."""
+    # Search words from the URL (e.g., /blog/search/?q=road+access)
+    query = request.GET.get('q', '').strip()[:200]
+    
+    # Ranked matching posts (empty list for an empty query)
+    results = search_posts(query) if query else []
+    
+    # Prepare data for template
+    context = {
+        'query': query,      # What the user searched for
+        'results': results   # Matching posts with search_snippet
+    }
+    
+    # Show search results page
+    return render(request, 'land_price_app/blog_search.html', context)
+
 # This function shows a single blog post in detail
 def blog_detail(request, slug):
     """Display individual blog post."""
-    from django.shortcuts import get_object_or_404  # Get object or show 404 error
+    from django.http import Http404  # Show 404 error page
     
-    # Find blog post by slug (URL-friendly name)
+    # Find blog post by slug (URL-friendly name), from the blog cache
     # If not found, show 404 error page
-    post = get_object_or_404(BlogPost, slug=slug)
+    post = blog_cache.get_post(slug)
+    if post is None:
+        raise Http404('No blog post found.')
     
-    # Increase view count by 1
-    post.views += 1
-    # Save only the views field (more efficient than saving entire object)
-    post.save(update_fields=['views'])
+    # Count this view. It is buffered and written together with other views
+    # (see view_counter.py); post.views then includes the views not yet saved.
+    # The cached post is dropped whenever views are written, so its count is
+    # the saved count.
+    count_view(post)
     
     # Find related posts (same category, but not the current post)
-    # Get 2 most recent posts from same category
-    related_posts = BlogPost.objects.filter(
-        category=post.category  # Same category
-    ).exclude(id=post.id).order_by('-created_at')[:2]  # Exclude current, newest first, limit 2
+    # 2 most recent posts from same category, also cached
+    related_posts = blog_cache.get_related_posts(post)
     
     # Prepare data for template
     context = {
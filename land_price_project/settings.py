@@ -122,4 +122,82 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Login/Logout URLs
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
-LOGOUT_REDIRECT_URL = '/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/'
+# How often (in seconds) each worker checks whether ml_model.pkl changed on
+# disk. A newer file is loaded and swapped in without restarting the server.
+ML_MODEL_CHECK_INTERVAL = float(os.environ.get('ML_MODEL_CHECK_INTERVAL', '2'))
+
+# Maximum number of rows accepted by the /api/predict/batch/ endpoint
+BATCH_PREDICTION_MAX_ROWS = int(os.environ.get('BATCH_PREDICTION_MAX_ROWS', '5000'))
+
+# Cache for model predictions (see land_price_app/prediction_cache.py).
+# BACKEND: 'local' (per worker), 'django' (shared via CACHES) or 'off'.
+# AREA_STEP / DISTANCE_STEP round inputs to common plot sizes (0 = exact).
+PREDICTION_CACHE = {
+    'BACKEND': os.environ.get('PREDICTION_CACHE_BACKEND', 'local'),
+    'MAX_ENTRIES': int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', '10000')),
+    'TTL': int(os.environ.get('PREDICTION_CACHE_TTL', '3600')),
+    'AREA_STEP': float(os.environ.get('PREDICTION_CACHE_AREA_STEP', '0')),
+    'DISTANCE_STEP': float(os.environ.get('PREDICTION_CACHE_DISTANCE_STEP', '0')),
+    'CACHE_ALIAS': os.environ.get('PREDICTION_CACHE_ALIAS', 'default'),
+}
+
+# Inference engine: 'sklearn' runs Pipeline.predict, 'compiled' evaluates the
+# forest from flat NumPy arrays built at load time (land_price_app/fast_forest.py)
+ML_INFERENCE_ENGINE = os.environ.get('ML_INFERENCE_ENGINE', 'sklearn')
+
+# Micro-batching of concurrent predictions (see land_price_app/batching.py).
+# Rows arriving within MAX_WAIT_MS of each other are scored in one model call.
+# A request that gets no result within TIMEOUT_MS scores its row itself.
+# Batching only helps with threaded workers (gunicorn.conf.py switches to
+# gthread when PREDICTION_BATCHING=True).
+PREDICTION_BATCHING = {
+    'ENABLED': os.environ.get('PREDICTION_BATCHING', 'False') == 'True',
+    'MAX_BATCH_SIZE': int(os.environ.get('PREDICTION_BATCH_SIZE', '64')),
+    'MAX_WAIT_MS': float(os.environ.get('PREDICTION_BATCH_WAIT_MS', '3')),
+    'TIMEOUT_MS': float(os.environ.get('PREDICTION_BATCH_TIMEOUT_MS', '1000')),
+}
+
+# Model file format: 'pickle' loads ml_model.pkl into each worker; 'arrays'
+# memory-maps the tree arrays written by `manage.py export_model_arrays`, so
+# all gunicorn workers share one read-only copy of the model.
+ML_MODEL_FORMAT = os.environ.get('ML_MODEL_FORMAT', 'pickle')
+
+# Warm up the model when Django starts (gunicorn.conf.py always warms workers)
+ML_WARMUP_ON_STARTUP = os.environ.get('ML_WARMUP_ON_STARTUP', 'False') == 'True'
+
+# Uploaded spreadsheets for the admin prediction import, with their job,
+# log and error files (kept so a failed import can be resumed)
+PREDICTION_IMPORT_DIR = os.environ.get('PREDICTION_IMPORT_DIR', os.path.join(BASE_DIR, 'imports'))
+
+# Blog view counting (see land_price_app/view_counter.py). Views are buffered
+# and written as one "views = views + n" update per post.
+# BACKEND: 'local' (per worker), 'django' (shared via CACHES) or 'off'
+# (write every view at once).
+BLOG_VIEW_COUNTER = {
+    'BACKEND': os.environ.get('BLOG_VIEW_COUNTER_BACKEND', 'local'),
+    'FLUSH_INTERVAL': float(os.environ.get('BLOG_VIEW_FLUSH_INTERVAL', '10')),
+    'FLUSH_THRESHOLD': int(os.environ.get('BLOG_VIEW_FLUSH_THRESHOLD', '100')),
+    'CACHE_ALIAS': os.environ.get('BLOG_VIEW_COUNTER_CACHE_ALIAS', 'default'),
+}
+
+# Shared Django cache, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# and CACHE_LOCATION=redis://127.0.0.1:6379. Without it Django uses a
+# LocMemCache in every process.
+if os.environ.get('CACHE_BACKEND'):
+    CACHES = {
+        'default': {
+            'BACKEND': os.environ['CACHE_BACKEND'],
+            'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        }
+    }
+
+# Cache for the blog list, post and related-post lookups (see
+# land_price_app/blog_cache.py). Saving or deleting a post invalidates it.
+# It needs a CACHES backend shared by all workers (CACHE_BACKEND above); with
+# the per-process LocMemCache it is not used (system check W001).
+BLOG_CACHE = {
+    'ENABLED': os.environ.get('BLOG_CACHE', 'False') == 'True',
+    'TIMEOUT': int(os.environ.get('BLOG_CACHE_TIMEOUT', '3600')),
+    'CACHE_ALIAS': os.environ.get('BLOG_CACHE_ALIAS', 'default'),
+}